@@ -0,0 +1,64 @@
+"""
+Сравнение построчной (convert_to_rub + df.apply) и векторной
+(convert_columns_to_rub) конвертации валют.
+
+Запуск: python -m benchmarks.bench_currency_conversion [количество строк]
+"""
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from data_preparation import MONEY_COLUMNS, convert_columns_to_rub, convert_to_rub
+
+
+def make_money_frame(rows, seed=0):
+    """
+    Создаёт DataFrame с суммами и валютами, включая пропуски и неизвестные валюты.
+    """
+    rng = np.random.default_rng(seed)
+    currencies = np.array(['USD', 'EUR', 'RUB', 'GBP', None], dtype=object)
+    data = {}
+    for value_column, currency_column in MONEY_COLUMNS.values():
+        values = rng.integers(1, 10 ** 9, size=rows).astype(float)
+        values[rng.random(rows) < 0.3] = np.nan
+        data[value_column] = values
+        data[currency_column] = currencies[rng.integers(0, len(currencies), size=rows)]
+    return pd.DataFrame(data)
+
+
+def convert_row_wise(df):
+    """
+    Прежний вариант: отдельный df.apply(axis=1) на каждый денежный столбец.
+    """
+    df = df.copy()
+    for target, (value_column, currency_column) in MONEY_COLUMNS.items():
+        df[target] = df.apply(lambda row: convert_to_rub(row[value_column],
+                                                         row[currency_column]), axis=1)
+    targets = list(MONEY_COLUMNS)
+    df[targets] = df[targets].apply(pd.to_numeric, errors='coerce')
+    return df
+
+
+def main(rows=60000, repeat=3):
+    df = make_money_frame(rows)
+
+    row_wise = convert_row_wise(df)
+    vectorized = convert_columns_to_rub(df)
+    for target in MONEY_COLUMNS:
+        pd.testing.assert_series_equal(row_wise[target], vectorized[target],
+                                       check_dtype=False)
+
+    row_wise_time = min(timeit.repeat(lambda: convert_row_wise(df), number=1, repeat=repeat))
+    vectorized_time = min(timeit.repeat(lambda: convert_columns_to_rub(df), number=1,
+                                        repeat=repeat))
+
+    print(f"Строк: {rows}")
+    print(f"Построчно:  {row_wise_time:.4f} с")
+    print(f"Векторно:   {vectorized_time:.4f} с")
+    print(f"Ускорение:  {row_wise_time / vectorized_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 60000)
@@ -0,0 +1,71 @@
+"""
+Сравнение построчного заполнения таблицы docx (iterrows + table.add_row)
+и пакетной вставки строк (add_dataframe_table).
+
+Запуск: python -m benchmarks.bench_docx_tables [количество строк ...]
+"""
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+from docx import Document
+
+from data_analysis import _round_value, add_dataframe_table
+
+
+def make_table_frame(rows, seed=0):
+    """
+    Создаёт DataFrame в формате таблиц раздела analyze_budgets_and_fees.
+    """
+    rng = np.random.default_rng(seed)
+    genres = np.array(['драма', 'комедия', 'боевик', 'ужасы'], dtype=object)
+    return pd.DataFrame({
+        'name': [f"Фильм {i}" for i in range(rows)],
+        'genres': [list(rng.choice(genres, 2, replace=False)) for _ in range(rows)],
+        'year': rng.integers(1950, 2024, size=rows),
+        'budget_rub': rng.integers(10 ** 5, 10 ** 10, size=rows).astype(float),
+        'fees_rub_world': rng.integers(10 ** 5, 10 ** 11, size=rows).astype(float),
+        'rating.kp': rng.uniform(1, 10, size=rows),
+        'rating.imdb': rng.uniform(1, 10, size=rows),
+    })
+
+
+def add_table_row_wise(doc, data, value_format=str):
+    """
+    Прежний вариант: строка за строкой через iterrows и table.add_row().
+    """
+    table = doc.add_table(rows=1, cols=len(data.columns))
+    table.style = 'Table Grid'
+    hdr_cells = table.rows[0].cells
+    for idx, column_name in enumerate(data.columns):
+        hdr_cells[idx].text = column_name
+    for _, row in data.iterrows():
+        row_cells = table.add_row().cells
+        for idx, value in enumerate(row):
+            row_cells[idx].text = value_format(value)
+    return table
+
+
+def main(sizes=(1000, 10000), repeat=3):
+    for rows in sizes:
+        data = make_table_frame(rows)
+
+        row_wise = add_table_row_wise(Document(), data, _round_value)
+        bulk = add_dataframe_table(Document(), data, _round_value)
+        assert ([[cell.text for cell in row.cells] for row in row_wise.rows]
+                == [[cell.text for cell in row.cells] for row in bulk.rows])
+
+        row_wise_time = min(timeit.repeat(
+            lambda: add_table_row_wise(Document(), data, _round_value), number=1, repeat=repeat))
+        bulk_time = min(timeit.repeat(
+            lambda: add_dataframe_table(Document(), data, _round_value), number=1, repeat=repeat))
+
+        print(f"Строк: {rows}")
+        print(f"Построчно:  {row_wise_time:.4f} с")
+        print(f"Пакетно:    {bulk_time:.4f} с")
+        print(f"Ускорение:  {row_wise_time / bulk_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main(tuple(int(arg) for arg in sys.argv[1:]) or (1000, 10000))
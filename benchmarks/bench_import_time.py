@@ -0,0 +1,71 @@
+"""
+Время холодного импорта модулей отчёта по данным python -X importtime.
+
+Завершается с кодом 1, если импорт дольше бюджета или если при импорте
+загружаются библиотеки, которые должны загружаться лениво (см. lazy_import).
+
+Запуск: python -m benchmarks.bench_import_time [бюджет в секундах]
+"""
+import subprocess
+import sys
+
+# Модули и бюджет времени их импорта по умолчанию, секунды
+MODULES = ['data_analysis']
+DEFAULT_BUDGET = 1.0
+
+# Библиотеки, которые не должны загружаться при импорте модулей отчёта
+LAZY_MODULES = ['seaborn', 'matplotlib', 'matplotlib.pyplot', 'scipy.stats', 'docx']
+
+
+def import_time(module, repeat=3):
+    """
+    Лучшее из repeat значений кумулятивного времени импорта модуля в новом процессе.
+
+    :return: Кортеж (время в секундах, список самых долгих вложенных импортов)
+    """
+    best = None
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                                capture_output=True, text=True, check=True)
+        entries = []
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, _, cumulative, name = (part.strip() for part in line.replace(':', '|', 1).split('|'))
+            entries.append((int(cumulative) / 1e6, name))
+        total = next(seconds for seconds, name in entries if name == module)
+        if best is None or total < best[0]:
+            best = (total, sorted(entries, reverse=True)[1:6])
+    return best
+
+
+def loaded_lazy_modules(module):
+    """
+    Возвращает ленивые библиотеки, которые оказались загружены после импорта модуля.
+    """
+    code = (f"import sys, {module}; "
+            f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))")
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                            check=True)
+    return [name for name in result.stdout.strip().split(',') if name]
+
+
+def main(budget=DEFAULT_BUDGET):
+    ok = True
+    for module in MODULES:
+        total, heaviest = import_time(module)
+        eager = loaded_lazy_modules(module)
+
+        print(f"{module}: {total:.3f} с (бюджет {budget:.3f} с)")
+        for seconds, name in heaviest:
+            print(f"    {seconds:.3f} с  {name}")
+        if eager:
+            print(f"    загружены при импорте: {', '.join(eager)}")
+
+        ok = ok and total <= budget and not eager
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BUDGET))
@@ -0,0 +1,76 @@
+"""
+Сравнение построчного json.loads с пакетным декодированием data_decoding
+на синтетическом файле из 100 тысяч строк.
+
+Запуск: python -m benchmarks.bench_json_decoding [количество строк]
+"""
+import json
+import os
+import sys
+import tempfile
+import timeit
+
+import data_decoding
+from data_decoding import iter_decoded
+
+
+def write_lines_file(path, rows):
+    """
+    Записывает файл в формате stream-data: по одному фильму в строке.
+    """
+    with open(path, 'w', encoding='utf-8') as file:
+        for i in range(rows):
+            record = {
+                'id': i, 'name': f'Фильм {i}', 'year': 1950 + i % 70,
+                'rating': {'kp': 6.5, 'imdb': 6.8}, 'votes': {'kp': i * 3, 'imdb': i * 7},
+                'genres': [{'name': 'драма'}, {'name': 'комедия'}],
+                'countries': [{'name': 'Россия'}],
+                'budget': {'value': 1000000 + i, 'currency': 'RUB'},
+                'persons': [{'id': i * 10 + j, 'name': f'Актёр {j}', 'enProfession': 'actor'}
+                            for j in range(5)],
+            }
+            file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def decode_line_by_line(path):
+    """
+    Прежний вариант: текстовый режим, двойной strip и json.loads на каждую строку.
+    """
+    records = []
+    with open(path, 'r', encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                records.append(json.loads(line.strip()))
+    return records
+
+
+def decode_batched(path, decoder=None):
+    with open(path, 'rb') as file:
+        lines = (line.strip() for line in file)
+        return list(iter_decoded((line for line in lines if line), decoder=decoder))
+
+
+def main(rows=100000, repeat=3):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'stream-data')
+        write_lines_file(path, rows)
+
+        assert decode_line_by_line(path) == decode_batched(path, json.loads)
+
+        variants = [
+            ('json построчно', lambda: decode_line_by_line(path)),
+            ('json пачками', lambda: decode_batched(path, json.loads)),
+        ]
+        if data_decoding.orjson is not None:
+            variants.append(('orjson пачками', lambda: decode_batched(path)))
+
+        print(f"Строк: {rows}")
+        baseline = None
+        for name, func in variants:
+            elapsed = min(timeit.repeat(func, number=1, repeat=repeat))
+            baseline = baseline or elapsed
+            print(f"{name:<16} {elapsed:.4f} с  ({baseline / elapsed:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
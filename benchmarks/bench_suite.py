@@ -0,0 +1,187 @@
+"""
+Набор замеров на синтетических данных (см. benchmarks.synthetic_data): чтение
+из файла, prepare_data и каждый раздел отчёта analyze_*.
+
+Результаты сохраняются в JSON (по файлу на запуск) и сравниваются с
+предыдущим запуском, чтобы отслеживать изменения между коммитами.
+
+Запуск: python -m benchmarks.bench_suite [--sizes 10000 100000 1000000] [--only prepare ...]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from docx import Document
+
+import data_analysis
+from benchmarks.synthetic_data import write_jsonl
+from data_fetching import lines_to_dataframe, read_file_lines
+from data_preparation import SOURCE_COLUMNS, prepare_data
+from instrumentation import Instrumentation
+
+# Каталог для файлов с синтетическими данными и каталог результатов
+DATA_DIR = os.path.join(".cache", "benchmarks")
+RESULTS_DIR = os.path.join("benchmarks", "results")
+
+DEFAULT_SIZES = [10000, 100000]
+
+# Разделы отчёта: {имя замера: функция(df, persons, doc)}
+SECTION_BENCHMARKS = {
+    'analyze_ratings_distribution':
+        lambda df, persons, doc: data_analysis.analyze_ratings_distribution(df, doc),
+    'compare_platform_ratings':
+        lambda df, persons, doc: data_analysis.compare_platform_ratings(df, doc),
+    'analyze_rating_genres':
+        lambda df, persons, doc: data_analysis.analyze_rating_genres(df, doc),
+    'analyze_rating_genres_time':
+        lambda df, persons, doc: data_analysis.analyze_rating_genres_time(df, doc),
+    'analyze_rating_genres_trends':
+        lambda df, persons, doc: data_analysis.analyze_rating_genres_trends(df, doc),
+    'analyze_budgets':
+        lambda df, persons, doc: data_analysis.analyze_budgets(df, doc),
+    'analyze_budgets_and_fees':
+        lambda df, persons, doc: data_analysis.analyze_budgets_and_fees(df, doc),
+    'analyze_top_persons':
+        lambda df, persons, doc: data_analysis.analyze_top_persons(df, doc, persons),
+    'analyze_low_persons':
+        lambda df, persons, doc: data_analysis.analyze_low_persons(df, doc, persons),
+}
+
+BENCHMARKS = ['fetch_from_file', 'prepare_data'] + list(SECTION_BENCHMARKS)
+
+
+def data_file(size, seed):
+    """
+    Файл с синтетическими данными; создаётся один раз и переиспользуется.
+    """
+    path = os.path.join(DATA_DIR, f"synthetic-{size}-{seed}.jsonl")
+    if not os.path.exists(path):
+        print(f"Генерация {size} записей: {path}")
+        write_jsonl(path, size, seed)
+    return path
+
+
+def current_commit():
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, check=True)
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_size(size, seed, only, repeat, trace_memory):
+    """
+    Выполняет замеры для одного размера данных.
+
+    :return: Список записей {benchmark, size, rows, wall_time, cpu_time, ...}
+    """
+    selected = [name for name in BENCHMARKS if not only or name in only]
+    path = data_file(size, seed)
+    results = []
+
+    def measure(name, func, rows):
+        best = None
+        for _ in range(repeat):
+            collected = Instrumentation(trace_memory=trace_memory)
+            with collected.stage(name, rows=rows) as record:
+                value = func()
+            if best is None or record['wall_time'] < best['wall_time']:
+                best = record
+            if collected.started_tracing:
+                import tracemalloc
+                tracemalloc.stop()
+        best = {'benchmark': name, 'size': size, **{k: v for k, v in best.items() if k != 'name'}}
+        results.append(best)
+        print(f"  {name:<32} {best['wall_time']:8.3f} с  (CPU {best['cpu_time']:.3f} с)")
+        return value
+
+    # Данные для следующих шагов нужны, даже если их замер не выбран
+    load = lambda: lines_to_dataframe(read_file_lines(path), SOURCE_COLUMNS)
+    raw = measure('fetch_from_file', load, size) if 'fetch_from_file' in selected else load()
+
+    prepare = lambda: prepare_data(raw.copy(), return_persons=True)
+    if 'prepare_data' in selected:
+        df, persons = measure('prepare_data', prepare, len(raw))
+    else:
+        df, persons = prepare()
+
+    for name, section in SECTION_BENCHMARKS.items():
+        if name in selected:
+            measure(name, lambda: section(df, persons, Document()), len(df))
+
+    return results
+
+
+def latest_results(results_dir, exclude=None):
+    """
+    Путь к последнему сохранённому файлу результатов или None.
+    """
+    if not os.path.isdir(results_dir):
+        return None
+    paths = sorted(os.path.join(results_dir, name) for name in os.listdir(results_dir)
+                   if name.endswith('.json'))
+    paths = [path for path in paths if path != exclude]
+    return paths[-1] if paths else None
+
+
+def compare(results, baseline_path):
+    """
+    Печатает отношение времени к результатам из baseline_path.
+    """
+    with open(baseline_path, encoding='utf-8') as file:
+        baseline = json.load(file)
+    previous = {(r['benchmark'], r['size']): r['wall_time'] for r in baseline['results']}
+
+    print(f"Сравнение с {baseline_path} (коммит {baseline.get('commit')}):")
+    for record in results:
+        before = previous.get((record['benchmark'], record['size']))
+        if before:
+            print(f"  {record['benchmark']:<32} {record['size']:>8}  "
+                  f"{before:8.3f} -> {record['wall_time']:8.3f} с  "
+                  f"({record['wall_time'] / before:.2f}x)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_suite")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, help="Выполнить только эти замеры")
+    parser.add_argument("--repeat", type=int, default=1, help="Повторов замера (берётся лучший)")
+    parser.add_argument("--trace-memory", action="store_true", help="Пик памяти через tracemalloc")
+    parser.add_argument("--results-dir", default=RESULTS_DIR)
+    parser.add_argument("--compare", metavar="PATH",
+                        help="Файл результатов для сравнения (по умолчанию последний)")
+    args = parser.parse_args(argv)
+
+    results = []
+    for size in args.sizes:
+        print(f"Записей: {size}")
+        results.extend(run_size(size, args.seed, args.only, args.repeat, args.trace_memory))
+
+    os.makedirs(args.results_dir, exist_ok=True)
+    commit = current_commit()
+    path = os.path.join(args.results_dir,
+                        f"{time.strftime('%Y%m%d-%H%M%S')}-{commit or 'nocommit'}.json")
+    baseline = args.compare or latest_results(args.results_dir)
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump({
+            'commit': commit,
+            'created': time.time(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'results': results,
+        }, file, ensure_ascii=False, indent=2)
+    print(f"Результаты сохранены: {path}")
+
+    if baseline:
+        compare(results, baseline)
+
+
+if __name__ == "__main__":
+    main()
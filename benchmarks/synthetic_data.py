@@ -0,0 +1,163 @@
+"""
+Генератор синтетических записей в формате потока Кинопоиска.
+
+Записи воспроизводимы (зависят только от seed) и повторяют структуру
+настоящих: вложенные rating, votes, budget и fees, списки genres,
+countries и persons с enProfession, пропуски и нулевые оценки, а также
+поля, которые prepare_data не использует.
+
+Запуск: python -m benchmarks.synthetic_data количество_записей путь [seed]
+"""
+import json
+import os
+import sys
+
+import numpy as np
+
+GENRES = ['драма', 'комедия', 'боевик', 'триллер', 'мелодрама', 'криминал', 'детектив',
+          'фантастика', 'приключения', 'ужасы', 'семейный', 'мультфильм', 'фэнтези',
+          'военный', 'биография', 'история', 'документальный', 'вестерн', 'музыка',
+          'спорт', 'мюзикл', 'аниме', 'короткометражка', 'для взрослых']
+GENRE_WEIGHTS = np.linspace(3, 0.2, len(GENRES))
+
+COUNTRIES = ['США', 'Россия', 'СССР', 'Франция', 'Великобритания', 'Германия', 'Япония',
+             'Италия', 'Корея Южная', 'Индия', 'Испания', 'Канада']
+COUNTRY_WEIGHTS = np.linspace(4, 0.3, len(COUNTRIES))
+
+# Валюты бюджета и сборов; '₽' не входит в EXCHANGE_RATES и проверяет запасной курс
+CURRENCIES = ['USD', 'RUB', 'EUR', '₽']
+CURRENCY_WEIGHTS = [0.6, 0.3, 0.08, 0.02]
+
+PROFESSIONS = [('actor', 'актеры'), ('director', 'режиссеры'), ('writer', 'сценаристы'),
+               ('producer', 'продюсеры'), ('composer', 'композиторы'), ('operator', 'операторы')]
+
+# Размер пула персон относительно числа фильмов: у популярных персон много фильмов
+PERSON_POOL_RATIO = 3
+
+# Количество записей, для которых случайные величины генерируются одним вызовом
+BATCH_SIZE = 10000
+
+
+def _pick(rng, values, weights, size):
+    weights = np.asarray(weights, dtype=float)
+    return rng.choice(len(values), size=size, p=weights / weights.sum())
+
+
+def _money(value, currency):
+    return {'value': value, 'currency': currency}
+
+
+def generate_records(count, seed=0):
+    """
+    Генерирует синтетические записи фильмов.
+
+    :param count: Количество записей
+    :param seed: Зерно генератора; одинаковые count и seed дают одинаковые записи
+    :return: Генератор словарей в формате записей потока
+    """
+    rng = np.random.default_rng(seed)
+    person_pool = max(count * PERSON_POOL_RATIO, 100)
+
+    for start in range(0, count, BATCH_SIZE):
+        size = min(BATCH_SIZE, count - start)
+
+        years = rng.integers(1930, 2025, size=size)
+        kp = np.clip(rng.normal(6.4, 1.2, size=size), 1, 10).round(3)
+        imdb = np.clip(kp + rng.normal(0, 0.7, size=size), 1, 10).round(1)
+        imdb[rng.random(size) < 0.15] = 0  # Нет оценки IMDb
+        kp[rng.random(size) < 0.03] = 0  # Нет оценки Кинопоиска
+        votes_kp = rng.lognormal(7, 2, size=size).astype(np.int64)
+        votes_imdb = rng.lognormal(6, 2, size=size).astype(np.int64)
+
+        genre_counts = rng.integers(0, 5, size=size)
+        country_counts = rng.integers(0, 3, size=size)
+        person_counts = rng.integers(0, 25, size=size)
+        genre_picks = _pick(rng, GENRES, GENRE_WEIGHTS, genre_counts.sum())
+        country_picks = _pick(rng, COUNTRIES, COUNTRY_WEIGHTS, country_counts.sum())
+        # Зипф: небольшая доля персон встречается в большом числе фильмов
+        person_ids = rng.zipf(1.3, size=person_counts.sum()) % person_pool + 1
+        person_professions = _pick(rng, PROFESSIONS, [10, 1, 1.5, 2, 0.5, 0.5],
+                                   person_counts.sum())
+
+        has_budget = rng.random(size) < 0.35
+        budgets = (rng.lognormal(15, 2, size=size)).round(-3)
+        budget_currencies = _pick(rng, CURRENCIES, CURRENCY_WEIGHTS, size)
+        fees = {region: (rng.random(size) < share, rng.lognormal(mean, 2.5, size=size).round())
+                for region, share, mean in (('world', 0.3, 16), ('usa', 0.25, 15),
+                                            ('russia', 0.2, 13))}
+
+        genre_pos = country_pos = person_pos = 0
+        for i in range(size):
+            movie_id = int(start + i + 1)
+            genres = [{'name': GENRES[g]} for g in genre_picks[genre_pos:genre_pos + genre_counts[i]]]
+            genre_pos += genre_counts[i]
+            countries = [{'name': COUNTRIES[c]}
+                         for c in country_picks[country_pos:country_pos + country_counts[i]]]
+            country_pos += country_counts[i]
+
+            persons = []
+            for person_id, profession in zip(
+                    person_ids[person_pos:person_pos + person_counts[i]],
+                    person_professions[person_pos:person_pos + person_counts[i]]):
+                en_profession, profession_ru = PROFESSIONS[profession]
+                persons.append({
+                    'id': int(person_id),
+                    'photo': f"https://example.org/photos/{person_id}.jpg",
+                    'name': f"Персона {person_id}" if person_id % 50 else None,
+                    'enName': f"Person {person_id}",
+                    'description': None,
+                    'profession': profession_ru,
+                    'enProfession': en_profession,
+                })
+            person_pos += person_counts[i]
+
+            record = {
+                'id': movie_id,
+                # Примерно у одного фильма из 97 нет названия
+                'name': f"Фильм {movie_id}" if movie_id % 97 else None,
+                'alternativeName': f"Movie {movie_id}",
+                'type': 'movie',
+                'year': int(years[i]),
+                'description': f"Описание фильма {movie_id}. " * 5,
+                'movieLength': int(60 + movie_id % 120),
+                'rating': {'kp': float(kp[i]), 'imdb': float(imdb[i]), 'filmCritics': 0},
+                'votes': {'kp': int(votes_kp[i]), 'imdb': int(votes_imdb[i]), 'filmCritics': 0},
+                'genres': genres,
+                'countries': countries,
+                'persons': persons,
+            }
+            if genre_counts[i] == 0 and movie_id % 2:
+                del record['genres']  # У части фильмов поля нет совсем
+            if has_budget[i]:
+                record['budget'] = _money(float(budgets[i]),
+                                          CURRENCIES[budget_currencies[i]])
+            fee_record = {region: _money(float(values[i]), 'USD' if region != 'russia' else 'RUB')
+                          for region, (present, values) in fees.items() if present[i]}
+            if fee_record:
+                record['fees'] = fee_record
+            yield record
+
+
+def write_jsonl(path, count, seed=0):
+    """
+    Записывает синтетические записи в файл (одна JSON-запись на строку).
+
+    :param path: Путь к файлу
+    :param count: Количество записей
+    :param seed: Зерно генератора
+    :return: path
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        for record in generate_records(count, seed):
+            file.write(json.dumps(record, ensure_ascii=False))
+            file.write('\n')
+    os.replace(tmp_path, path)
+    return path
+
+
+if __name__ == "__main__":
+    write_jsonl(sys.argv[2], int(sys.argv[1]), int(sys.argv[3]) if len(sys.argv) > 3 else 0)
@@ -1,23 +1,354 @@
-import seaborn as sns
-from docx import Document
-from docx.shared import Inches
-import matplotlib.pyplot as plt
-from scipy.stats import pearsonr
+import io
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import cached_property
+from xml.sax.saxutils import escape
+
+import numpy as np
 import pandas as pd
 
+from genre_trends import GenreTrends
+from instrumentation import stage
+from lazy_import import LazyImport, use_agg_backend
+from person_ranking import MIN_PERSON_FILMS, PersonIndex, movie_ratings, rank_sums
+from selection import grouped_top_k
+from streaming_stats import CoMoment, FixedHistogram2D
+
+# Библиотеки построения графиков и документа загружаются при первом использовании,
+# чтобы импорт модуля (например, ради AnalysisContext или person_ratings) был быстрым
+sns = LazyImport('seaborn', setup=use_agg_backend)
+matplotlib = LazyImport('matplotlib', setup=use_agg_backend)
+plt = LazyImport('matplotlib.pyplot', setup=use_agg_backend)
+Document = LazyImport('docx', 'Document')
+Inches = LazyImport('docx.shared', 'Inches')
+parse_xml = LazyImport('docx.oxml', 'parse_xml')
+nsdecls = LazyImport('docx.oxml.ns', 'nsdecls')
+pearsonr = LazyImport('scipy.stats', 'pearsonr')
+
+# Число точек, начиная с которого точечные графики строятся в облегчённом режиме:
+# плотность вместо отдельных точек или детерминированная выборка точек
+LARGE_PLOT_POINTS = 50000
+
+# Формат и разрешение изображений графиков (None — разрешение по умолчанию matplotlib).
+# Графики строятся в памяти и передаются в документ без временных файлов;
+# python-docx поддерживает из форматов matplotlib только png, jpeg и tiff
+FIGURE_FORMATS = ['png', 'jpeg', 'tiff']
+FIGURE_FORMAT = 'png'
+FIGURE_DPI = None
+
+
+def apply_base_style():
+    """
+    Сбрасывает стиль графиков к базовому стилю отчёта, чтобы результат
+    не зависел от порядка построения графиков и от процесса, в котором он строится.
+    """
+    plt.rcdefaults()
+    sns.set(style="darkgrid", rc={"axes.facecolor": "#1C1C1C", "grid.color": "#333333"})
+
 
-def analyze_ratings_distribution(df, doc):
-    # Параметры для анализа оценок Кинопоиска
-    rating_kp = df['rating.kp']
+def _init_render_worker():
+    use_agg_backend()
 
-    # Среднее, медианное и модальное значения оценок
-    mean_rating = rating_kp.mean()
-    median_rating = rating_kp.median()
-    mode_rating = rating_kp.mode()[0]
 
-    # Проценты высоких и низких оценок
-    high_ratings_percentage = (rating_kp > 7).mean() * 100
-    low_ratings_percentage = (rating_kp < 5).mean() * 100
+class FigureBuffer(io.BytesIO):
+    """
+    Буфер в памяти для изображения графика с нужным форматом и разрешением.
+    """
+
+    def __init__(self, image_format=FIGURE_FORMAT, dpi=FIGURE_DPI):
+        super().__init__()
+        self.image_format = image_format
+        self.dpi = dpi
+
+
+def save_figure(target, **savefig_kwargs):
+    """
+    Сохраняет текущий график; формат и разрешение берутся из FigureBuffer,
+    для обычного файла или буфера — по умолчанию matplotlib.
+    """
+    plt.savefig(target, format=getattr(target, 'image_format', None),
+                dpi=getattr(target, 'dpi', None), **savefig_kwargs)
+
+
+def _render_to_bytes(plot, args, image_format=FIGURE_FORMAT, dpi=FIGURE_DPI):
+    """
+    Строит график и возвращает изображение в байтах.
+    """
+    buffer = FigureBuffer(image_format, dpi)
+    plot(*args, buffer)
+    return buffer.getvalue()
+
+
+class InlineFigureRenderer:
+    """
+    Строит графики отчёта сразу, в текущем процессе, и вставляет их из памяти.
+    """
+
+    def __init__(self, image_format=FIGURE_FORMAT, dpi=FIGURE_DPI):
+        self.image_format = image_format
+        self.dpi = dpi
+
+    def render(self, plot, args):
+        """
+        Строит график и возвращает изображение в байтах.
+        """
+        return _render_to_bytes(plot, args, self.image_format, self.dpi)
+
+    def submit(self, doc, plot, args, **picture_kwargs):
+        doc.add_picture(io.BytesIO(self.render(plot, args)), **picture_kwargs)
+
+    def finish(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FigureRenderer:
+    """
+    Параллельно строит графики отчёта в пуле процессов.
+
+    Документ собирается в основном процессе в обычном порядке: на месте
+    каждого графика сразу создаётся пустой абзац, а изображение вставляется
+    в него в finish(), когда рабочий процесс закончит построение.
+    """
+
+    def __init__(self, workers=None, image_format=FIGURE_FORMAT, dpi=FIGURE_DPI):
+        self._executor = ProcessPoolExecutor(max_workers=workers,
+                                             initializer=_init_render_worker)
+        self.image_format = image_format
+        self.dpi = dpi
+        self._pending = []
+
+    def submit(self, doc, plot, args, **picture_kwargs):
+        future = self._executor.submit(_render_to_bytes, plot, args, self.image_format, self.dpi)
+        run = doc.add_paragraph().add_run()
+        self._pending.append((future, run, picture_kwargs))
+
+    def finish(self):
+        try:
+            for future, run, picture_kwargs in self._pending:
+                run.add_picture(io.BytesIO(future.result()), **picture_kwargs)
+        except BaseException:
+            self.close()
+            raise
+        self._pending = []
+        self._executor.shutdown()
+
+    def close(self):
+        """
+        Останавливает пул при ошибке: ещё не начатые графики отменяются.
+        """
+        self._pending = []
+        self._executor.shutdown(cancel_futures=True)
+
+
+def add_figure(doc, plot, args, renderer=None, **picture_kwargs):
+    """
+    Строит график и добавляет его в документ.
+
+    :param doc: Документ Word
+    :param plot: Функция построения графика plot(*args, target)
+    :param args: Данные для графика (только нужные столбцы и агрегаты)
+    :param renderer: FigureRenderer для параллельного построения,
+        InlineFigureRenderer или None (последовательно, формат по умолчанию)
+    :param picture_kwargs: Размеры изображения для doc.add_picture
+    """
+    (renderer or InlineFigureRenderer()).submit(doc, plot, args, **picture_kwargs)
+
+
+# Табуляция и перевод строки в тексте ячейки, как их понимает python-docx
+_RUN_BREAKS = re.compile(r'(\t|\r\n|\n|\r)')
+
+
+def _run_xml(text):
+    """
+    XML прогона <w:r> с текстом ячейки (аналог присваивания cell.text).
+    """
+    parts = []
+    for part in _RUN_BREAKS.split(text):
+        if part == '\t':
+            parts.append('<w:tab/>')
+        elif part in ('\n', '\r', '\r\n'):
+            parts.append('<w:br/>')
+        elif part:
+            space = ' xml:space="preserve"' if part != part.strip() else ''
+            parts.append(f'<w:t{space}>{escape(part)}</w:t>')
+    return f"<w:r>{''.join(parts)}</w:r>"
+
+
+def add_dataframe_table(doc, data, value_format=str):
+    """
+    Добавляет в документ таблицу с заголовками столбцов и строками DataFrame.
+
+    Строки не добавляются по одной через table.add_row(): XML всех строк
+    собирается из столбцов целиком и разбирается одним вызовом, поэтому
+    время растёт линейно с числом строк.
+
+    :param doc: Документ Word
+    :param data: DataFrame с данными таблицы
+    :param value_format: Функция, превращающая значение ячейки в строку
+    :return: Таблица python-docx
+    """
+    table = doc.add_table(rows=1, cols=len(data.columns))
+    table.style = 'Table Grid'
+
+    # Добавляем заголовки столбцов
+    hdr_cells = table.rows[0].cells
+    for idx, column_name in enumerate(data.columns):
+        hdr_cells[idx].text = column_name
+
+    if data.empty:
+        return table
+
+    # Значения берём так же, как iterrows(): из общего массива DataFrame
+    values = data.to_numpy()
+    columns = [[_run_xml(value_format(value)) for value in values[:, idx].tolist()]
+               for idx in range(values.shape[1])]
+
+    # Ширина ячеек берётся из сетки таблицы, как в table.add_row()
+    widths = [grid_col.w for grid_col in table._tbl.tblGrid.gridCol_lst]
+    if len(widths) == len(columns) and all(width is not None for width in widths):
+        cell_starts = [f'<w:tc><w:tcPr><w:tcW w:type="dxa" w:w="{width.twips}"/></w:tcPr><w:p>'
+                       for width in widths]
+    else:
+        cell_starts = ['<w:tc><w:p>'] * len(columns)
+
+    rows = ''.join(
+        '<w:tr>' + ''.join(start + run + '</w:p></w:tc>' for start, run in zip(cell_starts, row))
+        + '</w:tr>'
+        for row in zip(*columns)
+    )
+    fragment = parse_xml(f'<w:tbl {nsdecls("w")}>{rows}</w:tbl>')
+    for tr in list(fragment):
+        table._tbl.append(tr)
+    return table
+
+
+def _round_value(value):
+    # Числа в таблицах персон округляются до двух знаков
+    return str(round(value, 2) if isinstance(value, (float, int)) else value)
+
+
+class AnalysisContext:
+    """
+    Общие промежуточные данные одного запуска отчёта.
+
+    Каждая величина вычисляется при первом обращении и переиспользуется
+    всеми разделами, которым она нужна.
+    """
+
+    def __init__(self, df, year_genre_counts=None, genre_lists=None, persons=None,
+                 person_stats=None, ratings=None):
+        self.df = df
+
+        # Таблица персон из prepare_data(return_persons=True) или None
+        self.persons = persons
+        self._person_indexes = {}
+
+        # Готовые суммы оценок персон по отборам PERSON_SEGMENTS (столбцы segment, role,
+        # name, count, kp_sum, imdb_sum, kp_count, imdb_count) и накопитель оценок
+        # streaming_stats.RatingsAccumulator, например из инкрементального режима
+        self.person_stats = person_stats
+        self.ratings = ratings
+
+        # Жанры в виде data_compact.EncodedList: разворачиваются без Python-списков
+        self.genre_lists = genre_lists
+
+        # Готовые счётчики год×жанр, например из инкрементального режима
+        if year_genre_counts is not None:
+            counts = year_genre_counts.sort_values(['year', 'genres'], ignore_index=True)
+            counts['genres'] = counts['genres'].astype('category')
+            self.year_genre_counts = counts[['year', 'genres', 'count']]
+
+    @cached_property
+    def rated_movies(self):
+        # Фильмы с оценкой IMDb
+        return self.df[self.df['rating.imdb'] != 0]
+
+    @cached_property
+    def genres_exploded(self):
+        # Один жанр на строку; разворачиваем только нужные столбцы
+        if self.genre_lists is not None:
+            genres = self.genre_lists.explode()
+            genres = genres[genres.index.isin(self.rated_movies.index)]
+            exploded = self.rated_movies.loc[genres.index, ['year', 'rating.kp', 'rating.imdb']]
+            exploded.insert(0, 'genres', genres.cat.remove_unused_categories().array)
+            return exploded
+
+        exploded = self.rated_movies[['genres', 'year', 'rating.kp', 'rating.imdb']].explode('genres')
+        exploded['genres'] = exploded['genres'].astype('category')
+        return exploded
+
+    @cached_property
+    def year_genre_counts(self):
+        # Количество фильмов для каждого жанра по годам
+        counts = (self.genres_exploded.groupby(['year', 'genres'], observed=True)
+                  .size().reset_index(name='count'))
+        counts['genres'] = counts['genres'].cat.remove_unused_categories()
+        return counts
+
+    @cached_property
+    def genre_trends(self):
+        # Плотная матрица «год × жанр»; строится один раз для всех окон и графиков
+        if 'year_genre_counts' in self.__dict__:
+            return GenreTrends.from_counts(self.year_genre_counts)
+        genres = self.genres_exploded['genres'].cat.remove_unused_categories()
+        return GenreTrends.from_codes(self.genres_exploded['year'], genres.cat.codes,
+                                      genres.cat.categories)
+
+    @cached_property
+    def top_genre_trends(self):
+        # Топ-15 жанров по числу лет, в которые выходили их фильмы
+        return self.genre_trends.select(self.genre_trends.top(15, by='years'))
+
+    @property
+    def top_genres(self):
+        return self.top_genre_trends.genres
+
+    def person_index(self, role):
+        # Индекс «фильм — человек» для профессии; общий для лучших и худших персон
+        if role not in self._person_indexes:
+            self._person_indexes[role] = person_index(self.df, role, self.persons)
+        return self._person_indexes[role]
+
+    @cached_property
+    def movie_ratings(self):
+        return movie_ratings(self.df)
+
+    @cached_property
+    def budget_fees(self):
+        # Фильмы, прошедшие общий отбор разделов о бюджетах
+        return self.df[budget_fees_mask(self.df)]
+
+
+def analyze_ratings_distribution(df, doc, renderer=None, ratings=None):
+    if ratings is None:
+        # Параметры для анализа оценок Кинопоиска
+        rating_kp = df['rating.kp']
+
+        # Среднее, медианное и модальное значения оценок
+        mean_rating = rating_kp.mean()
+        median_rating = rating_kp.median()
+        mode_rating = rating_kp.mode()[0]
+
+        # Проценты высоких и низких оценок
+        high_ratings_percentage = (rating_kp > 7).mean() * 100
+        low_ratings_percentage = (rating_kp < 5).mean() * 100
+
+        histogram_args = (rating_kp, None)
+    else:
+        # Те же показатели из накопителя streaming_stats.RatingsAccumulator
+        histogram = ratings.kp_histogram
+        mean_rating = ratings.kp.mean
+        median_rating = histogram.median()
+        mode_rating = histogram.mode()
+        high_ratings_percentage = ratings.kp_thresholds.share_above(7) * 100
+        low_ratings_percentage = ratings.kp_thresholds.share_below(5) * 100
+
+        # Гистограмма строится по узлам сетки с весами-частотами
+        filled = histogram.counts > 0
+        histogram_args = (histogram.values[filled], histogram.counts[filled])
 
     # Добавляем заголовок и текст в документ
     doc.add_heading("Анализ распределения оценок Кинопоиска", level=1)
@@ -27,12 +358,18 @@ def analyze_ratings_distribution(df, doc):
     doc.add_paragraph(f"Процент высоких оценок (больше 7): {high_ratings_percentage:.2f}%")
     doc.add_paragraph(f"Процент низких оценок (меньше 5): {low_ratings_percentage:.2f}%")
 
-    # Настраиваем стиль Seaborn
-    sns.set(style="darkgrid", rc={"axes.facecolor": "#1C1C1C", "grid.color": "#333333"})
+    # Строим гистограмму и добавляем её в документ
+    doc.add_heading("Гистограмма распределения оценок", level=2)
+    add_figure(doc, _plot_ratings_distribution, (*histogram_args, mean_rating),
+               renderer, width=5000000, height=3000000)
+
+def _plot_ratings_distribution(rating_kp, weights, mean_rating, target):
+    apply_base_style()
 
     # Создание гистограммы
     plt.figure(figsize=(10, 6))
-    sns.histplot(df['rating.kp'], bins=20, kde=True, color="#FF6C00", edgecolor="black", alpha=0.7)
+    sns.histplot(x=rating_kp, weights=weights, bins=20, kde=True, color="#FF6C00",
+                 edgecolor="black", alpha=0.7)
     plt.axvline(mean_rating, color="white", linestyle='--', linewidth=2, alpha=0.7,
                 label=f'Средняя оценка: {mean_rating:.2f}')
     plt.xlabel('Оценка Кинопоиска', fontsize=14, color='#FF6C00')
@@ -43,18 +380,16 @@ def analyze_ratings_distribution(df, doc):
     plt.yticks(color='#555555')
 
     # Сохранение графика в изображение
-    graph_filename = "ratings_distribution.png"
-    plt.savefig(graph_filename, facecolor="#1C1C1C", bbox_inches='tight')
+    save_figure(target, facecolor="#1C1C1C", bbox_inches='tight')
     plt.close()
 
-    # Добавляем изображение графика в документ
-    doc.add_heading("Гистограмма распределения оценок", level=2)
-    doc.add_picture(graph_filename, width=5000000, height=3000000)
-
-def compare_platform_ratings(df, doc):
+def compare_platform_ratings(df, doc, renderer=None, ratings=None, max_points=LARGE_PLOT_POINTS):
 
     # Рассчитаем коэффициент корреляции Пирсона
-    correlation, _ = pearsonr(df['rating.kp'], df['rating.imdb'])
+    if ratings is None:
+        correlation, _ = pearsonr(df['rating.kp'], df['rating.imdb'])
+    else:
+        correlation = ratings.platforms.pearson()
 
     # Добавляем заголовок и описание
     doc.add_heading("Сравнение оценок Кинопоиска и IMDb", level=1)
@@ -63,13 +398,37 @@ def compare_platform_ratings(df, doc):
     doc.add_paragraph("Ниже представлен график сравнения"
                       " оценок на двух платформах, где видна связь между ними:")
 
+    # Строим график и добавляем его в документ
+    if ratings is None:
+        plot_data = df.loc[df['rating.imdb'] != 0, ['rating.kp', 'rating.imdb']]
+        if len(plot_data) <= max_points:
+            add_figure(doc, _plot_platform_ratings, (plot_data, correlation), renderer,
+                       width=Inches(6))
+            return
+
+        # Слишком много точек: считаем плотность и линию регрессии без бутстрепа
+        histogram = FixedHistogram2D().update(plot_data['rating.kp'], plot_data['rating.imdb'])
+        regression_line = CoMoment().update(plot_data['rating.kp'],
+                                            plot_data['rating.imdb']).regression_line()
+    else:
+        # Без исходных оценок строим плотность по двумерной гистограмме
+        histogram = ratings.platforms_histogram
+        regression_line = ratings.platforms.regression_line()
+
+    add_figure(doc, _plot_platform_density,
+               (histogram.counts, histogram.edges, regression_line, correlation),
+               renderer, width=Inches(6))
+
+def _plot_platform_ratings(ratings, correlation, target):
+    apply_base_style()
+
     # Задаем стиль для графика
     plt.style.use('dark_background')
 
     # Создаем график
     plt.figure(figsize=(10, 6))
     sns.scatterplot(
-        data=df[df['rating.imdb'] != 0],
+        data=ratings,
         x='rating.kp',
         y='rating.imdb',
         color='orange',
@@ -80,7 +439,7 @@ def compare_platform_ratings(df, doc):
 
     # Добавляем трендовую линию
     sns.regplot(
-        data=df[df['rating.imdb'] != 0],
+        data=ratings,
         x='rating.kp',
         y='rating.imdb',
         scatter=False,
@@ -104,31 +463,64 @@ def compare_platform_ratings(df, doc):
     plt.ylim(0, 10)
 
     # Сохраняем график в файл изображения
-    graph_filename = "comparison_ratings.png"
-    plt.savefig(graph_filename, facecolor="#1C1C1C", bbox_inches='tight')
+    save_figure(target, facecolor="#1C1C1C", bbox_inches='tight')
     plt.close()
 
-    # Добавляем график в документ
-    doc.add_picture(graph_filename, width=Inches(6))
+def _plot_platform_density(counts, edges, regression_line, correlation, target):
+    apply_base_style()
+
+    # Задаем стиль для графика
+    plt.style.use('dark_background')
+
+    # Плотность точек: пустые ячейки не закрашиваются
+    plt.figure(figsize=(10, 6))
+    # Как у полупрозрачных оранжевых точек: редкие ячейки тёмные, плотные — яркие
+    cmap = matplotlib.colors.LinearSegmentedColormap.from_list(
+        'density', ['#3D2600', 'orange', '#FFE0B0'])
+    plt.pcolormesh(edges, edges, np.ma.masked_equal(counts.T, 0), cmap=cmap,
+                   norm=matplotlib.colors.LogNorm())
+
+    # Трендовая линия по методу наименьших квадратов
+    # Линия проводится в диапазоне оценок Кинопоиска, как у regplot
+    slope, intercept = regression_line
+    filled = np.flatnonzero(counts.sum(axis=1))
+    x = edges[[filled[0], filled[-1] + 1]] if len(filled) else edges[[0, -1]]
+    plt.plot(x, slope * x + intercept, color='#FF6C00', linewidth=2, alpha=0.8)
+
+    # Добавляем текст с коэффициентом корреляции
+    plt.text(6.0, 2.0, f"Коэффициент корреляции: {correlation:.2f}", fontsize=12, color='white')
+
+    # Настройки графика
+    plt.title('Сравнение оценок на Кинопоиске и IMDb', fontsize=16, color='white')
+    plt.xlabel('Оценка Кинопоиска', fontsize=12, color='white')
+    plt.ylabel('Оценка IMDb', fontsize=12, color='white')
+    plt.xticks(color='white')
+    plt.yticks(color='white')
+    plt.grid(True, linestyle='--', alpha=0.3)
 
-def analyze_rating_genres(df, doc):
+    # Устанавливаем одинаковый диапазон для осей X и Y
+    plt.xlim(0, 10)
+    plt.ylim(0, 10)
+
+    # Сохраняем график в файл изображения
+    save_figure(target, facecolor="#1C1C1C", bbox_inches='tight')
+    plt.close()
+
+def analyze_rating_genres(df, doc, renderer=None, context=None):
 
     # Заголовок документа
     doc.add_heading("Анализ средних рейтингов фильмов по жанрам", level=1)
     doc.add_paragraph("В этом разделе представлен анализ средних"
                       " рейтингов фильмов по жанрам на платформах Кинопоиск и IMDb.")
 
-    # Преобразуем строковые списки в реальные списки (если нужно)
-    # df['genres'] = df['genres'].apply(ast.literal_eval)
-
-    # Создаем копию датафрейма для анализа по жанрам
-    df_genres = df[df['rating.imdb'] != 0].explode('genres').copy()
+    if context is None:
+        context = AnalysisContext(df)
 
-    # Выбираем только нужные столбцы
-    df_genres = df_genres[['genres', 'rating.kp', 'rating.imdb']]
+    # Развёрнутые по жанрам фильмы общие для всех жанровых разделов
+    df_genres = context.genres_exploded
 
     # Группируем по жанрам и считаем средние значения оценок
-    genre_ratings = df_genres.groupby('genres').agg(
+    genre_ratings = df_genres.groupby('genres', observed=True).agg(
         avg_kp_rating=('rating.kp', 'mean'),
         avg_imdb_rating=('rating.imdb', 'mean')
     ).reset_index()
@@ -137,9 +529,7 @@ def analyze_rating_genres(df, doc):
     genre_counts = df_genres['genres'].value_counts()
     genre_ratings = genre_ratings[genre_ratings['genres'].
     isin(genre_counts[genre_counts >= 500].index)]
-
-    # Настройка стиля
-    plt.style.use('dark_background')
+    genre_ratings['genres'] = genre_ratings['genres'].astype(object)
 
     # Преобразуем данные для удобства визуализации
     genre_ratings_long = genre_ratings.melt(id_vars='genres',
@@ -152,6 +542,16 @@ def analyze_rating_genres(df, doc):
     # Сортируем жанры по значениям среднего рейтинга IMDb
     genre_ratings_long = genre_ratings_long.sort_values(by='value')
 
+    # Добавляем график в документ
+    doc.add_paragraph("График ниже показывает средние оценки фильмов по жанрам:")
+    add_figure(doc, _plot_rating_genres, (genre_ratings_long,), renderer, width=Inches(6))
+
+def _plot_rating_genres(genre_ratings_long, target):
+    apply_base_style()
+
+    # Настройка стиля
+    plt.style.use('dark_background')
+
     # Построение графика
     plt.figure(figsize=(14, 8))
     sns.barplot(
@@ -177,15 +577,10 @@ def analyze_rating_genres(df, doc):
     plt.grid(True, linestyle='--', alpha=0.3)
 
     # Сохраняем график в файл изображения
-    graph_filename = "genre_ratings_analysis.png"
-    plt.savefig(graph_filename, facecolor="#1C1C1C", bbox_inches='tight')
+    save_figure(target, facecolor="#1C1C1C", bbox_inches='tight')
     plt.close()
 
-    # Добавляем изображение в документ
-    doc.add_paragraph("График ниже показывает средние оценки фильмов по жанрам:")
-    doc.add_picture(graph_filename, width=Inches(6))
-
-def analyze_rating_genres_time(df, doc):
+def analyze_rating_genres_time(df, doc, renderer=None, context=None):
 
     # Добавляем заголовок
     doc.add_heading("Анализ изменения популярности жанров фильмов", level=1)
@@ -195,22 +590,23 @@ def analyze_rating_genres_time(df, doc):
         "Данные отображены на графике ниже."
     )
 
-    # Разворачиваем жанры и выбираем нужные столбцы
-    df_genres_years = df[df['rating.imdb'] != 0].explode('genres')
-    df_genres_years = df_genres_years[['genres', 'year']]
+    if context is None:
+        context = AnalysisContext(df)
 
-    # Подсчитываем количество фильмов для каждого жанра по годам
-    genre_trends = df_genres_years.groupby(['year', 'genres']).size().reset_index(name='count')
+    # Количество фильмов по годам для топ-15 жанров общее с другими разделами
+    top_genre_trends = context.top_genre_trends
+    filtered_genre_trends = top_genre_trends.to_frame()
 
-    # Получаем топ-15 жанров по общему количеству фильмов
-    top_genres = genre_trends['genres'].value_counts().head(15).index
+    # Сортируем жанры по их общему количеству фильмов
+    genre_order = top_genre_trends.order()
 
-    # Фильтруем данные для топ-15 жанров
-    filtered_genre_trends = genre_trends[genre_trends['genres'].isin(top_genres)]
+    # Добавляем описание и график в документ Word
+    doc.add_paragraph("На графике ниже представлено изменение популярности топ-15 жанров:")
+    add_figure(doc, _plot_rating_genres_time, (filtered_genre_trends, genre_order),
+               renderer, width=Inches(6))
 
-    # Сортируем жанры по их общему количеству фильмов
-    genre_order = (filtered_genre_trends.groupby('genres')['count']
-                   .sum().sort_values(ascending=False).index)
+def _plot_rating_genres_time(filtered_genre_trends, genre_order, target):
+    apply_base_style()
 
     # Построение графика
     plt.style.use('dark_background')
@@ -231,44 +627,39 @@ def analyze_rating_genres_time(df, doc):
     plt.legend(title='Жанры', loc='upper left', bbox_to_anchor=(1, 1), frameon=False)
 
     # Сохраняем график в изображение
-    graph_filename = "genre_trends_over_time.png"
     plt.tight_layout()
-    plt.savefig(graph_filename, facecolor="#1C1C1C", bbox_inches='tight')
+    save_figure(target, facecolor="#1C1C1C", bbox_inches='tight')
     plt.close()
 
-    # Добавляем описание и изображение графика в документ Word
-    doc.add_paragraph("На графике ниже представлено изменение популярности топ-15 жанров:")
-    doc.add_picture(graph_filename, width=Inches(6))
-
-def analyze_rating_genres_trends(df, doc):
-    doc.add_heading("Изменение популярности топ-15 жанров фильмов с 2000 по 2020 год", level=1)
+def analyze_rating_genres_trends(df, doc, renderer=None, context=None, start_year=2000,
+                                 end_year=2020):
+    doc.add_heading(f"Изменение популярности топ-15 жанров фильмов с {start_year} по {end_year} год",
+                    level=1)
     doc.add_paragraph(
         "В этом анализе представлена динамика изменения"
         " количества фильмов для топ-15 жанров "
-        "за период с 2000 по 2020 год. График ниже демонстрирует"
+        f"за период с {start_year} по {end_year} год. График ниже демонстрирует"
         " распределение популярности жанров по годам."
     )
 
-    # Разворачиваем жанры и выбираем нужные столбцы
-    df_genres_years = df[df['rating.imdb'] != 0].explode('genres')
-    df_genres_years = df_genres_years[['genres', 'year']]
+    if context is None:
+        context = AnalysisContext(df)
 
-    # Подсчитываем количество фильмов для каждого жанра по годам
-    genre_trends = df_genres_years.groupby(['year', 'genres']).size().reset_index(name='count')
+    # Топ-15 жанров за нужный диапазон лет: срез общей матрицы «год × жанр»
+    window = context.top_genre_trends.window(start_year, end_year)
+    filtered_genre_trends = window.to_frame()
 
-    # Получаем топ-15 жанров по общему количеству фильмов
-    top_genres = genre_trends['genres'].value_counts().head(15).index
+    # Сортируем жанры по общему количеству фильмов
+    genre_order = window.order()
 
-    # Фильтруем данные для топ-15 жанров и нужного временного диапазона
-    filtered_genre_trends = genre_trends[
-        (genre_trends['genres'].isin(top_genres)) &
-        (genre_trends['year'] >= 2000) &
-        (genre_trends['year'] <= 2020)
-    ]
+    # Добавляем описание и график в документ Word
+    doc.add_paragraph("График изменения популярности жанров:")
+    add_figure(doc, _plot_rating_genres_trends,
+               (filtered_genre_trends, genre_order, start_year, end_year),
+               renderer, width=Inches(6))
 
-    # Сортируем жанры по общему количеству фильмов
-    genre_order = (filtered_genre_trends.groupby('genres')['count']
-                   .sum().sort_values(ascending=False).index)
+def _plot_rating_genres_trends(filtered_genre_trends, genre_order, start_year, end_year, target):
+    apply_base_style()
 
     # Построение графика
     plt.style.use('dark_background')
@@ -280,7 +671,7 @@ def analyze_rating_genres_trends(df, doc):
 
     # Настройка графика
     plt.title('Изменение популярности топ-15 жанров фильмов'
-              ' с 2000 по 2020 год', fontsize=16, color='white')
+              f' с {start_year} по {end_year} год', fontsize=16, color='white')
     plt.xlabel('Год', fontsize=12, color='white')
     plt.ylabel('Количество фильмов', fontsize=12, color='white')
     plt.xticks(color='white', fontsize=10)
@@ -289,16 +680,38 @@ def analyze_rating_genres_trends(df, doc):
     plt.legend(title='Жанры', loc='upper left', bbox_to_anchor=(1, 1), frameon=False)
 
     # Сохраняем график как изображение
-    graph_filename = "top_genre_trends.png"
     plt.tight_layout()
-    plt.savefig(graph_filename, facecolor="#1C1C1C", bbox_inches='tight')
+    save_figure(target, facecolor="#1C1C1C", bbox_inches='tight')
     plt.close()
 
-    # Добавляем описание и изображение в документ Word
-    doc.add_paragraph("График изменения популярности жанров:")
-    doc.add_picture(graph_filename, width=Inches(6))
 
-def analyze_budgets(df, doc):
+def downsample(data, max_points, seed=0):
+    """
+    Детерминированная случайная выборка строк для точечного графика.
+
+    :param data: DataFrame с точками графика
+    :param max_points: Максимальное число точек
+    :param seed: Зерно выборки; при одинаковых данных выборка одна и та же
+    :return: Не более max_points строк в исходном порядке
+    """
+    if len(data) <= max_points:
+        return data
+    return data.sample(n=max_points, random_state=seed).sort_index()
+
+
+def budget_fees_mask(df):
+    """
+    Общий отбор фильмов для разделов о бюджетах: бюджет и мировые сборы
+    больше 50000 рублей и больше 1000 голосов на Кинопоиске.
+
+    :return: Булев массив длиной len(df); пропуски (например, в Int32 столбцах
+        компактного режима) считаются невыполненным условием
+    """
+    return ((df['budget_rub'] > 50000) & (df['fees_rub_world'] > 50000) &
+            (df['votes.kp'] > 1000)).to_numpy(dtype=bool, na_value=False)
+
+
+def analyze_budgets(df, doc, renderer=None, max_points=LARGE_PLOT_POINTS, context=None):
     doc.add_heading("Анализ бюджетов и мировых сборов фильмов", level=1)
     doc.add_paragraph(
         "В данном анализе представлены данные о фильмах с"
@@ -308,30 +721,26 @@ def analyze_budgets(df, doc):
     )
 
     # Фильтруем строки, где бюджет и сборы слишком маленькие или нулевые
-    df_budget_fees = df[
-        (df['budget_rub'] > 50000) &
-        (df['fees_rub_world'] > 50000) &
-        (df['votes.kp'] > 1000)
-    ]
+    df_budget_fees = context.budget_fees if context is not None else df[budget_fees_mask(df)]
 
     # Добавляем отфильтрованные данные в документ Word
     doc.add_heading("Отфильтрованные данные (первые строки):", level=2)
     filtered_data_table = df_budget_fees[['budget_rub', 'fees_rub_world', 'votes.kp']].head()
 
     # Добавляем таблицу с первыми строками
-    table = doc.add_table(rows=1, cols=len(filtered_data_table.columns))
-    table.style = 'Table Grid'
+    add_dataframe_table(doc, filtered_data_table)
 
-    # Добавляем заголовки столбцов
-    hdr_cells = table.rows[0].cells
-    for idx, column_name in enumerate(filtered_data_table.columns):
-        hdr_cells[idx].text = column_name
+    # Добавляем график пузырьков в документ Word
+    doc.add_heading("График пузырьков:", level=2)
+    doc.add_paragraph("На графике представлен анализ зависимости"
+                      " между бюджетами фильмов и их мировыми сборами.")
+    bubbles = downsample(df_budget_fees[['budget_rub', 'fees_rub_world', 'votes.kp']], max_points)
+    add_figure(doc, _plot_budgets, (bubbles,), renderer, width=Inches(6))
 
-    # Добавляем строки с данными
-    for _, row in filtered_data_table.iterrows():
-        row_cells = table.add_row().cells
-        for idx, value in enumerate(row):
-            row_cells[idx].text = str(value)
+def _plot_budgets(df_budget_fees, target):
+    # В полном отчёте график строится после жанровых разделов и наследовал их стиль
+    apply_base_style()
+    plt.style.use('dark_background')
 
     # Строим график пузырьков
     plt.figure(figsize=(10, 6))
@@ -353,248 +762,367 @@ def analyze_budgets(df, doc):
     plt.title('График пузырьков: Бюджет фильмов и мировые сборы (фильтр выбросов)', fontsize=16)
     plt.xlabel('Бюджет', fontsize=12)
     plt.ylabel('Мировые сборы', fontsize=12)
-
     # Сохраняем график как изображение
-    graph_filename = "bubble_chart_budget_vs_fees.png"
     plt.tight_layout()
-    plt.savefig(graph_filename, bbox_inches='tight', facecolor="white")
+    save_figure(target, bbox_inches='tight', facecolor="white")
     plt.close()
 
-    # Добавляем график в документ Word
-    doc.add_heading("График пузырьков:", level=2)
-    doc.add_paragraph("На графике представлен анализ зависимости"
-                      " между бюджетами фильмов и их мировыми сборами.")
-    doc.add_picture(graph_filename, width=Inches(6))
-
-
-def analyze_budgets_and_fees(df, doc):
-    pd.set_option('display.max_columns', None)  # Показывать все столбцы
-    pd.set_option('display.width', 1000)  # Увеличить ширину вывода
-
-    doc.add_heading("Анализ бюджетов и сборов фильмов", level=1)
 
-    # Фильтруем строки, где бюджет и сборы слишком маленькие или нулевые
-    df_budget_fees = df[
-        (df['budget_rub'] > 50000) &
-        (df['fees_rub_world'] > 50000) &
-        (df['votes.kp'] > 1000)
-    ].copy()
-
-    # Добавляем новый столбец для разницы между сборами и бюджетом
-    df_budget_fees.loc[:, 'fee_budget_diff'] = df_budget_fees['fees_rub_world'] - df_budget_fees['budget_rub']
-
-    # Категории фильмов
-    high_budget_high_fees = df_budget_fees[
-        (df_budget_fees['budget_rub'] > 1e8) & (df_budget_fees['fees_rub_world'] > 1e9)
-    ].sort_values(by='fee_budget_diff', ascending=True)
-
-    high_budget_low_fees = df_budget_fees[
-        (df_budget_fees['budget_rub'] > 1e8) & (df_budget_fees['fees_rub_world'] < 1e6)
-    ].sort_values(by='fee_budget_diff', ascending=False)
-
-    low_budget_high_fees = df_budget_fees[
-        (df_budget_fees['budget_rub'] < 1e6) & (df_budget_fees['fees_rub_world'] > 1e7)
-    ].sort_values(by='fee_budget_diff', ascending=False)
-
-    low_budget_low_fees = df_budget_fees[
-        (df_budget_fees['budget_rub'] < 1e6) & (df_budget_fees['fees_rub_world'] < 1e6)
-    ].sort_values(by='fee_budget_diff', ascending=True)
-
-    # Функция для добавления данных в Word-документ
-    def add_movies_to_doc(title, data, doc):
-        doc.add_heading(title, level=2)
-        table = doc.add_table(rows=1, cols=len(data.columns))
-        table.style = 'Table Grid'
-
-        # Добавляем заголовки
-        hdr_cells = table.rows[0].cells
-        for idx, column_name in enumerate(data.columns):
-            hdr_cells[idx].text = column_name
-
-        # Добавляем строки
-        for _, row in data.iterrows():
-            row_cells = table.add_row().cells
-            for idx, value in enumerate(row):
-                row_cells[idx].text = str(value)
-
-        doc.add_paragraph()  # Пустая строка
 
-    # Добавляем категории фильмов в документ
-    add_movies_to_doc("Фильмы с большим бюджетом и большими сборами:",
-                      high_budget_high_fees[['name', 'genres', 'year', 'budget_rub',
-                                             'fees_rub_world', 'rating.kp', 'rating.imdb']].head(5), doc)
+# Категории фильмов по бюджету и сборам: заголовок, границы бюджета, границы
+# мировых сборов (обе строгие) и порядок по разнице сборов и бюджета.
+# Категории не должны пересекаться: фильм относится к первой подходящей
+BUDGET_FEES_CATEGORIES = [
+    ("Фильмы с большим бюджетом и большими сборами:", (1e8, np.inf), (1e9, np.inf), True),
+    ("Фильмы с большим бюджетом, но маленькими сборами:", (1e8, np.inf), (-np.inf, 1e6), False),
+    ("Фильмы с маленьким бюджетом, но большими сборами:", (-np.inf, 1e6), (1e7, np.inf), False),
+    ("Фильмы с маленьким бюджетом и маленькими сборами:", (-np.inf, 1e6), (-np.inf, 1e6), True),
+]
 
-    add_movies_to_doc("Фильмы с большим бюджетом, но маленькими сборами:",
-                      high_budget_low_fees[['name', 'genres', 'year', 'budget_rub',
-                                            'fees_rub_world', 'rating.kp', 'rating.imdb']].head(5), doc)
+# Столбцы таблиц с фильмами каждой категории
+BUDGET_FEES_COLUMNS = ['name', 'genres', 'year', 'budget_rub', 'fees_rub_world',
+                       'rating.kp', 'rating.imdb']
 
-    add_movies_to_doc("Фильмы с маленьким бюджетом, но большими сборами:",
-                      low_budget_high_fees[['name', 'genres', 'year', 'budget_rub',
-                                            'fees_rub_world', 'rating.kp', 'rating.imdb']].head(5), doc)
 
-    add_movies_to_doc("Фильмы с маленьким бюджетом и маленькими сборами:",
-       low_budget_low_fees[['name', 'genres', 'year', 'budget_rub',
-       'fees_rub_world', 'rating.kp', 'rating.imdb']].head(5), doc)
+def classify_budget_fees(budget, fees, categories=BUDGET_FEES_CATEGORIES):
+    """
+    Номер категории (см. BUDGET_FEES_CATEGORIES) для каждого фильма.
 
+    :param budget: Массив бюджетов
+    :param fees: Массив мировых сборов
+    :param categories: Категории в формате BUDGET_FEES_CATEGORIES
+    :return: Массив номеров категорий; -1 — фильм не попал ни в одну
+    """
+    conditions = [(budget > budget_low) & (budget < budget_high) &
+                  (fees > fees_low) & (fees < fees_high)
+                  for _, (budget_low, budget_high), (fees_low, fees_high), _ in categories]
+    return np.select(conditions, np.arange(len(categories)), default=-1)
 
-def analyze_top_persons(df, doc):
-    doc.add_heading("Анализ лучших актёров и режиссёров", level=1)
-
-    # Фильтруем фильмы с высокими оценками
-    high_rating_movies = df[(df['rating.kp'] > 7.5) | (df['rating.imdb'] > 7.5)]
-
-    # Разделяем список актёров и режиссёров
-    actors_df = high_rating_movies.explode('actors')
-    directors_df = high_rating_movies.explode('directors')
-
-    # Подсчитываем средние рейтинги фильмов для каждого актёра
-    actor_ratings = actors_df.groupby('actors').agg(
-        avg_kp_rating=('rating.kp', 'mean'),
-        avg_imdb_rating=('rating.imdb', 'mean')
-    ).reset_index()
-
-    # Сортируем актёров по среднему рейтингу
-    actor_ratings_sorted = actor_ratings.sort_values(by=['avg_kp_rating',
-        'avg_imdb_rating'], ascending=False)
 
-    # Топ-10 актёров с самыми высокими рейтингами
-    top_actors_high_rating = actor_ratings_sorted.head(10)
-    top_actors_high_rating.columns = ['actor', 'avg_kp_rating', 'avg_imdb_rating']
+def analyze_budgets_and_fees(df, doc, context=None, top=5):
+    pd.set_option('display.max_columns', None)  # Показывать все столбцы
+    pd.set_option('display.width', 1000)  # Увеличить ширину вывода
 
-    # Подсчитываем средние рейтинги фильмов для каждого режиссёра
-    director_ratings = directors_df.groupby('directors').agg(
-        avg_kp_rating=('rating.kp', 'mean'),
-        avg_imdb_rating=('rating.imdb', 'mean')
-    ).reset_index()
+    doc.add_heading("Анализ бюджетов и сборов фильмов", level=1)
 
-    # Сортируем режиссёров по среднему рейтингу
-    director_ratings_sorted = director_ratings.sort_values(by=['avg_kp_rating', 'avg_imdb_rating'],
-                                                           ascending=False)
+    # Фильтруем строки, где бюджет и сборы слишком маленькие или нулевые
+    df_budget_fees = context.budget_fees if context is not None else df[budget_fees_mask(df)]
+    budget = df_budget_fees['budget_rub'].to_numpy(dtype=float)
+    fees = df_budget_fees['fees_rub_world'].to_numpy(dtype=float)
 
-    # Топ-10 режиссёров с самыми высокими рейтингами
-    top_directors_high_rating = director_ratings_sorted.head(10)
-    top_directors_high_rating.columns = ['director', 'avg_kp_rating', 'avg_imdb_rating']
+    # Категория каждого фильма и лучшие по разнице сборов и бюджета в каждой категории
+    categories = classify_budget_fees(budget, fees)
+    ascending = [category[3] for category in BUDGET_FEES_CATEGORIES]
+    selected = grouped_top_k(categories, fees - budget, top, ascending)
 
-    # Функция для добавления таблицы в Word
-    def add_table_to_doc(title, dataframe, doc):
+    for (title, *_), positions in zip(BUDGET_FEES_CATEGORIES, selected):
         doc.add_heading(title, level=2)
-        table = doc.add_table(rows=1, cols=len(dataframe.columns))
-        table.style = 'Table Grid'
-
-        # Заголовки таблицы
-        hdr_cells = table.rows[0].cells
-        for idx, column_name in enumerate(dataframe.columns):
-            hdr_cells[idx].text = column_name
-
-        # Заполнение таблицы данными
-        for _, row in dataframe.iterrows():
-            row_cells = table.add_row().cells
-            for idx, value in enumerate(row):
-                row_cells[idx].text = str(round(value, 2) if isinstance(value, (float, int)) else value)
-
-        doc.add_paragraph()  # Пустая строка для разделения
-
-    # Добавляем топ-10 актёров
-    add_table_to_doc("Топ-10 актёров с самыми высокими рейтингами:",
-                     top_actors_high_rating, doc)
-
-    # Добавляем топ-10 режиссёров
-    add_table_to_doc("Топ-10 режиссёров с самыми высокими рейтингами:",
-                     top_directors_high_rating, doc)
-
+        add_dataframe_table(doc, df_budget_fees[BUDGET_FEES_COLUMNS].iloc[positions])
+        doc.add_paragraph()  # Пустая строка
 
-def analyze_low_persons(df, doc):
-    doc.add_heading("Анализ актёров и режиссёров с низкими рейтингами", level=1)
 
-    # Фильтруем фильмы с низкими оценками
-    low_rating_movies = df[(df['rating.kp'] < 5.5) | (df['rating.imdb'] < 5.5)]
+# Столбцы со списками имён для каждой профессии (если нет таблицы персон)
+ROLE_COLUMNS = {'actor': 'actors', 'director': 'directors'}
+
+def person_index(movies, role, persons=None):
+    """
+    Строит индекс «фильм — человек» для профессии.
+
+    :param movies: DataFrame с фильмами
+    :param role: Профессия ('actor' или 'director')
+    :param persons: Таблица персон из prepare_data(return_persons=True);
+        если не передана, используются списки из столбцов actors/directors
+    :return: person_ranking.PersonIndex
+    """
+    if persons is None:
+        return PersonIndex.from_lists(movies, ROLE_COLUMNS[role])
+    return PersonIndex.from_persons(movies, persons, role)
+
+
+def person_ratings(movies, role, persons=None):
+    """
+    Считает средние оценки фильмов для каждого человека заданной профессии.
+
+    :param movies: DataFrame с фильмами (id, rating.kp, rating.imdb)
+    :param role: Профессия ('actor' или 'director')
+    :param persons: Таблица персон из prepare_data(return_persons=True);
+        если не передана, используются списки из столбцов actors/directors
+    :return: DataFrame со столбцами name, avg_kp_rating, avg_imdb_rating
+    """
+    index = person_index(movies, role, persons)
+    counts, _, _, means = index.aggregate(movie_ratings(movies))
+    present = np.flatnonzero(counts)
+    return pd.DataFrame({
+        'name': index.names[present],
+        'avg_kp_rating': means[present, 0],
+        'avg_imdb_rating': means[present, 1],
+    })
 
-    # Разделяем список актёров и режиссёров
-    actors_df = low_rating_movies.explode('actors')
-    directors_df = low_rating_movies.explode('directors')
 
-    # Подсчитываем средние рейтинги фильмов для каждого актёра
-    actor_ratings = actors_df.groupby('actors').agg(
-        avg_kp_rating=('rating.kp', 'mean'),
-        avg_imdb_rating=('rating.imdb', 'mean')
-    ).reset_index()
+# Отборы фильмов разделов о персонах: лучшие — среди фильмов с высокими оценками,
+# худшие — среди фильмов с низкими
+PERSON_SEGMENTS = {
+    'high': lambda df: ((df['rating.kp'] > 7.5) | (df['rating.imdb'] > 7.5)).to_numpy(),
+    'low': lambda df: ((df['rating.kp'] < 5.5) | (df['rating.imdb'] < 5.5)).to_numpy(),
+}
 
-    # Сортируем актёров по среднему рейтингу от низкого к высокому
-    actor_ratings_sorted = actor_ratings.sort_values(by=['avg_kp_rating', 'avg_imdb_rating'], ascending=True)
 
-    # Топ-10 актёров с самыми низкими рейтингами
-    top_actors_low_rating = actor_ratings_sorted.head(10)
-    top_actors_low_rating.columns = ['actor', 'avg_kp_rating', 'avg_imdb_rating']
+def _rank_persons(df, role, segment, largest, persons, context, min_films, prior_weight):
+    # Десять лучших (или худших) человек среди фильмов отбора segment
+    if context is not None and context.person_stats is not None:
+        # Суммы оценок уже посчитаны: таблицы фильмов и персон не просматриваются
+        stats = context.person_stats
+        stats = stats[(stats['segment'] == segment) & (stats['role'] == role)].sort_values('name')
+        ranking = rank_sums(stats['name'].to_numpy(), stats['count'].to_numpy(),
+                            stats[['kp_sum', 'imdb_sum']].to_numpy(dtype=float),
+                            stats[['kp_count', 'imdb_count']].to_numpy(), k=10, largest=largest,
+                            min_films=min_films, prior_weight=prior_weight)
+        return ranking.drop(columns='films').rename(columns={'name': role})
 
-    # Подсчитываем средние рейтинги фильмов для каждого режиссёра
-    director_ratings = directors_df.groupby('directors').agg(
-        avg_kp_rating=('rating.kp', 'mean'),
-        avg_imdb_rating=('rating.imdb', 'mean')
-    ).reset_index()
+    if context is not None:
+        index, ratings = context.person_index(role), context.movie_ratings
+    else:
+        index, ratings = person_index(df, role, persons), movie_ratings(df)
+    ranking = index.rank(ratings, PERSON_SEGMENTS[segment](df), k=10, largest=largest,
+                         min_films=min_films, prior_weight=prior_weight)
+    return ranking.drop(columns='films').rename(columns={'name': role})
 
-    # Сортируем режиссёров по среднему рейтингу от низкого к высокому
-    director_ratings_sorted = director_ratings.sort_values(by=['avg_kp_rating',
-                                                               'avg_imdb_rating'], ascending=True)
 
-    # Топ-10 режиссёров с самыми низкими рейтингами
-    top_directors_low_rating = director_ratings_sorted.head(10)
-    top_directors_low_rating.columns = ['director', 'avg_kp_rating', 'avg_imdb_rating']
+def _add_person_table(title, dataframe, doc):
+    doc.add_heading(title, level=2)
+    add_dataframe_table(doc, dataframe, _round_value)
+    doc.add_paragraph()  # Пустая строка для разделения
 
-    # Функция для добавления таблицы в Word
-    def add_table_to_doc(title, dataframe, doc):
-        doc.add_heading(title, level=2)
-        table = doc.add_table(rows=1, cols=len(dataframe.columns))
-        table.style = 'Table Grid'
 
-        # Заголовки таблицы
-        hdr_cells = table.rows[0].cells
-        for idx, column_name in enumerate(dataframe.columns):
-            hdr_cells[idx].text = column_name
+def analyze_top_persons(df, doc, persons=None, context=None, min_films=MIN_PERSON_FILMS,
+                        prior_weight=0):
+    doc.add_heading("Анализ лучших актёров и режиссёров", level=1)
 
-        # Заполнение таблицы данными
-        for _, row in dataframe.iterrows():
-            row_cells = table.add_row().cells
-            for idx, value in enumerate(row):
-                row_cells[idx].text = str(round(value, 2) if isinstance(value, (float, int)) else value)
+    # Топ-10 актёров и режиссёров с самыми высокими средними рейтингами фильмов
+    # среди фильмов с высокими оценками
+    top_actors_high_rating = _rank_persons(df, 'actor', 'high', True, persons, context,
+                                           min_films, prior_weight)
+    top_directors_high_rating = _rank_persons(df, 'director', 'high', True, persons,
+                                              context, min_films, prior_weight)
 
-        doc.add_paragraph()  # Пустая строка для разделения
+    _add_person_table("Топ-10 актёров с самыми высокими рейтингами:",
+                      top_actors_high_rating, doc)
+    _add_person_table("Топ-10 режиссёров с самыми высокими рейтингами:",
+                      top_directors_high_rating, doc)
 
-    # Добавляем топ-10 актёров с низкими рейтингами
-    add_table_to_doc("Топ-10 актёров с самыми низкими рейтингами:",
-                     top_actors_low_rating, doc)
 
-    # Добавляем топ-10 режиссёров с низкими рейтингами
-    add_table_to_doc("Топ-10 режиссёров с самыми низкими рейтингами:",
-                     top_directors_low_rating, doc)
+def analyze_low_persons(df, doc, persons=None, context=None, min_films=MIN_PERSON_FILMS,
+                        prior_weight=0):
+    doc.add_heading("Анализ актёров и режиссёров с низкими рейтингами", level=1)
 
-def analyze_all(df):
+    # Топ-10 актёров и режиссёров с самыми низкими средними рейтингами фильмов
+    # среди фильмов с низкими оценками
+    top_actors_low_rating = _rank_persons(df, 'actor', 'low', False, persons, context,
+                                          min_films, prior_weight)
+    top_directors_low_rating = _rank_persons(df, 'director', 'low', False, persons,
+                                             context, min_films, prior_weight)
+
+    _add_person_table("Топ-10 актёров с самыми низкими рейтингами:",
+                      top_actors_low_rating, doc)
+    _add_person_table("Топ-10 режиссёров с самыми низкими рейтингами:",
+                      top_directors_low_rating, doc)
+
+# Разделы отчёта в порядке следования и столбцы подготовленных данных, которые им нужны
+REPORT_SECTIONS = {
+    'ratings_distribution': ['rating.kp'],
+    'platform_ratings': ['rating.kp', 'rating.imdb'],
+    'rating_genres': ['genres', 'year', 'rating.kp', 'rating.imdb'],
+    'rating_genres_time': ['genres', 'year', 'rating.kp', 'rating.imdb'],
+    'rating_genres_trends': ['genres', 'year', 'rating.kp', 'rating.imdb'],
+    'budgets': ['budget_rub', 'fees_rub_world', 'votes.kp'],
+    'budgets_and_fees': ['name', 'genres', 'year', 'budget_rub', 'fees_rub_world',
+                         'rating.kp', 'rating.imdb', 'votes.kp'],
+    'top_persons': ['id', 'rating.kp', 'rating.imdb'],
+    'low_persons': ['id', 'rating.kp', 'rating.imdb'],
+}
+
+# Разделы, которым нужны персоны: таблица персон или столбцы actors и directors
+PERSON_SECTIONS = ['top_persons', 'low_persons']
+
+# Версия разделов отчёта для ключей кэша разделов (section_cache);
+# увеличивается при изменении содержимого или оформления разделов
+SECTION_VERSION = 1
+
+
+def required_columns(sections=None, with_persons=True):
+    """
+    Столбцы подготовленных данных, нужные выбранным разделам отчёта.
+
+    :param sections: Имена разделов из REPORT_SECTIONS или None для всех
+    :param with_persons: Будет ли передана таблица персон; иначе разделам
+        о персонах нужны столбцы actors и directors
+    :return: Список столбцов без повторов
+    """
+    if sections is None:
+        sections = list(REPORT_SECTIONS)
+    columns = []
+    for section in sections:
+        columns.extend(REPORT_SECTIONS[section])
+        if section in PERSON_SECTIONS and not with_persons:
+            columns.extend(ROLE_COLUMNS.values())
+    return list(dict.fromkeys(columns))
+
+
+def build_report(doc, renderer, df, persons=None, context=None, ratings=None,
+                 max_points=LARGE_PLOT_POINTS, sections=None, min_films=MIN_PERSON_FILMS,
+                 prior_weight=0, section_cache=None):
+    """
+    Добавляет в документ выбранные разделы отчёта в порядке REPORT_SECTIONS.
+
+    Графики передаются в renderer; при параллельном построении они вставляются
+    в документ только после renderer.finish().
+
+    :param doc: Документ Word
+    :param renderer: FigureRenderer или InlineFigureRenderer
+    :param sections: Имена разделов из REPORT_SECTIONS или None для всех
+    :param section_cache: SectionCache или None. С кэшем каждый раздел строится
+        в отдельном документе и переносится в doc после renderer.finish(),
+        а разделы, входные столбцы и параметры которых не изменились, берутся из кэша
+    :return: AnalysisContext, общий для разделов (его можно переиспользовать)
+    """
+    # Общие промежуточные данные для всех разделов отчёта; считаются по требованию,
+    # поэтому без жанровых разделов агрегаты по жанрам не вычисляются
+    if context is None:
+        context = AnalysisContext(df, persons=persons)
+    elif context.persons is None:
+        context.persons = persons
+    if ratings is None:
+        # Накопитель оценок из контекста (например, из инкрементального режима)
+        ratings = context.ratings
+
+    section_runners = {
+        # test_analyze_ratings_distribution
+        'ratings_distribution': lambda target: analyze_ratings_distribution(df, target, renderer,
+                                                                            ratings),
+        # test_compare_platform_ratings
+        'platform_ratings': lambda target: compare_platform_ratings(df, target, renderer, ratings,
+                                                                    max_points),
+        # test_analyze_rating_genres
+        'rating_genres': lambda target: analyze_rating_genres(df, target, renderer, context),
+        # test_analyze_rating_genres_time
+        'rating_genres_time': lambda target: analyze_rating_genres_time(df, target, renderer,
+                                                                        context),
+        # test_analyze_rating_genres_trends
+        'rating_genres_trends': lambda target: analyze_rating_genres_trends(df, target, renderer,
+                                                                            context),
+        # test_analyze_budgets
+        'budgets': lambda target: analyze_budgets(df, target, renderer, max_points, context),
+        # test_analyze_budgets_and_fees
+        'budgets_and_fees': lambda target: analyze_budgets_and_fees(df, target, context),
+        # test_analyze_top_persons
+        'top_persons': lambda target: analyze_top_persons(df, target, persons, context, min_films,
+                                                          prior_weight),
+        # test_analyze_low_persons
+        'low_persons': lambda target: analyze_low_persons(df, target, persons, context, min_films,
+                                                          prior_weight),
+    }
+
+    # Разделы выводятся в порядке отчёта независимо от порядка в sections
+    selected = set(REPORT_SECTIONS if sections is None else sections)
+    names = [name for name in REPORT_SECTIONS if name in selected]
+    rows = len(df) if df is not None else None
+
+    if section_cache is None:
+        for name in names:
+            with stage(name, rows=rows):
+                section_runners[name](doc)
+        return context
+
+    section_key = _section_keys(section_cache, df, persons, renderer, ratings, max_points,
+                                min_films, prior_weight)
+    parts = []
+    for name in names:
+        with stage(name, rows=rows):
+            key = section_key(name)
+            fragment = section_cache.load(key) if key is not None else None
+            scratch = None
+            if fragment is None:
+                scratch = Document()
+                section_runners[name](scratch)
+            parts.append((key, scratch, fragment))
+
+    # Изображения построенных разделов готовы только после finish()
+    renderer.finish()
+    for key, scratch, fragment in parts:
+        if fragment is None:
+            fragment = section_cache.capture(scratch)
+            if key is not None:
+                section_cache.save(key, fragment)
+        section_cache.append(doc, fragment)
+    return context
+
+
+def _section_keys(section_cache, df, persons, renderer, ratings, max_points, min_films,
+                  prior_weight):
+    """
+    Функция name -> ключ раздела в section_cache (None — раздел не кэшируется).
+
+    Отпечаток каждого столбца считается один раз на отчёт.
+    """
+    fingerprints = {}
+    parameters = {
+        'platform_ratings': {'max_points': max_points},
+        'budgets': {'max_points': max_points},
+        'top_persons': {'min_films': min_films, 'prior_weight': prior_weight},
+        'low_persons': {'min_films': min_films, 'prior_weight': prior_weight},
+    }
+
+    def column_fingerprints(label, frame, columns):
+        for column in columns:
+            if (label, column) not in fingerprints:
+                fingerprints[label, column] = section_cache.fingerprint(frame[column])
+        return {f"{label}:{column}": fingerprints[label, column] for column in columns}
+
+    def section_key(name):
+        # Потоковые агрегаты оценок не привязаны к столбцам, такие разделы строятся заново
+        if df is None or (ratings is not None and name in ('ratings_distribution',
+                                                            'platform_ratings')):
+            return None
+        columns = column_fingerprints(
+            'movies', df, required_columns([name], with_persons=persons is not None))
+        if name in PERSON_SECTIONS and persons is not None:
+            columns.update(column_fingerprints('persons', persons, list(persons.columns)))
+        params = {
+            'version': SECTION_VERSION,
+            'figure_format': getattr(renderer, 'image_format', None),
+            'figure_dpi': getattr(renderer, 'dpi', None),
+            **parameters.get(name, {}),
+        }
+        return section_cache.key(name, columns, params)
+
+    return section_key
+
+
+def analyze_all(df, persons=None, workers=1, context=None, ratings=None,
+                max_points=LARGE_PLOT_POINTS, sections=None, output_path="analysis_result.docx",
+                min_films=MIN_PERSON_FILMS, prior_weight=0, figure_format=FIGURE_FORMAT,
+                figure_dpi=FIGURE_DPI, section_cache=None):
     doc = Document()
 
-    # test_analyze_ratings_distribution
-    analyze_ratings_distribution(df, doc)
-
-    # test_compare_platform_ratings
-    compare_platform_ratings(df, doc)
-
-    # test_analyze_rating_genres
-    analyze_rating_genres(df, doc)
-
-    # test_analyze_rating_genres_time
-    analyze_rating_genres_time(df, doc)
-
-    # test_analyze_rating_genres_trends
-    analyze_rating_genres_trends(df, doc)
-
-    # test_analyze_budgets
-    analyze_budgets(df, doc)
-
-    # test_analyze_budgets_and_fees
-    analyze_budgets_and_fees(df, doc)
-
-    # test_analyze_top_persons
-    analyze_top_persons(df, doc)
-
-    # test_analyze_low_persons
-    analyze_low_persons(df, doc)
-
-    doc.save("analysis_result.docx")
\ No newline at end of file
+    # При workers > 1 графики строятся параллельно в пуле процессов;
+    # изображения в любом случае передаются в документ из памяти
+    if workers > 1:
+        renderer = FigureRenderer(workers, figure_format, figure_dpi)
+    else:
+        renderer = InlineFigureRenderer(figure_format, figure_dpi)
+
+    try:
+        build_report(doc, renderer, df, persons, context, ratings, max_points, sections,
+                     min_films, prior_weight, section_cache)
+
+        with stage('render'):
+            renderer.finish()
+    except BaseException:
+        # Ошибка в разделе не должна оставлять рабочие процессы пула
+        renderer.close()
+        raise
+
+    # output_path может быть и путём, и файловым объектом (например, io.BytesIO)
+    with stage('save'):
+        doc.save(output_path)
+    return output_path
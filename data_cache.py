@@ -0,0 +1,216 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import pandas as pd
+
+from data_fetching import fetch_raw_lines, fetch_raw_lines_from_streams, lines_to_dataframe
+from data_preparation import EXCHANGE_RATES, PREP_VERSION, prepare_data, source_columns
+
+# Каталог кэша подготовленных данных и его предельный размер
+CACHE_DIR = os.getenv("DATA_CACHE_DIR", os.path.join(".cache", "prepared"))
+CACHE_MAX_BYTES = int(os.getenv("DATA_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+
+# Файл с описанием записи кэша; пишется последним и служит признаком её целостности
+META_FILE = "meta.json"
+
+
+def lines_fingerprint(lines):
+    """
+    Считает SHA-256 по сырым строкам источника.
+
+    :param lines: Итерируемый набор строк (bytes или str)
+    :return: Шестнадцатеричная строка хэша
+    """
+    digest = hashlib.sha256()
+    for line in lines:
+        digest.update(line if isinstance(line, bytes) else line.encode('utf-8'))
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+
+def cache_key(fingerprint, columns=None, with_persons=True):
+    """
+    Формирует ключ кэша из хэша источника, версии подготовки данных, курсов валют
+    и набора подготовленных столбцов.
+
+    :param fingerprint: Хэш сырых данных источника
+    :param columns: Подготовленные столбцы (см. prepare_data) или None для всех
+    :param with_persons: Хранится ли в записи таблица персон
+    :return: Шестнадцатеричная строка ключа
+    """
+    parts = {
+        'source': fingerprint,
+        'prep_version': PREP_VERSION,
+        'exchange_rates': EXCHANGE_RATES,
+    }
+    if columns is not None or not with_persons:
+        # Ключ полной записи не меняется, чтобы старые записи оставались действительными
+        parts['columns'] = columns
+        parts['persons'] = with_persons
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _list_columns(df):
+    """
+    Возвращает object-столбцы, в которых встречаются списки.
+    Parquet не хранит смесь списков и строк ('неизвестно'), поэтому такие
+    столбцы сохраняются в виде JSON-строк.
+    """
+    return [col for col in df.columns
+            if df[col].dtype == object and df[col].map(lambda x: isinstance(x, list)).any()]
+
+
+def _entry_path(key, cache_dir):
+    return os.path.join(cache_dir, key)
+
+
+def _entry_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def load_prepared(key, cache_dir=CACHE_DIR):
+    """
+    Загружает подготовленные данные из кэша.
+
+    :param key: Ключ кэша (см. cache_key)
+    :param cache_dir: Каталог кэша
+    :return: Словарь {имя: DataFrame} или None, если записи нет
+    """
+    path = _entry_path(key, cache_dir)
+    meta_path = os.path.join(path, META_FILE)
+    if not os.path.exists(meta_path):
+        return None
+
+    with open(meta_path, 'r', encoding='utf-8') as file:
+        meta = json.load(file)
+
+    frames = {}
+    for name, columns in meta['frames'].items():
+        df = pd.read_parquet(os.path.join(path, f"{name}.parquet"))
+        for col in columns['json']:
+            df[col] = df[col].map(json.loads)
+        # Восстанавливаем object-столбцы, которые Parquet читает как строковые
+        df[columns['object']] = df[columns['object']].astype(object)
+        frames[name] = df
+
+    # Отмечаем время использования для вытеснения давно не используемых записей
+    os.utime(meta_path)
+    return frames
+
+
+def save_prepared(key, frames, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+    """
+    Сохраняет подготовленные данные в кэш в формате Parquet и
+    вытесняет старые записи, если кэш превысил max_bytes.
+
+    :param key: Ключ кэша (см. cache_key)
+    :param frames: Словарь {имя: DataFrame}
+    :param cache_dir: Каталог кэша
+    :param max_bytes: Предельный размер кэша в байтах
+    """
+    path = _entry_path(key, cache_dir)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    os.makedirs(tmp_path, exist_ok=True)
+
+    meta = {'created': time.time(), 'frames': {}}
+    for name, df in frames.items():
+        json_columns = _list_columns(df)
+        encoded = df.assign(**{col: df[col].map(lambda x: json.dumps(x, ensure_ascii=False))
+                               for col in json_columns})
+        encoded.to_parquet(os.path.join(tmp_path, f"{name}.parquet"))
+        meta['frames'][name] = {
+            'json': json_columns,
+            'object': [col for col in df.columns if df[col].dtype == object],
+        }
+
+    with open(os.path.join(tmp_path, META_FILE), 'w', encoding='utf-8') as file:
+        json.dump(meta, file)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    evict(cache_dir, max_bytes)
+
+
+def evict(cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+    """
+    Удаляет давно не использовавшиеся записи, пока размер кэша больше max_bytes.
+
+    :param cache_dir: Каталог кэша
+    :param max_bytes: Предельный размер кэша в байтах
+    :return: Список удалённых ключей
+    """
+    if not os.path.isdir(cache_dir):
+        return []
+
+    entries = []
+    for key in os.listdir(cache_dir):
+        meta_path = os.path.join(cache_dir, key, META_FILE)
+        if os.path.exists(meta_path):
+            entries.append((os.path.getmtime(meta_path), key,
+                            _entry_size(_entry_path(key, cache_dir))))
+
+    total = sum(size for _, _, size in entries)
+    removed = []
+    for _, key, size in sorted(entries):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(_entry_path(key, cache_dir), ignore_errors=True)
+        total -= size
+        removed.append(key)
+    return removed
+
+
+def invalidate(key=None, cache_dir=CACHE_DIR):
+    """
+    Явно удаляет запись кэша, а без ключа — весь кэш.
+
+    :param key: Ключ кэша или None
+    :param cache_dir: Каталог кэша
+    """
+    if key is None:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    else:
+        shutil.rmtree(_entry_path(key, cache_dir), ignore_errors=True)
+
+
+def load_or_prepare(stream_url, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES, fallback=True,
+                    columns=None, with_persons=True):
+    """
+    Возвращает подготовленные данные, используя кэш, если сырые данные не изменились.
+    При промахе строки декодируются, проходят prepare_data и сохраняются в кэш.
+
+    :param stream_url: URL потока данных или список URL частей потока
+    :param cache_dir: Каталог кэша
+    :param max_bytes: Предельный размер кэша в байтах
+    :param fallback: Использовать локальный файл, если поток недоступен (см. fetch_raw_lines)
+    :param columns: Нужные столбцы (см. prepare_data) или None для всех; при промахе
+        декодируются и подготавливаются только они, а запись хранится под своим ключом
+    :param with_persons: Нужна ли таблица персон
+    :return: Кортеж (DataFrame с фильмами, таблица персон или None)
+    """
+    if isinstance(stream_url, str):
+        lines = fetch_raw_lines(stream_url, fallback)
+    else:
+        lines = fetch_raw_lines_from_streams(stream_url, fallback)
+    fingerprint = lines_fingerprint(lines)
+    key = cache_key(fingerprint, columns, with_persons)
+
+    # Полная запись подходит для любого набора столбцов
+    for candidate in dict.fromkeys([cache_key(fingerprint), key]):
+        frames = load_prepared(candidate, cache_dir)
+        if frames is not None:
+            print("Подготовленные данные загружены из кэша")
+            return frames['movies'], frames.get('persons') if with_persons else None
+
+    df = lines_to_dataframe(lines, source_columns(columns, return_persons=with_persons))
+    if with_persons:
+        df, persons = prepare_data(df, return_persons=True, columns=columns)
+        frames = {'movies': df, 'persons': persons}
+    else:
+        df, persons = prepare_data(df, columns=columns), None
+        frames = {'movies': df}
+    save_prepared(key, frames, cache_dir, max_bytes)
+    return df, persons
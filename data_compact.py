@@ -0,0 +1,171 @@
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+# Компактное представление подготовленных данных (см. data_preparation.prepare_data):
+# числовые столбцы хранятся в узких типах, а столбцы со списками — в виде
+# кодов категорий и массива смещений вместо Python-списков в каждой ячейке.
+
+# Узкие типы числовых столбцов; Int32 допускает пропуски
+COMPACT_DTYPES = {
+    'rating.kp': 'float32',
+    'rating.imdb': 'float32',
+    'year': 'int16',
+    'votes.kp': 'Int32',
+    'votes.imdb': 'Int32',
+}
+
+# Столбцы со списками строк, которые кодируются через EncodedList
+COMPACT_LIST_COLUMNS = ['genres', 'countries', 'actors', 'directors']
+
+
+class EncodedList:
+    """
+    Столбец со списками строк в виде кодов категорий и смещений.
+
+    Элементы строки i — это categories[codes[offsets[i]:offsets[i + 1]]].
+    Ячейки, где вместо списка стоит одно значение (например, 'неизвестно'
+    после fillna), хранятся отдельно в словаре scalars {позиция: значение}.
+    """
+
+    def __init__(self, codes, offsets, categories, index, scalars=None, name=None):
+        self.codes = codes
+        self.offsets = offsets
+        self.categories = categories
+        self.index = index
+        self.scalars = scalars or {}
+        self.name = name
+
+    @classmethod
+    def from_series(cls, series):
+        """
+        Кодирует столбец со списками.
+
+        :param series: Series, ячейки которого — списки строк или одиночные значения
+        :return: EncodedList
+        """
+        values = series.to_numpy(dtype=object)
+        is_list = np.fromiter((isinstance(value, list) for value in values), bool, len(values))
+        lengths = np.fromiter((len(value) if isinstance(value, list) else 0 for value in values),
+                              np.int64, len(values))
+
+        offsets = np.zeros(len(values) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+
+        flat = pd.Series(list(chain.from_iterable(values[is_list])), dtype=object)
+        codes, categories = pd.factorize(flat, sort=True)
+
+        scalars = {int(pos): values[pos] for pos in np.flatnonzero(~is_list)}
+        return cls(codes.astype(np.int32), offsets, categories, series.index, scalars, series.name)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def nbytes(self):
+        # Индекс общий с DataFrame и учитывается там
+        return self.codes.nbytes + self.offsets.nbytes + self.categories.memory_usage(deep=True)
+
+    def to_series(self):
+        """
+        Восстанавливает столбец с Python-списками.
+        """
+        categories = np.append(self.categories.to_numpy(dtype=object), None)
+        flat = categories[self.codes].tolist()
+        values = [flat[start:end] for start, end in zip(self.offsets[:-1], self.offsets[1:])]
+        for pos, value in self.scalars.items():
+            values[pos] = value
+        return pd.Series(values, index=self.index, name=self.name, dtype=object)
+
+    def explode(self):
+        """
+        Аналог Series.explode без восстановления списков: один элемент на строку,
+        пустой список даёт NaN, одиночное значение остаётся как есть.
+
+        :return: Категориальный Series с повторённым исходным индексом
+        """
+        lengths = np.diff(self.offsets)
+        row_lengths = np.maximum(lengths, 1)
+        positions = np.repeat(np.arange(len(self)), row_lengths)
+        starts = np.cumsum(row_lengths) - row_lengths
+        within = np.arange(len(positions)) - starts[positions]
+
+        codes = np.full(len(positions), -1, dtype=np.int32)
+        filled = lengths[positions] > 0
+        codes[filled] = self.codes[self.offsets[positions[filled]] + within[filled]]
+
+        categories = self.categories
+        scalars = {pos: value for pos, value in self.scalars.items() if not pd.isna(value)}
+        if scalars:
+            # Одиночные значения добавляем в категории с сохранением сортировки
+            categories = categories.union(pd.Index(list(set(scalars.values()))))
+            remap = categories.get_indexer(self.categories).astype(np.int32)
+            codes = np.where(codes >= 0, remap[np.maximum(codes, 0)], -1).astype(np.int32)
+            for pos, value in scalars.items():
+                codes[starts[pos]] = categories.get_loc(value)
+
+        return pd.Series(pd.Categorical.from_codes(codes, categories),
+                         index=self.index[positions], name=self.name)
+
+
+def _downcast(series, dtype):
+    series = pd.to_numeric(series, errors='coerce')
+    if dtype == 'int16' and series.isna().any():
+        # Год может отсутствовать — тогда нужен тип с пропусками
+        dtype = 'Int16'
+    return series.astype(dtype)
+
+
+def compact_frame(df, list_columns=None):
+    """
+    Переводит подготовленный DataFrame в компактное представление.
+
+    :param df: Результат prepare_data
+    :param list_columns: Столбцы со списками; по умолчанию COMPACT_LIST_COLUMNS
+    :return: Кортеж (DataFrame без столбцов со списками, словарь {столбец: EncodedList})
+    """
+    if list_columns is None:
+        list_columns = COMPACT_LIST_COLUMNS
+    list_columns = [col for col in list_columns if col in df.columns]
+
+    lists = {col: EncodedList.from_series(df[col]) for col in list_columns}
+    frame = df.drop(columns=list_columns)
+    frame = frame.assign(**{col: _downcast(frame[col], dtype)
+                            for col, dtype in COMPACT_DTYPES.items() if col in frame.columns})
+    return frame, lists
+
+
+def expand_frame(frame, lists, columns=None):
+    """
+    Восстанавливает столбцы со списками (все или только нужные разделам отчёта).
+
+    :param frame: DataFrame из compact_frame
+    :param lists: Словарь {столбец: EncodedList} из compact_frame
+    :param columns: Какие столбцы со списками восстановить; по умолчанию все
+    :return: DataFrame в формате prepare_data (числовые столбцы остаются узкими)
+    """
+    if columns is None:
+        columns = list(lists)
+    return frame.assign(**{col: lists[col].to_series() for col in columns})
+
+
+def memory_report(df, frame, lists):
+    """
+    Сравнивает занимаемую память до и после compact_frame по столбцам.
+
+    :param df: Исходный DataFrame
+    :param frame: DataFrame из compact_frame
+    :param lists: Словарь {столбец: EncodedList} из compact_frame
+    :return: DataFrame со столбцами before и after в байтах и итоговой строкой total
+    """
+    before = df.memory_usage(deep=True)
+    after = frame.memory_usage(deep=True)
+    for col, encoded in lists.items():
+        after[col] = encoded.nbytes
+
+    report = pd.DataFrame({'before': before, 'after': after.reindex(before.index)})
+    report.loc['total'] = report.sum()
+    report = report.astype('int64')
+    report['ratio'] = (report['after'] / report['before']).round(3)
+    return report
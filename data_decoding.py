@@ -0,0 +1,69 @@
+import json
+from itertools import islice
+
+try:
+    import orjson
+except ImportError:  # orjson — необязательная зависимость
+    orjson = None
+
+# Если установлен orjson, используется он, иначе стандартный json.
+# Строки декодируются пачками: пачка склеивается в один JSON-массив и
+# разбирается одним вызовом, что заметно быстрее разбора по одной строке.
+
+# Количество строк, декодируемых за один вызов
+DEFAULT_BATCH_SIZE = 1000
+
+if orjson is not None:
+    DECODER_NAME = 'orjson'
+    loads = orjson.loads
+else:
+    DECODER_NAME = 'json'
+    loads = json.loads
+
+
+def decode_batch(lines, decoder=None):
+    """
+    Декодирует пачку JSON-строк одним вызовом.
+
+    Если пачка не разбирается целиком (например, в ней есть повреждённая
+    строка), строки декодируются по одной, чтобы ошибка указывала на конкретную строку.
+
+    :param lines: Список строк (bytes или str), каждая — один JSON-объект
+    :param decoder: Функция разбора JSON; по умолчанию loads
+    :return: Список декодированных записей
+    """
+    if not lines:
+        return []
+    if decoder is None:
+        decoder = loads
+
+    if isinstance(lines[0], bytes):
+        joined = b'[' + b','.join(lines) + b']'
+    else:
+        joined = '[' + ','.join(lines) + ']'
+
+    try:
+        records = decoder(joined)
+        if len(records) == len(lines):
+            return records
+    except ValueError:
+        pass
+
+    return [decoder(line) for line in lines]
+
+
+def iter_decoded(lines, batch_size=DEFAULT_BATCH_SIZE, decoder=None):
+    """
+    Декодирует поток непустых JSON-строк пачками по batch_size.
+
+    :param lines: Итерируемый набор строк (bytes или str)
+    :param batch_size: Количество строк в пачке
+    :param decoder: Функция разбора JSON; по умолчанию loads
+    :return: Генератор декодированных записей
+    """
+    lines = iter(lines)
+    while True:
+        batch = list(islice(lines, batch_size))
+        if not batch:
+            return
+        yield from decode_batch(batch, decoder)
@@ -1,59 +1,682 @@
+import asyncio
+import hashlib
 import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
 import requests
 import pandas as pd
 
-def fetch_data_from_stream_or_file(stream_url):
+from data_decoding import DEFAULT_BATCH_SIZE, iter_decoded
+
+try:
+    import fcntl
+except ImportError:  # fcntl есть только в Unix
+    fcntl = None
+
+# Локальный файл, используемый, если поток недоступен
+LOCAL_FILE_PATH = 'stream-data'
+
+# Размер порции (в строках) для потокового режима
+DEFAULT_CHUNK_SIZE = 10000
+
+# Каталог для промежуточных файлов загрузки потока (см. StreamSpool)
+SPOOL_DIR = os.path.join('.cache', 'stream')
+
+# Через сколько полученных строк сохраняется контрольная точка загрузки
+CHECKPOINT_LINES = 5000
+
+
+def _iter_stream_records(response, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Декодирует записи из HTTP-потока пачками строк.
+    """
+    yield from iter_decoded((line for line in response.iter_lines() if line), batch_size)
+
+
+def _iter_file_records(file_path, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Декодирует записи из локального файла пачками строк, пропуская пустые строки.
+    """
+    with open(file_path, 'rb') as file:
+        lines = (line.strip() for line in file)
+        yield from iter_decoded((line for line in lines if line), batch_size)
+
+
+def project_records(records, fields):
+    """
+    Извлекает из записей только заданные поля, не разворачивая остальные.
+
+    Столбец, которого нет ни в одной записи, не создаётся — как и в pd.json_normalize.
+
+    :param records: Список декодированных записей (словарей)
+    :param fields: Пути к полям через точку, например 'rating.kp'
+    :return: DataFrame со столбцами fields
+    """
+    paths = [field.split('.') for field in fields]
+    columns = {field: [] for field in fields}
+    for record in records:
+        for field, path in zip(fields, paths):
+            value = record
+            for key in path:
+                value = value.get(key) if isinstance(value, dict) else None
+            columns[field].append(value)
+
+    return pd.DataFrame({field: values for field, values in columns.items()
+                         if any(value is not None for value in values)},
+                        index=pd.RangeIndex(len(records)))
+
+
+def records_to_dataframe(records, fields=None):
+    """
+    Преобразует декодированные записи в DataFrame.
+
+    :param records: Список декодированных записей
+    :param fields: Поля, которые нужно извлечь (см. project_records);
+        None — развернуть все поля через pd.json_normalize
+    :return: DataFrame с данными
+    """
+    if fields is None:
+        return pd.json_normalize(records)
+    return project_records(records, fields)
+
+
+def _iter_chunks(records, chunk_size, fields=None):
+    """
+    Группирует записи в порции и нормализует каждую порцию в DataFrame.
+    """
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield records_to_dataframe(chunk, fields)
+            chunk = []
+    if chunk:
+        yield records_to_dataframe(chunk, fields)
+
+
+class StreamSpool:
+    """
+    Промежуточный файл загрузки потока с контрольной точкой.
+
+    Полученные строки только дописываются в файл. Контрольная точка хранит URL,
+    число строк, размер файла, смещение в байтах потока, до которого строки
+    записаны, и валидатор ответа (ETag или Last-Modified); после обрыва загрузка
+    продолжается с этого смещения, в том числе при следующем запуске.
+
+    Файл общий для всех процессов, загружающих тот же URL, поэтому перед записью
+    его нужно захватить через lock().
+    """
+
+    def __init__(self, stream_url, spool_dir=SPOOL_DIR):
+        self.stream_url = stream_url
+        name = hashlib.sha1(stream_url.encode('utf-8')).hexdigest()[:16]
+        self.path = os.path.join(spool_dir, f"{name}.jsonl")
+        self.checkpoint_path = f"{self.path}.checkpoint"
+        self.lock_path = f"{self.path}.lock"
+        self._file = None
+        self._lock_file = None
+        self._load_state()
+
+    def _load_state(self):
+        self._reset_state()
+        state = None
+        if os.path.exists(self.checkpoint_path) and os.path.exists(self.path):
+            try:
+                with open(self.checkpoint_path, encoding='utf-8') as file:
+                    state = json.load(file)
+            except (OSError, ValueError):
+                state = None
+        if state and state.get('url') == self.stream_url:
+            self.lines = state['lines']
+            self.offset = state['offset']
+            self.spool_bytes = state['spool_bytes']
+            self.validator = state.get('validator')
+
+    def _reset_state(self):
+        self.lines = 0
+        self.offset = 0
+        self.spool_bytes = 0
+        self.validator = None
+
+    def lock(self):
+        """
+        Захватывает файл загрузки, не дожидаясь освобождения, и перечитывает
+        контрольную точку (её мог обновить предыдущий владелец).
+
+        :return: False, если файл уже захвачен другим процессом (или другим
+            StreamSpool в этом процессе)
+        """
+        if fcntl is None or self._lock_file is not None:
+            return True
+        os.makedirs(os.path.dirname(self.lock_path), exist_ok=True)
+        while True:
+            lock_file = open(self.lock_path, 'a')
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                return False
+            # Файл блокировки удаляется владельцем при освобождении: если мы
+            # захватили уже удалённый файл, пробуем снова с новым
+            try:
+                current = os.path.samestat(os.fstat(lock_file.fileno()), os.stat(self.lock_path))
+            except FileNotFoundError:
+                current = False
+            if current:
+                self._lock_file = lock_file
+                self._load_state()
+                return True
+            lock_file.close()
+
+    def unlock(self):
+        if self._lock_file is not None:
+            os.remove(self.lock_path)
+            self._lock_file.close()
+            self._lock_file = None
+
+    def open(self):
+        """
+        Открывает файл для дописывания. Строки, записанные после последней
+        контрольной точки, отбрасываются.
+        """
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._file = open(self.path, 'ab')
+            self._file.truncate(self.spool_bytes)
+
+    def append(self, line, size):
+        """
+        Дописывает строку потока.
+
+        :param line: Строка без перевода строки; пустые строки не сохраняются
+        :param size: Размер строки в потоке в байтах вместе с переводом строки
+        """
+        self.offset += size
+        line = line.strip()
+        if line:
+            self._file.write(line + b'\n')
+            self.spool_bytes += len(line) + 1
+            self.lines += 1
+
+    def checkpoint(self):
+        """
+        Сбрасывает файл на диск и атомарно сохраняет контрольную точку.
+        """
+        if self._file is not None:
+            self._file.flush()
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump({'url': self.stream_url, 'lines': self.lines, 'offset': self.offset,
+                       'spool_bytes': self.spool_bytes, 'validator': self.validator}, file)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def restart(self):
+        """
+        Начинает загрузку заново (например, если данные на сервере изменились).
+        """
+        self._reset_state()
+        if self._file is not None:
+            self._file.truncate(0)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def digest(self):
+        """
+        SHA-1 строк, записанных до последней контрольной точки (с переводами строк).
+        """
+        digest = hashlib.sha1()
+        remaining = self.spool_bytes
+        with open(self.path, 'rb') as file:
+            while remaining > 0:
+                block = file.read(min(remaining, 1024 * 1024))
+                if not block:
+                    break
+                digest.update(block)
+                remaining -= len(block)
+        return digest.hexdigest()
+
+    def read_lines(self):
+        """
+        Строки, записанные до последней контрольной точки.
+        """
+        self.close()
+        with open(self.path, 'rb') as file:
+            data = file.read(self.spool_bytes)
+        return data.splitlines()
+
+    def remove(self):
+        self.close()
+        for path in (self.path, self.checkpoint_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def _iter_sized_lines(response, chunk_size=64 * 1024):
+    """
+    Строки тела ответа вместе с их размером в байтах (с переводом строки).
+
+    Строки выделяются из iter_content вручную: iter_lines с разделителем может
+    выдавать лишние пустые строки на границах порций, и смещение сбивается.
+    """
+    pending = b''
+    for chunk in response.iter_content(chunk_size):
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line, len(line) + 1
+    if pending:
+        yield pending, len(pending)
+
+
+class _ChangedStreamError(Exception):
+    """Поток при повторной загрузке не совпадает с уже полученными данными."""
+
+
+def _response_validator(response):
+    """
+    Валидатор ответа для If-Range: сильный ETag или Last-Modified (None, если нет).
+    """
+    etag = response.headers.get('ETag')
+    if etag and not etag.startswith('W/'):
+        return etag
+    return response.headers.get('Last-Modified')
+
+
+def _download_into(spool, timeout, checkpoint_lines):
+    """
+    Один запрос потока: продолжает загрузку с сохранённого смещения.
+
+    Range передаётся только вместе с If-Range: если данные на сервере изменились,
+    сервер вернёт их целиком (200), и загрузка начнётся заново. Без валидатора
+    поток запрашивается целиком, а уже полученная часть пропускается и сверяется
+    с промежуточным файлом.
+    """
+    if spool.offset and spool.validator:
+        response = requests.get(spool.stream_url, stream=True, timeout=timeout,
+                                headers={'Range': f"bytes={spool.offset}-",
+                                         'If-Range': spool.validator})
+    else:
+        response = requests.get(spool.stream_url, stream=True, timeout=timeout)
+
+    validator = _response_validator(response)
+    if response.status_code == 416 and spool.offset and spool.validator:
+        return  # Все данные уже получены
+    if response.status_code == 206:
+        if validator is not None and validator != spool.validator:
+            raise _ChangedStreamError()
+        skip = 0
+    elif response.status_code == 200:
+        if spool.offset and spool.validator and validator != spool.validator:
+            # Сервер сообщил, что данные изменились: этот же ответ читаем с начала
+            print("Данные потока изменились, загрузка начинается заново")
+            spool.restart()
+        # Уже полученную часть пропускаем (если сервер не поддерживает Range
+        # или валидатора нет) и сверяем с промежуточным файлом
+        skip = spool.offset
+        spool.validator = validator
+    else:
+        raise requests.HTTPError(f"статус {response.status_code}", response=response)
+
+    expected_digest = spool.digest() if skip else None
+    skipped = hashlib.sha1()
+    spool.open()
+    received = 0
+    for line, size in _iter_sized_lines(response):
+        if skip > 0:
+            skip -= size
+            if line.strip():
+                skipped.update(line.strip() + b'\n')
+            if skip < 0 or (skip == 0 and skipped.hexdigest() != expected_digest):
+                raise _ChangedStreamError()
+            continue
+
+        spool.append(line, size)
+        received += 1
+        if received % checkpoint_lines == 0:
+            spool.checkpoint()
+
+    if skip > 0:
+        raise _ChangedStreamError()
+    spool.checkpoint()
+
+
+def download_stream(stream_url, spool_dir=None, timeout=10, retries=3, backoff=0.5,
+                    checkpoint_lines=CHECKPOINT_LINES):
+    """
+    Загружает поток с контрольными точками и продолжением после обрыва.
+
+    Полученные строки сохраняются в промежуточный файл (см. StreamSpool).
+    После обрыва соединения загрузка продолжается с последней контрольной точки
+    с экспоненциальной задержкой между попытками; счётчик попыток сбрасывается,
+    если попытка получила новые строки. Если продолжить не удалось, файл
+    и контрольная точка остаются, и следующий вызов продолжит загрузку с них.
+    Если тот же поток уже загружает другой процесс, загрузка идёт в отдельный
+    временный каталог и после обрыва не продолжается.
+
+    :param stream_url: URL потока данных
+    :param spool_dir: Каталог для промежуточного файла; по умолчанию SPOOL_DIR
+    :param timeout: Таймаут запроса в секундах
+    :param retries: Количество попыток продолжить загрузку подряд без новых строк
+    :param backoff: Начальная задержка между попытками в секундах
+    :param checkpoint_lines: Через сколько строк сохранять контрольную точку
+    :return: Список строк в байтах
+    :raises ConnectionError: Если поток недоступен и продолжить загрузку нельзя
+    """
+    spool_dir = spool_dir or SPOOL_DIR
+    spool = StreamSpool(stream_url, spool_dir)
+    private_dir = None
+    if not spool.lock():
+        # Тот же поток уже загружает другой процесс: его файл не трогаем,
+        # а загружаем во временный каталог, который удаляется в конце
+        os.makedirs(spool_dir, exist_ok=True)
+        private_dir = tempfile.mkdtemp(prefix='private-', dir=spool_dir)
+        spool = StreamSpool(stream_url, private_dir)
+    elif spool.offset:
+        print(f"Продолжаю загрузку потока с {spool.lines} строк")
+
+    failures = 0
+    try:
+        while True:
+            lines_before = spool.lines
+            try:
+                _download_into(spool, timeout, checkpoint_lines)
+                break
+            except _ChangedStreamError:
+                print("Данные потока изменились, загрузка начинается заново")
+                spool.restart()
+                continue
+            except (requests.RequestException, OSError) as error:
+                if not spool.offset:
+                    # Ничего не получено: продолжать нечего
+                    raise ConnectionError(f"Поток недоступен: {error}") from error
+                spool.checkpoint()
+                failures = 0 if spool.lines > lines_before else failures + 1
+                if failures > retries:
+                    raise ConnectionError(f"Не удалось продолжить загрузку потока после "
+                                          f"{spool.lines} строк: {error}") from error
+                delay = backoff * 2 ** max(failures - 1, 0)
+                print(f"Ошибка потока после {spool.lines} строк ({error}), "
+                      f"повтор через {delay:g} с")
+                time.sleep(delay)
+
+        lines = spool.read_lines()
+        spool.remove()
+        return lines
+    finally:
+        spool.close()
+        spool.unlock()
+        if private_dir is not None:
+            shutil.rmtree(private_dir, ignore_errors=True)
+
+
+def fetch_data_from_stream_or_file(stream_url, fields=None, fallback=True):
     """
     Получает данные из потока или локального файла, если поток недоступен.
 
+    Оборванная загрузка продолжается с последней контрольной точки
+    (см. download_stream); локальный файл используется, только если продолжить
+    загрузку не удалось.
+
     :param stream_url: URL потока данных
-    :param local_file_path: Путь к локальному CSV файлу
+    :param fields: Поля, которые нужно извлечь (см. project_records); None — все поля
+    :param fallback: Использовать локальный файл, если поток недоступен; при False
+        ошибка пробрасывается (ConnectionError)
     :return: DataFrame с данными
     """
+    try:
+        lines = download_stream(stream_url)
+        print("Данные успешно получены из потока")
+        return lines_to_dataframe(lines, fields)
+    except Exception as error:
+        if not fallback:
+            raise
+        print(f"Ошибка при запросе данных: {error}. Использую локальный файл.")
+
+    # Читаем файл построчно и преобразуем данные в DataFrame
+    df = records_to_dataframe(list(_iter_file_records(LOCAL_FILE_PATH)), fields)
+    print("Данные успешно считаны из файла и преобразованы в DataFrame")
+    return df
+
+
+def iter_data_chunks(stream_url, chunk_size=DEFAULT_CHUNK_SIZE, fields=None):
+    """
+    Потоковый вариант fetch_data_from_stream_or_file: отдаёт данные порциями
+    по chunk_size строк, не накапливая весь поток в памяти.
 
+    Если поток недоступен до получения первой порции, данные читаются
+    из локального файла. Ошибка после начала выдачи пробрасывается наружу,
+    чтобы не смешивать данные потока и файла.
 
-    all_movies = []
+    :param stream_url: URL потока данных
+    :param chunk_size: Количество записей в одной порции
+    :param fields: Поля, которые нужно извлечь (см. project_records); None — все поля
+    :return: Генератор DataFrame с нормализованными порциями
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size должен быть положительным")
 
+    yielded = False
     try:
-        # Отправляем запрос
         response = requests.get(stream_url, stream=True, timeout=10)
-        # Проверяем статус ответа
         if response.status_code == 200:
-            print("Данные успешно получены из потока")
-            # Обрабатываем поток построчно
-            for line in response.iter_lines():
-                if line:
-                    all_movies.append(json.loads(line.decode('utf-8')))
-            # Преобразуем данные из потока в DataFrame
-            df = pd.json_normalize(all_movies)
-        else:
-            print(f"Ошибка при запросе данных: статус"
-                  f" {response.status_code}. Использую локальный файл.")
-
-            file_path = 'stream-data'
-            # Читаем файл построчно
-            with open(file_path, 'r', encoding='utf-8') as file:
-                for line in file:
-                    if line.strip():  # Проверка на пустые строки
-                        all_movies.append(json.loads(line.strip()))
-
-            # Преобразуем данные из файла в DataFrame
-            df = pd.json_normalize(all_movies)
-
-            # Сообщение о завершении обработки
-            print("Данные успешно считаны из файла и преобразованы в DataFrame")
+            print("Данные получаются из потока порциями")
+            # Не декодируем строки дальше границы порции
+            records = _iter_stream_records(response, min(chunk_size, DEFAULT_BATCH_SIZE))
+            for chunk in _iter_chunks(records, chunk_size, fields):
+                yielded = True
+                yield chunk
+            return
+        print(f"Ошибка при запросе данных: статус"
+              f" {response.status_code}. Использую локальный файл.")
     except Exception:
-        file_path = 'stream-data'
-        # Читаем файл построчно
-        with open(file_path, 'r', encoding='utf-8') as file:
-            for line in file:
-                if line.strip():  # Проверка на пустые строки
-                    all_movies.append(json.loads(line.strip()))
+        if yielded:
+            raise
 
-        # Преобразуем данные из файла в DataFrame
-        df = pd.json_normalize(all_movies)
+    yield from _iter_chunks(_iter_file_records(LOCAL_FILE_PATH), chunk_size, fields)
 
-        # Сообщение о завершении обработки
-        print("Данные успешно считаны из файла и преобразованы в DataFrame")
 
-    return df
+def read_file_lines(file_path=LOCAL_FILE_PATH):
+    """
+    Читает непустые сырые строки из локального файла (одна JSON-запись на строку).
+
+    :param file_path: Путь к файлу
+    :return: Список строк в байтах
+    """
+    with open(file_path, 'rb') as file:
+        lines = [line.strip() for line in file if line.strip()]
+    print("Данные успешно считаны из файла")
+    return lines
+
+
+def _read_local_lines():
+    return read_file_lines(LOCAL_FILE_PATH)
+
+
+def fetch_raw_lines(stream_url, fallback=True):
+    """
+    Получает сырые (не декодированные) строки из потока или локального файла,
+    если поток недоступен и продолжить загрузку нельзя. Пустые строки отбрасываются.
+
+    :param stream_url: URL потока данных
+    :param fallback: Использовать локальный файл, если поток недоступен; при False
+        ошибка пробрасывается (ConnectionError)
+    :return: Список строк в байтах
+    """
+    try:
+        lines = download_stream(stream_url)
+        print("Данные успешно получены из потока")
+        return lines
+    except Exception as error:
+        if not fallback:
+            raise
+        print(f"Ошибка при запросе данных: {error}. Использую локальный файл.")
+
+    return _read_local_lines()
+
+
+def lines_to_dataframe(lines, fields=None):
+    """
+    Декодирует сырые JSON-строки и преобразует их в DataFrame.
+
+    :param lines: Итерируемый набор строк (bytes или str)
+    :param fields: Поля, которые нужно извлечь (см. project_records); None — все поля
+    :return: DataFrame с данными
+    """
+    return records_to_dataframe(list(iter_decoded(lines)), fields)
+
+
+def paged_urls(base_url, pages, page_param='page'):
+    """
+    Формирует список URL для постраничного источника.
+
+    :param base_url: URL без номера страницы
+    :param pages: Количество страниц (нумерация с 1)
+    :param page_param: Имя параметра с номером страницы
+    :return: Список URL
+    """
+    separator = '&' if '?' in base_url else '?'
+    return [f"{base_url}{separator}{page_param}={page}" for page in range(1, pages + 1)]
+
+
+class _ThreadSessions:
+    """
+    Отдельная requests.Session для каждого рабочего потока: Session
+    не рассчитана на одновременное использование из нескольких потоков.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._sessions = []
+        self._lock = threading.Lock()
+
+    def get(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            self._local.session = session
+            with self._lock:
+                self._sessions.append(session)
+        return session
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions:
+                session.close()
+            self._sessions = []
+
+
+def _download_shard(sessions, url, timeout, deadline, chunk_size=64 * 1024):
+    """
+    Загружает часть до момента deadline (по time.monotonic).
+
+    Тело читается порциями через read1, которая возвращает уже пришедшие байты,
+    а не ждёт полной порции, поэтому медленно приходящий ответ прерывается
+    не позже чем через timeout после deadline.
+    """
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError("истекло время загрузки части")
+    with sessions.get().get(url, timeout=min(timeout, remaining), stream=True) as response:
+        if response.status_code != 200:
+            raise requests.HTTPError(f"статус {response.status_code}", response=response)
+        chunks = []
+        while chunk := response.raw.read1(chunk_size):
+            chunks.append(chunk)
+            if time.monotonic() > deadline:
+                raise TimeoutError("истекло время загрузки части")
+    content = b''.join(chunks)
+    return [line.strip() for line in content.splitlines() if line.strip()]
+
+
+async def _fetch_shard(sessions, url, semaphore, timeout, shard_timeout, retries, backoff):
+    """
+    Загружает одну часть данных с повторами и экспоненциальной задержкой.
+
+    Общее время загрузки части вместе с повторами ограничено shard_timeout;
+    timeout — таймаут requests на соединение и чтение. Запрос не отменяется
+    извне, а сам прекращает чтение по истечении срока, поэтому число
+    одновременных запросов не превышает размер semaphore.
+    """
+    async with semaphore:
+        deadline = time.monotonic() + shard_timeout
+        for attempt in range(retries + 1):
+            try:
+                return await asyncio.to_thread(_download_shard, sessions, url, timeout, deadline)
+            except Exception as error:
+                remaining = deadline - time.monotonic()
+                if attempt == retries or remaining <= 0:
+                    raise ConnectionError(f"Не удалось получить {url}: {error}") from error
+                await asyncio.sleep(min(backoff * 2 ** attempt, remaining))
+
+
+async def fetch_shards_async(urls, max_concurrency=8, timeout=10, shard_timeout=300, retries=3,
+                             backoff=0.5):
+    """
+    Одновременно загружает несколько частей потока в рабочих потоках.
+
+    :param urls: Список URL частей
+    :param max_concurrency: Максимальное число одновременных запросов
+    :param timeout: Таймаут requests на соединение и чтение в секундах
+    :param shard_timeout: Предельное время загрузки одной части вместе с повторами
+        в секундах (отсчитывается с начала её загрузки)
+    :param retries: Количество повторов для каждой части
+    :param backoff: Начальная задержка между повторами в секундах
+    :return: Списки сырых строк для каждой части в порядке urls
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    sessions = _ThreadSessions()
+    try:
+        # Дожидаемся всех частей, чтобы не закрывать сессии во время запросов
+        shards = await asyncio.gather(*(
+            _fetch_shard(sessions, url, semaphore, timeout, shard_timeout, retries, backoff)
+            for url in urls
+        ), return_exceptions=True)
+    finally:
+        sessions.close()
+    for shard in shards:
+        if isinstance(shard, BaseException):
+            raise shard
+    return shards
+
+
+def fetch_raw_lines_from_streams(urls, fallback=True, **kwargs):
+    """
+    Получает сырые строки из нескольких частей потока одновременно
+    или из локального файла, если хотя бы одна часть недоступна.
+
+    :param urls: Список URL частей
+    :param fallback: Использовать локальный файл, если поток недоступен; при False
+        ошибка пробрасывается (ConnectionError)
+    :param kwargs: Параметры fetch_shards_async
+    :return: Список строк в байтах в порядке частей
+    """
+    try:
+        shards = asyncio.run(fetch_shards_async(urls, **kwargs))
+        print(f"Данные успешно получены из {len(shards)} частей потока")
+        return [line for shard in shards for line in shard]
+    except Exception as error:
+        if not fallback:
+            raise
+        print(f"Ошибка при запросе данных: {error}. Использую локальный файл.")
+
+    return _read_local_lines()
+
+
+def fetch_data_from_streams(urls, fields=None, fallback=True, **kwargs):
+    """
+    Получает данные из нескольких частей потока одновременно и объединяет их.
+
+    :param urls: Список URL частей
+    :param fields: Поля, которые нужно извлечь (см. project_records); None — все поля
+    :param fallback: См. fetch_raw_lines_from_streams
+    :param kwargs: Параметры fetch_shards_async
+    :return: DataFrame с данными
+    """
+    return lines_to_dataframe(fetch_raw_lines_from_streams(urls, fallback, **kwargs), fields)
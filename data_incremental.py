@@ -0,0 +1,213 @@
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_analysis import PERSON_SEGMENTS, ROLE_COLUMNS, person_index
+from data_cache import load_prepared, save_prepared
+from data_decoding import decode_batch
+from data_fetching import fetch_raw_lines, fetch_raw_lines_from_streams, records_to_dataframe
+from data_preparation import SOURCE_COLUMNS, prepare_data
+from person_ranking import movie_ratings
+from streaming_stats import RatingsAccumulator
+
+# Каталог с состоянием инкрементального режима
+STATE_DIR = os.getenv("INCREMENTAL_STATE_DIR", os.path.join(".cache", "incremental"))
+
+# Ключ записи состояния в каталоге
+STATE_KEY = "state"
+
+# Ключевые столбцы каждого агрегата; остальные столбцы аддитивны
+AGGREGATE_KEYS = {
+    'genre_year_counts': ['year', 'genres'],
+    'person_stats': ['segment', 'role', 'name'],
+}
+
+# Накопитель оценок (streaming_stats.RatingsAccumulator) хранится в состоянии
+# отдельной таблицей (см. RatingsAccumulator.to_frame)
+RATINGS_FRAME = 'rating_stats'
+
+
+def record_hash(line):
+    """
+    Хэш сырой строки записи: по нему определяются изменённые записи.
+    """
+    return hashlib.blake2b(line if isinstance(line, bytes) else line.encode('utf-8'),
+                           digest_size=16).hexdigest()
+
+
+def compute_aggregates(movies, persons):
+    """
+    Считает аддитивные агрегаты по подготовленным фильмам: количества фильмов
+    по годам и жанрам (как AnalysisContext.year_genre_counts), суммы оценок
+    персон по отборам PERSON_SEGMENTS и накопитель оценок для разделов об оценках.
+    Агрегаты набора фильмов равны сумме агрегатов его частей.
+
+    :param movies: Подготовленный DataFrame с фильмами
+    :param persons: Таблица персон (см. data_preparation.build_person_index)
+    :return: Словарь {имя агрегата: DataFrame}; под ключом 'ratings' — RatingsAccumulator
+    """
+    rated = movies[movies['rating.imdb'] != 0]
+    genre_year_counts = (rated[['year', 'genres']].explode('genres')
+                         .groupby(['year', 'genres']).size()
+                         .reset_index(name='count'))
+
+    # Суммы считаются тем же индексом «фильм — человек», что и в разделах о персонах
+    ratings = movie_ratings(movies)
+    person_stats = []
+    for role in ROLE_COLUMNS:
+        index = person_index(movies, role, persons)
+        for segment, select in PERSON_SEGMENTS.items():
+            counts, sums, valid_counts, _ = index.aggregate(ratings, select(movies))
+            present = np.flatnonzero(counts)
+            person_stats.append(pd.DataFrame({
+                'segment': segment,
+                'role': role,
+                'name': np.asarray(index.names, dtype=object)[present],
+                'count': counts[present],
+                'kp_sum': sums[present, 0],
+                'imdb_sum': sums[present, 1],
+                'kp_count': valid_counts[present, 0],
+                'imdb_count': valid_counts[present, 1],
+            }))
+
+    return {
+        'genre_year_counts': genre_year_counts,
+        'person_stats': pd.concat(person_stats, ignore_index=True),
+        'ratings': RatingsAccumulator().update(movies),
+    }
+
+
+def combine_aggregates(base, delta, sign=1):
+    """
+    Прибавляет (sign=1) или вычитает (sign=-1) агрегаты delta из base.
+    Строки с нулевым количеством удаляются.
+
+    :param base: Словарь агрегатов
+    :param delta: Словарь агрегатов той же структуры
+    :param sign: Знак изменения
+    :return: Новый словарь агрегатов
+    """
+    combined = {}
+    for name, keys in AGGREGATE_KEYS.items():
+        left = base[name].set_index(keys)
+        right = delta[name].set_index(keys)
+        result = left.add(sign * right, fill_value=0)
+        result = result[result['count'] != 0]
+        # Количества после сложения с fill_value становятся дробными
+        result = result.astype({col: 'int64' for col in result.columns if col.endswith('count')})
+        combined[name] = result.reset_index()
+
+    ratings = RatingsAccumulator().merge(base['ratings'])
+    if sign > 0:
+        combined['ratings'] = ratings.merge(delta['ratings'])
+    else:
+        combined['ratings'] = ratings.remove(delta['ratings'])
+    return combined
+
+
+def update_dataset(lines, state_dir=STATE_DIR):
+    """
+    Обновляет сохранённый подготовленный набор данных по новой выгрузке.
+
+    Декодируются и подготавливаются только новые и изменённые записи
+    (по id и хэшу строки); удалённые из выгрузки фильмы убираются.
+    Агрегаты пересчитываются только на разнице: вклад старых версий
+    вычитается, вклад новых прибавляется. Если выгрузка не изменилась,
+    состояние на диске не перезаписывается. Id фильмов должны быть уникальными.
+
+    :param lines: Сырые строки полной выгрузки (см. data_fetching.fetch_raw_lines)
+    :param state_dir: Каталог с состоянием
+    :return: Кортеж (фильмы, таблица персон, агрегаты, сводка изменений)
+    """
+    state = load_prepared(STATE_KEY, state_dir)
+    if state is not None and not all(name in state for name in [*AGGREGATE_KEYS, RATINGS_FRAME]):
+        # Состояние без части агрегатов (прежнего формата) собирается заново
+        state = None
+    if state is None:
+        state = {
+            'records': pd.DataFrame({'id': pd.Series(dtype=object),
+                                     'record_hash': pd.Series(dtype=object)}),
+            'movies': None,
+            'persons': None,
+        }
+
+    known = dict(zip(state['records']['record_hash'], state['records']['id']))
+    hashes = [record_hash(line) for line in lines]
+
+    # Декодируем только строки, которых не было в прошлой выгрузке
+    fresh_lines = [line for line, line_hash in zip(lines, hashes) if line_hash not in known]
+    fresh_records = decode_batch(fresh_lines)
+    fresh_ids = [record.get('id') for record in fresh_records]
+
+    current_ids = set(fresh_ids)
+    current_ids.update(known[line_hash] for line_hash in hashes if line_hash in known)
+    old_ids = set(state['records']['id'])
+    stale_ids = (old_ids & set(fresh_ids)) | (old_ids - current_ids)
+
+    summary = {
+        'added': len(set(fresh_ids) - old_ids),
+        'changed': len(old_ids & set(fresh_ids)),
+        'removed': len(old_ids - current_ids),
+        'unchanged': len(current_ids) - len(set(fresh_ids)),
+    }
+
+    delta_movies, delta_persons = prepare_data(records_to_dataframe(fresh_records, SOURCE_COLUMNS),
+                                               return_persons=True)
+
+    if state['movies'] is None:
+        movies, persons = delta_movies, delta_persons
+        aggregates = compute_aggregates(movies, persons)
+    else:
+        old_movies, old_persons = state['movies'], state['persons']
+        stale_movies = old_movies[old_movies['id'].isin(stale_ids)]
+        stale_persons = old_persons[old_persons['movie_id'].isin(stale_ids)]
+
+        aggregates = {name: state[name] for name in AGGREGATE_KEYS}
+        aggregates['ratings'] = RatingsAccumulator.from_frame(state[RATINGS_FRAME])
+        aggregates = combine_aggregates(aggregates,
+                                        compute_aggregates(stale_movies, stale_persons), sign=-1)
+        aggregates = combine_aggregates(aggregates, compute_aggregates(delta_movies, delta_persons))
+
+        movies = pd.concat([old_movies[~old_movies['id'].isin(stale_ids)], delta_movies],
+                           ignore_index=True)
+        persons = pd.concat([old_persons[~old_persons['movie_id'].isin(stale_ids)], delta_persons],
+                            ignore_index=True)
+        persons['profession'] = persons['profession'].astype('category')
+
+    # Id берём из прошлого состояния, а для новых строк — из декодированных записей
+    fresh_id_iter = iter(fresh_ids)
+    records = pd.DataFrame({
+        'id': [known[line_hash] if line_hash in known else next(fresh_id_iter)
+               for line_hash in hashes],
+        'record_hash': hashes,
+    })
+    if state['movies'] is None or summary['added'] or summary['changed'] or summary['removed']:
+        # Без изменений состояние на диске уже совпадает с результатом
+        frames = {name: aggregates[name] for name in AGGREGATE_KEYS}
+        frames[RATINGS_FRAME] = aggregates['ratings'].to_frame()
+        save_prepared(STATE_KEY, {'records': records, 'movies': movies, 'persons': persons,
+                                  **frames}, state_dir, max_bytes=float('inf'))
+
+    return movies, persons, aggregates, summary
+
+
+def update_from_source(stream_url, state_dir=STATE_DIR, fallback=True):
+    """
+    Загружает выгрузку из потока (или нескольких частей потока) и обновляет состояние.
+
+    :param stream_url: URL потока данных или список URL частей потока
+    :param state_dir: Каталог с состоянием
+    :param fallback: Использовать локальный файл, если поток недоступен (см. fetch_raw_lines)
+    :return: См. update_dataset
+    """
+    if isinstance(stream_url, str):
+        lines = fetch_raw_lines(stream_url, fallback)
+    else:
+        lines = fetch_raw_lines_from_streams(stream_url, fallback)
+    movies, persons, aggregates, summary = update_dataset(lines, state_dir)
+    print(f"Инкрементальное обновление: добавлено {summary['added']},"
+          f" изменено {summary['changed']}, удалено {summary['removed']},"
+          f" без изменений {summary['unchanged']}")
+    return movies, persons, aggregates, summary
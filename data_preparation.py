@@ -1,5 +1,12 @@
+import numpy as np
 import pandas as pd
 
+from instrumentation import stage
+
+# Версия логики подготовки данных: увеличивать при любом изменении prepare_data,
+# чтобы сбросить закэшированные подготовленные данные (см. data_cache)
+PREP_VERSION = 1
+
 # Фиксированные курсы валют
 EXCHANGE_RATES = {
     'USD': 90,  # 1 доллар = 90 рублей
@@ -7,6 +14,14 @@ EXCHANGE_RATES = {
     'RUB': 1  # 1 рубль = 1 рублю
 }
 
+# Денежные столбцы: {столбец в рублях: (столбец суммы, столбец валюты)}
+MONEY_COLUMNS = {
+    'budget_rub': ('budget.value', 'budget.currency'),
+    'fees_rub_usa': ('fees.usa.value', 'fees.usa.currency'),
+    'fees_rub_russia': ('fees.russia.value', 'fees.russia.currency'),
+    'fees_rub_world': ('fees.world.value', 'fees.world.currency'),
+}
+
 def convert_to_rub(amount, currency):
     """
     Конвертирует сумму в рубли.
@@ -15,6 +30,29 @@ def convert_to_rub(amount, currency):
         return None
     return amount * EXCHANGE_RATES.get(currency, 1)
 
+def convert_columns_to_rub(df, money_columns=None):
+    """
+    Векторно конвертирует денежные столбцы в рубли за один проход.
+
+    Валюта сопоставляется с EXCHANGE_RATES, неизвестная валюта считается
+    рублями, а пропущенные сумма или валюта дают NaN — как в convert_to_rub.
+
+    :param df: DataFrame с исходными столбцами сумм и валют
+    :param money_columns: Словарь {новый столбец: (столбец суммы, столбец валюты)}
+    :return: DataFrame с добавленными столбцами в рублях
+    """
+    if money_columns is None:
+        money_columns = MONEY_COLUMNS
+
+    converted = {}
+    for target, (value_column, currency_column) in money_columns.items():
+        amount = pd.to_numeric(df[value_column], errors='coerce')
+        currency = df[currency_column]
+        rate = currency.map(EXCHANGE_RATES).astype(float).fillna(1).where(currency.notna())
+        converted[target] = amount * rate
+
+    return df.assign(**converted)
+
 def extract_roles(persons, role_name):
     """
     Извлекает имена людей, соответствующих заданной роли.
@@ -22,37 +60,124 @@ def extract_roles(persons, role_name):
     return [p['name'] for p in persons
             if role_name in p['enProfession']] if isinstance(persons, list) else []
 
-def prepare_data(df):
+def build_person_index(df):
     """
-    Подготавливает данные для анализа.
+    Строит таблицу «фильм — человек» в длинном формате за один проход по persons.
+
+    :param df: DataFrame со столбцами id и persons (списки словарей)
+    :return: DataFrame со столбцами movie_id, person_id, name и категориальным profession
     """
+    movie_ids, person_ids, names, professions = [], [], [], []
+    for movie_id, persons in zip(df['id'], df['persons']):
+        if not isinstance(persons, list):
+            continue
+        for person in persons:
+            movie_ids.append(movie_id)
+            person_ids.append(person.get('id'))
+            names.append(person.get('name'))
+            professions.append(person.get('enProfession'))
 
-    # Преобразуем столбцы genres и countries
-    df['genres'] = (df['genres']
-                    .apply(lambda x: [genre['name'] for genre in x] if isinstance(x, list) else x))
-    df['countries'] = (df['countries']
-                    .apply(lambda x: [country['name'] for country in x] if isinstance(x, list) else x))
+    return pd.DataFrame({
+        'movie_id': movie_ids,
+        'person_id': person_ids,
+        'name': names,
+        'profession': pd.Categorical(professions),
+    })
 
-    # Конвертируем валюты
-    df['budget_rub'] = df.apply(lambda row: convert_to_rub(row['budget.value'],
-                                                           row['budget.currency']), axis=1)
+# Исходные столбцы, которые использует prepare_data; они же — поля,
+# извлекаемые из записей при загрузке (см. data_fetching.project_records)
+SOURCE_COLUMNS = [
+    'id', 'name', 'year', 'genres', 'countries', 'persons', 'rating.kp', 'rating.imdb',
+    'votes.kp', 'votes.imdb', 'budget.value', 'budget.currency',
+    'fees.usa.value', 'fees.usa.currency', 'fees.russia.value', 'fees.russia.currency',
+    'fees.world.value', 'fees.world.currency'
+]
+
+# Столбцы со списками вложенных объектов
+LIST_COLUMNS = ['genres', 'countries', 'persons']
+
+# Исходные столбцы, из которых получается каждый столбец результата prepare_data
+OUTPUT_SOURCES = {
+    'id': ['id'],
+    'name': ['name'],
+    'year': ['year'],
+    'genres': ['genres'],
+    'countries': ['countries'],
+    'rating.kp': ['rating.kp'],
+    'rating.imdb': ['rating.imdb'],
+    'votes.kp': ['votes.kp'],
+    'votes.imdb': ['votes.imdb'],
+    **{target: list(sources) for target, sources in MONEY_COLUMNS.items()},
+    'actors': ['persons'],
+    'directors': ['persons'],
+}
 
-    df['fees_rub_usa'] = df.apply(lambda row: convert_to_rub(row['fees.usa.value'],
-                                                             row['fees.usa.currency']), axis=1)
+# Столбцы, по которым prepare_data отбирает строки; нужны всегда
+FILTER_COLUMNS = ['name', 'rating.kp', 'rating.imdb']
 
-    df['fees_rub_russia'] = df.apply(lambda row: convert_to_rub(row['fees.russia.value'],
-                                                                row['fees.russia.currency']), axis=1)
+def source_columns(columns=None, return_persons=False):
+    """
+    Возвращает исходные столбцы, нужные prepare_data для получения заданных столбцов.
+
+    :param columns: Нужные столбцы результата или None для всех
+    :param return_persons: Нужна ли таблица персон (тогда добавляются id и persons)
+    :return: Список исходных столбцов в порядке SOURCE_COLUMNS
+    """
+    if columns is None:
+        return list(SOURCE_COLUMNS)
+
+    needed = set(FILTER_COLUMNS)
+    for col in columns:
+        needed.update(OUTPUT_SOURCES[col])
+    if return_persons:
+        needed.update(['id', 'persons'])
+    return [col for col in SOURCE_COLUMNS if col in needed]
+
+def prepare_data(df, return_persons=False, columns=None):
+    """
+    Подготавливает данные для анализа.
+
+    :param df: DataFrame с сырыми данными
+    :param return_persons: Вместо списков actors и directors вернуть отдельную
+        таблицу персон (см. build_person_index)
+    :param columns: Вычислить только эти столбцы результата (и столбцы отбора строк);
+        по умолчанию — все
+    :return: DataFrame, либо кортеж (DataFrame, таблица персон) при return_persons=True
+    """
+    sources = source_columns(columns, return_persons)
+    if columns is not None:
+        df = df[[col for col in sources if col in df.columns]]
 
-    df['fees_rub_world'] = df.apply(lambda row: convert_to_rub(row['fees.world.value'],
-                                                               row['fees.world.currency']), axis=1)
+    # В порции потока могут отсутствовать редкие вложенные поля
+    missing_columns = [col for col in sources if col not in df.columns]
+    if missing_columns:
+        df = df.assign(**{col: pd.Series(np.nan, index=df.index,
+                                         dtype=object if col in LIST_COLUMNS else float)
+                          for col in missing_columns})
 
-    # Приведение данных к числовому типу
-    numeric_columns = ['budget_rub', 'fees_rub_usa', 'fees_rub_russia', 'fees_rub_world']
-    df[numeric_columns] = df[numeric_columns].apply(pd.to_numeric, errors='coerce')
+    # Преобразуем столбцы genres и countries
+    with stage('lists', rows=len(df)):
+        if 'genres' in df.columns:
+            df['genres'] = (df['genres']
+                            .apply(lambda x: [genre['name'] for genre in x] if isinstance(x, list) else x)
+                            .astype(object))
+        if 'countries' in df.columns:
+            df['countries'] = (df['countries']
+                            .apply(lambda x: [country['name'] for country in x] if isinstance(x, list) else x)
+                            .astype(object))
+
+    # Конвертируем валюты
+    with stage('currency', rows=len(df)):
+        df = convert_columns_to_rub(df, {target: money for target, money in MONEY_COLUMNS.items()
+                                         if columns is None or target in columns})
 
     # Извлечение актеров и режиссеров
-    df['actors'] = df['persons'].apply(lambda x: extract_roles(x, 'actor'))
-    df['directors'] = df['persons'].apply(lambda x: extract_roles(x, 'director'))
+    with stage('persons', rows=len(df)):
+        if return_persons:
+            persons = build_person_index(df)
+        elif 'persons' in df.columns:
+            df['actors'] = df['persons'].apply(lambda x: extract_roles(x, 'actor'))
+            df['directors'] = df['persons'].apply(lambda x: extract_roles(x, 'director'))
 
     # Оставляем только указанные столбцы
     columns_to_keep = [
@@ -60,13 +185,36 @@ def prepare_data(df):
         'votes.kp', 'votes.imdb', 'budget_rub', 'fees_rub_usa', 'fees_rub_russia', 'fees_rub_world',
         'actors', 'directors'
     ]
+    if columns is not None:
+        columns_to_keep = [col for col in columns_to_keep if col in columns or col in FILTER_COLUMNS
+                           or (return_persons and col == 'id')]
     df = df[[col for col in columns_to_keep if col in df.columns]]
 
     # Очистка данных
-    df.loc[:, 'votes.kp'] = pd.to_numeric(df['votes.kp'], errors='coerce')
-    df = df.dropna(subset=['name'])
-    df.loc[:, 'genres'] = df['genres'].fillna('неизвестно')
-    df.loc[:, 'countries'] = df['countries'].fillna('неизвестно')
-    df = df[(df['rating.kp'] > 0) & (df['rating.imdb'] > 0)]
+    with stage('clean', rows=len(df)) as record:
+        if 'votes.kp' in df.columns:
+            df.loc[:, 'votes.kp'] = pd.to_numeric(df['votes.kp'], errors='coerce')
+        df = df.dropna(subset=['name'])
+        for col in ('genres', 'countries'):
+            if col in df.columns:
+                df.loc[:, col] = df[col].fillna('неизвестно')
+        df = df[(df['rating.kp'] > 0) & (df['rating.imdb'] > 0)]
+        record['rows_out'] = len(df)
+
+    if return_persons:
+        persons = persons[persons['movie_id'].isin(df['id'])].reset_index(drop=True)
+        return df, persons
 
     return df
+
+
+def prepare_data_chunks(chunks, return_persons=False):
+    """
+    Подготавливает данные, поступающие порциями (см. data_fetching.iter_data_chunks).
+
+    :param chunks: Итерируемый набор DataFrame с сырыми данными
+    :param return_persons: См. prepare_data
+    :return: Генератор подготовленных порций
+    """
+    for chunk in chunks:
+        yield prepare_data(chunk, return_persons=return_persons)
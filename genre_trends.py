@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+
+from selection import top_k
+
+# Динамика жанров по годам. Количество фильмов хранится в плотной матрице
+# «год × жанр», которая строится один раз через np.bincount; диапазон лет,
+# сглаживание, доли и выбор лучших жанров — срезы и операции над этой матрицей.
+
+
+class GenreTrends:
+    """
+    Количество фильмов каждого жанра по годам.
+
+    counts[i, j] — число фильмов жанра genres[j] в году first_year + i.
+    """
+
+    def __init__(self, counts, first_year, genres):
+        self.counts = counts
+        self.first_year = int(first_year)
+        self.genres = pd.Index(genres)
+
+    @classmethod
+    def from_codes(cls, years, genre_codes, genres, weights=None):
+        """
+        Строит матрицу по году и коду жанра каждой пары «фильм — жанр».
+
+        :param years: Годы (пары с пропущенным годом не учитываются)
+        :param genre_codes: Коды жанров, например Categorical.codes (-1 — нет жанра)
+        :param genres: Названия жанров по кодам
+        :param weights: Количество фильмов для каждой пары; None — по одному
+        """
+        years = np.asarray(years, dtype=float)
+        codes = np.asarray(genre_codes)
+        valid = ~np.isnan(years) & (codes >= 0)
+        years, codes = years[valid].astype(np.int64), codes[valid]
+        if weights is not None:
+            weights = np.asarray(weights)[valid]
+        if not len(years):
+            return cls(np.zeros((0, len(genres)), dtype=np.int64), 0, genres)
+
+        # Один проход: номер ячейки = смещение года × число жанров + код жанра
+        first_year = years.min()
+        n_years = years.max() - first_year + 1
+        flat = (years - first_year) * len(genres) + codes
+        counts = np.bincount(flat, weights, minlength=n_years * len(genres)).astype(np.int64)
+        return cls(counts.reshape(n_years, len(genres)), first_year, genres)
+
+    @classmethod
+    def from_counts(cls, year_genre_counts):
+        """
+        Строит матрицу по готовым счётчикам в длинном формате.
+
+        :param year_genre_counts: DataFrame со столбцами year, genres (категориальный) и count
+        """
+        genres = year_genre_counts['genres'].cat
+        return cls.from_codes(year_genre_counts['year'], genres.codes, genres.categories,
+                              year_genre_counts['count'])
+
+    @property
+    def years(self):
+        return np.arange(self.first_year, self.first_year + len(self.counts))
+
+    def _derive(self, counts, first_year=None, genres=None):
+        return GenreTrends(counts, self.first_year if first_year is None else first_year,
+                           self.genres if genres is None else genres)
+
+    def window(self, start=None, end=None):
+        """
+        Годы от start до end включительно (None — без ограничения).
+        Возвращает срез без копирования матрицы.
+        """
+        first = 0 if start is None else max(start - self.first_year, 0)
+        last = len(self.counts) if end is None else max(end - self.first_year + 1, 0)
+        return self._derive(self.counts[first:last], self.first_year + first)
+
+    def select(self, positions):
+        """
+        Жанры с заданными позициями (в заданном порядке).
+        """
+        positions = np.asarray(positions, dtype=np.intp)
+        return self._derive(self.counts[:, positions], genres=self.genres[positions])
+
+    def rolling(self, window):
+        """
+        Скользящее среднее по window годам, заканчивающимся текущим
+        (в первых годах — по имеющимся).
+        """
+        cumulative = np.cumsum(self.counts, axis=0, dtype=float)
+        shifted = np.zeros_like(cumulative)
+        shifted[window:] = cumulative[:-window]
+        sizes = np.minimum(np.arange(1, len(self.counts) + 1), window)[:, np.newaxis]
+        return self._derive((cumulative - shifted) / sizes)
+
+    def shares(self):
+        """
+        Доля каждого жанра среди пар «фильм — жанр» года (строки с нулевым итогом — нули).
+        """
+        totals = self.counts.sum(axis=1, keepdims=True)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self._derive(np.where(totals > 0, self.counts / totals, 0.0))
+
+    def totals(self):
+        """
+        Количество фильмов каждого жанра за все годы.
+        """
+        return self.counts.sum(axis=0)
+
+    def top(self, k, by='films'):
+        """
+        Позиции k лучших жанров в порядке убывания.
+
+        :param k: Сколько жанров выбрать
+        :param by: 'films' — по числу фильмов; 'years' — по числу лет, в которые
+            выходили фильмы жанра (при равенстве раньше жанр, появившийся раньше)
+        """
+        if by == 'films':
+            return top_k(self.totals(), k, largest=True)
+        if by == 'years':
+            present = self.counts > 0
+            first_seen = np.where(present.any(axis=0), present.argmax(axis=0), len(self.counts))
+            return top_k(np.column_stack([present.sum(axis=0), -first_seen]), k, largest=True)
+        raise ValueError(f"Неизвестный критерий: {by}")
+
+    def order(self):
+        """
+        Названия жанров, у которых есть фильмы, в порядке убывания числа фильмов.
+        """
+        positions = self.top(len(self.genres))
+        return self.genres[positions[self.totals()[positions] > 0]]
+
+    def to_frame(self, drop_zero=True):
+        """
+        Длинная таблица со столбцами year, genres и count (как у groupby по году и жанру).
+
+        :param drop_zero: Не включать сочетания года и жанра без фильмов
+        """
+        year_positions, genre_positions = np.indices(self.counts.shape)
+        frame = pd.DataFrame({
+            'year': (year_positions + self.first_year).ravel(),
+            'genres': pd.Categorical.from_codes(genre_positions.ravel(), categories=self.genres),
+            'count': self.counts.ravel(),
+        })
+        if drop_zero:
+            frame = frame[frame['count'] != 0].reset_index(drop=True)
+        return frame
@@ -0,0 +1,160 @@
+import contextlib
+import cProfile
+import json
+import os
+import re
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # resource есть только в Unix
+    resource = None
+
+# Необязательный замер этапов обработки: время (общее и процессорное), пиковая
+# память и число строк. По умолчанию замер выключен и stage() ничего не делает;
+# включается через enable(), например из командной строки (см. main.py).
+
+
+def _peak_rss_bytes():
+    if resource is None:
+        return None
+    # В Linux ru_maxrss — в килобайтах
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Instrumentation:
+    """
+    Собирает замеры этапов. Этапы могут быть вложенными: имя вложенного этапа
+    дополняется именем внешнего через '/'.
+    """
+
+    def __init__(self, trace_memory=False, profile_dir=None):
+        """
+        :param trace_memory: Считать пик выделенной Python-памяти через tracemalloc
+            (замедляет выполнение)
+        :param profile_dir: Каталог для файлов cProfile по этапам или None
+        """
+        self.trace_memory = trace_memory
+        self.profile_dir = profile_dir
+        self.stages = []
+        self.started = time.time()
+        self._stack = []
+        self._profiling = False
+
+        # tracemalloc останавливается в disable(), только если его запустили здесь
+        self.started_tracing = trace_memory and not tracemalloc.is_tracing()
+        if self.started_tracing:
+            tracemalloc.start()
+        if profile_dir:
+            os.makedirs(profile_dir, exist_ok=True)
+
+    @contextlib.contextmanager
+    def stage(self, name, rows=None):
+        """
+        Замеряет этап. Число строк можно указать сразу или записать
+        в возвращаемый словарь: record['rows'] = len(df).
+        """
+        full_name = f"{self._stack[-1]['name']}/{name}" if self._stack else name
+        record = {'name': full_name, 'rows': rows}
+
+        if self.trace_memory:
+            # Пик внешнего этапа сохраняем до сброса счётчика для вложенного
+            if self._stack:
+                parent = self._stack[-1]
+                parent['_peak'] = max(parent['_peak'], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            record['_peak'] = 0
+
+        profiler = None
+        if self.profile_dir and not self._profiling:
+            # Одновременно может работать только один профилировщик
+            profiler = cProfile.Profile()
+            self._profiling = True
+            profiler.enable()
+
+        self._stack.append(record)
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield record
+        finally:
+            record['wall_time'] = time.perf_counter() - wall_start
+            record['cpu_time'] = time.process_time() - cpu_start
+            self._stack.pop()
+
+            if profiler is not None:
+                profiler.disable()
+                self._profiling = False
+                safe_name = re.sub(r'[^\w.-]+', '_', full_name)
+                file_name = f"{len(self.stages):03d}-{safe_name}.prof"
+                record['profile'] = os.path.join(self.profile_dir, file_name)
+                profiler.dump_stats(record['profile'])
+
+            if self.trace_memory:
+                peak = max(record.pop('_peak'), tracemalloc.get_traced_memory()[1])
+                record['peak_traced_bytes'] = peak
+                if self._stack:
+                    parent = self._stack[-1]
+                    parent['_peak'] = max(parent['_peak'], peak)
+
+            record['peak_rss_bytes'] = _peak_rss_bytes()
+            self.stages.append(record)
+
+    def report(self):
+        """
+        Отчёт о замерах в виде словаря, пригодного для JSON.
+        Этапы перечислены в порядке завершения (вложенные — раньше внешних).
+        """
+        return {
+            'started': self.started,
+            'wall_time': time.time() - self.started,
+            'peak_rss_bytes': _peak_rss_bytes(),
+            'stages': self.stages,
+        }
+
+    def save(self, path):
+        """
+        Сохраняет отчёт о замерах в JSON-файл.
+        """
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(self.report(), file, ensure_ascii=False, indent=2)
+
+
+# Текущий сборщик замеров; None — замер выключен
+_current = None
+
+
+def enable(trace_memory=False, profile_dir=None):
+    """
+    Включает замер этапов.
+
+    :return: Instrumentation, в который записываются замеры
+    """
+    global _current
+    _current = Instrumentation(trace_memory, profile_dir)
+    return _current
+
+
+def disable():
+    """
+    Выключает замер этапов и возвращает собранный Instrumentation (или None).
+    """
+    global _current
+    instrumentation, _current = _current, None
+    if instrumentation is not None and instrumentation.started_tracing:
+        tracemalloc.stop()
+    return instrumentation
+
+
+def stage(name, rows=None):
+    """
+    Контекстный менеджер для замера этапа; при выключенном замере ничего не делает.
+
+    :param name: Имя этапа
+    :param rows: Число строк на входе этапа, если известно
+    :return: Контекстный менеджер, возвращающий словарь с записью этапа
+    """
+    if _current is None:
+        return contextlib.nullcontext({})
+    return _current.stage(name, rows)
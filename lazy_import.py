@@ -0,0 +1,63 @@
+import importlib
+
+# Отложенный импорт тяжёлых библиотек (seaborn, matplotlib, scipy, python-docx):
+# модуль загружается при первом обращении к его атрибуту или первом вызове,
+# а не при импорте модуля, который его использует.
+
+
+def use_agg_backend():
+    """
+    Включает неинтерактивный бэкенд Agg до загрузки matplotlib.pyplot:
+    отчёт строится без дисплея, а интерактивные бэкенды не загружаются.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+class LazyImport:
+    """
+    Заместитель модуля или объекта из модуля, загружаемого при первом использовании.
+
+    LazyImport('matplotlib.pyplot') ведёт себя как модуль, а
+    LazyImport('docx', 'Document') — как класс Document (его можно вызывать).
+    Заместитель — обычный атрибут модуля, поэтому его можно подменить в тестах
+    через unittest.mock.patch.
+    """
+
+    def __init__(self, module_name, attribute=None, setup=None):
+        """
+        :param module_name: Имя импортируемого модуля
+        :param attribute: Имя объекта в модуле или None для самого модуля
+        :param setup: Функция, вызываемая один раз перед импортом
+        """
+        self._module_name = module_name
+        self._attribute = attribute
+        self._setup = setup
+        self._target = None
+
+    def _load(self):
+        if self._target is None:
+            if self._setup is not None:
+                self._setup()
+            target = importlib.import_module(self._module_name)
+            if self._attribute is not None:
+                target = getattr(target, self._attribute)
+            self._target = target
+        return self._target
+
+    @property
+    def loaded(self):
+        return self._target is not None
+
+    def __getattr__(self, name):
+        # Вызывается только для атрибутов, которых нет у самого заместителя
+        if name.startswith('__') or name in ('_target', '_module_name', '_attribute', '_setup'):
+            raise AttributeError(name)
+        return getattr(self._load(), name)
+
+    def __call__(self, *args, **kwargs):
+        return self._load()(*args, **kwargs)
+
+    def __repr__(self):
+        name = self._module_name + (f".{self._attribute}" if self._attribute else "")
+        return f"<LazyImport {name}{' (loaded)' if self.loaded else ''}>"
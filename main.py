@@ -1,17 +1,271 @@
-from data_fetching import fetch_data_from_stream_or_file
-from data_preparation import prepare_data
-from data_analysis import analyze_all
+import argparse
 import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from data_fetching import (LOCAL_FILE_PATH, fetch_data_from_stream_or_file, fetch_data_from_streams,
+                           lines_to_dataframe, read_file_lines)
+from data_preparation import prepare_data, source_columns
+from data_analysis import (FIGURE_DPI, FIGURE_FORMAT, FIGURE_FORMATS, LARGE_PLOT_POINTS,
+                           PERSON_SECTIONS, REPORT_SECTIONS, AnalysisContext, analyze_all,
+                           required_columns)
+from person_ranking import MIN_PERSON_FILMS
+from data_cache import load_or_prepare
+from data_incremental import update_from_source
+from data_compact import compact_frame, expand_frame, memory_report
+import instrumentation
+from instrumentation import stage
+import report_service
+from section_cache import SectionCache
 
 # URL для потока данных из переменной окружения
 STREAM_URL = os.getenv("STREAM_URL", "http://5.181.20.204:8080/api/v1/stream-data")
 
-# Получение данных
-df = fetch_data_from_stream_or_file(STREAM_URL)
+# Необязательный список частей потока через запятую; загружаются одновременно
+STREAM_URLS = [url for url in os.getenv("STREAM_URLS", "").split(",") if url]
+
+# Инкрементальный режим: обрабатываются только новые и изменённые фильмы
+INCREMENTAL = os.getenv("INCREMENTAL", "0") == "1"
+
+# Количество процессов для построения графиков (1 — последовательно)
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "1"))
+
+# Число точек, после которого точечные графики строятся как плотность или по выборке
+MAX_PLOT_POINTS = int(os.getenv("MAX_PLOT_POINTS", str(LARGE_PLOT_POINTS)))
+
+# Компактное хранение подготовленных данных (узкие типы, списки в виде кодов)
+COMPACT = os.getenv("COMPACT", "0") == "1"
+
+# Кэш подготовленных данных как источник по умолчанию (каталог задаётся DATA_CACHE_DIR)
+DATA_CACHE = os.getenv("DATA_CACHE", "0") == "1"
+
+# Источники данных: поток, локальный файл, кэш подготовленных данных, инкрементальное состояние
+SOURCES = ['stream', 'file', 'cache', 'incremental']
+
+# Кэш готовых разделов отчёта (каталог задаётся SECTION_CACHE_DIR)
+SECTION_CACHE = os.getenv("SECTION_CACHE", "0") == "1"
+
+# Интервал обновления данных в режиме сервиса, секунд (0 — не обновлять)
+REFRESH_INTERVAL = int(os.getenv("REFRESH_INTERVAL", str(report_service.REFRESH_INTERVAL)))
+
+# Форматы отчёта; pdf получается из docx через LibreOffice
+OUTPUT_FORMATS = ['docx', 'pdf']
+
+
+def parse_args(argv=None):
+    """
+    Разбирает аргументы командной строки; значения по умолчанию берутся из окружения.
+    """
+    if INCREMENTAL:
+        default_source = 'incremental'
+    elif DATA_CACHE:
+        default_source = 'cache'
+    else:
+        default_source = 'stream'
+
+    parser = argparse.ArgumentParser(
+        prog="python -m main",
+        description="Отчёт по фильмам Кинопоиска. Без аргументов строится полный отчёт.")
+    parser.add_argument("--sections", nargs="+", choices=list(REPORT_SECTIONS), metavar="SECTION",
+                        help="Разделы отчёта: " + ", ".join(REPORT_SECTIONS) + " (по умолчанию все)")
+    parser.add_argument("--source", choices=SOURCES, default=default_source,
+                        help=f"Источник данных (по умолчанию {default_source})")
+    parser.add_argument("--url", action="append", dest="urls",
+                        help="URL потока; несколько --url загружаются одновременно как части потока")
+    parser.add_argument("--file", default=LOCAL_FILE_PATH,
+                        help="Локальный файл с JSON-записями для --source file")
+    parser.add_argument("--output", default="analysis_result.docx", help="Путь к файлу отчёта")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS,
+                        help="Формат отчёта (по умолчанию по расширению --output)")
+    parser.add_argument("--workers", type=int, default=REPORT_WORKERS,
+                        help="Количество процессов для построения графиков")
+    parser.add_argument("--max-plot-points", type=int, default=MAX_PLOT_POINTS,
+                        help="Порог числа точек для облегчённых графиков")
+    parser.add_argument("--figure-format", choices=FIGURE_FORMATS, default=FIGURE_FORMAT,
+                        help=f"Формат изображений графиков (по умолчанию {FIGURE_FORMAT})")
+    parser.add_argument("--figure-dpi", type=int, default=FIGURE_DPI,
+                        help="Разрешение изображений графиков (по умолчанию как в matplotlib)")
+    parser.add_argument("--min-films", type=int, default=MIN_PERSON_FILMS,
+                        help="Минимальное число фильмов человека в рейтингах персон")
+    parser.add_argument("--prior-weight", type=float, default=0,
+                        help="Вес байесовского сглаживания средних в рейтингах персон (0 — без него)")
+    parser.add_argument("--compact", action="store_true", default=COMPACT,
+                        help="Хранить подготовленные данные в компактном виде")
+    parser.add_argument("--section-cache", action="store_true", default=SECTION_CACHE,
+                        help="Брать из кэша разделы, входные столбцы и параметры которых не изменились")
+    parser.add_argument("--metrics", metavar="PATH",
+                        help="Записать в JSON время, память и число строк по этапам и разделам")
+    parser.add_argument("--profile-dir", metavar="DIR",
+                        help="Сохранить профили cProfile по этапам в каталог")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Считать пик Python-памяти этапов через tracemalloc (медленнее)")
+    parser.add_argument("--serve", action="store_true",
+                        help="Режим сервиса: держать данные в памяти и строить разделы по HTTP-запросам")
+    parser.add_argument("--host", default="127.0.0.1", help="Адрес сервиса для --serve")
+    parser.add_argument("--port", type=int, default=8080, help="Порт сервиса для --serve")
+    parser.add_argument("--refresh-interval", type=int, default=REFRESH_INTERVAL,
+                        help="Интервал обновления данных сервиса, секунд (0 — не обновлять)")
+
+    args = parser.parse_args(argv)
+    if args.urls is None:
+        args.urls = STREAM_URLS or [STREAM_URL]
+    if args.format is None:
+        args.format = 'pdf' if args.output.lower().endswith('.pdf') else 'docx'
+    return args
+
+
+def load_data(args, fallback=True):
+    """
+    Загружает и подготавливает данные для выбранных разделов.
+
+    Поток, файл и кэш декодируют и подготавливают только столбцы, нужные
+    разделам; инкрементальное состояние хранит полный набор.
+
+    :param fallback: Использовать локальный файл, если поток недоступен; при False
+        ошибка потока пробрасывается (так обновляет данные режим сервиса)
+    :return: Кортеж (DataFrame с фильмами, таблица персон или None, AnalysisContext или None)
+    """
+    with_persons = args.sections is None or any(s in PERSON_SECTIONS for s in args.sections)
+    columns = None if args.sections is None else required_columns(args.sections)
+    source = args.urls[0] if len(args.urls) == 1 else args.urls
+
+    if args.source == 'incremental':
+        # Обновление сохранённого набора данных только по изменившимся записям
+        with stage('incremental') as record:
+            df, persons, aggregates, _ = update_from_source(source, fallback=fallback)
+            record['rows'] = len(df)
+        # Разделы о жанрах, персонах и оценках берут агрегаты, обновлённые по разнице
+        context = AnalysisContext(df, year_genre_counts=aggregates['genre_year_counts'],
+                                  person_stats=aggregates['person_stats'],
+                                  ratings=aggregates['ratings'])
+        return df, persons, context
+
+    if args.source == 'cache':
+        # Получение и подготовка данных с использованием кэша
+        with stage('cache') as record:
+            df, persons = load_or_prepare(source, fallback=fallback, columns=columns,
+                                          with_persons=with_persons)
+            record['rows'] = len(df)
+        return df, persons, None
+
+    # Получение данных: извлекаем только поля, которые нужны выбранным разделам
+    fields = source_columns(columns, return_persons=with_persons)
+    with stage('fetch') as record:
+        if args.source == 'file':
+            df = lines_to_dataframe(read_file_lines(args.file), fields)
+        elif isinstance(source, list):
+            df = fetch_data_from_streams(source, fields=fields, fallback=fallback)
+        else:
+            df = fetch_data_from_stream_or_file(source, fields=fields, fallback=fallback)
+        record['rows'] = len(df)
+
+    # Подготовка данных
+    with stage('prepare', rows=len(df)) as record:
+        if with_persons:
+            df, persons = prepare_data(df, return_persons=True, columns=columns)
+        else:
+            df, persons = prepare_data(df, columns=columns), None
+        record['rows_out'] = len(df)
+    return df, persons, None
+
+
+def load_report_data(args, fallback=True):
+    """
+    Загружает данные (см. load_data) и при --compact переводит их в компактный вид.
+
+    :return: Кортеж (DataFrame с фильмами, таблица персон или None, AnalysisContext или None)
+    """
+    df, persons, context = load_data(args, fallback)
+
+    if args.compact and 'genres' in df.columns:
+        frame, lists = compact_frame(df)
+        print("Память подготовленных данных, байт:")
+        print(memory_report(df, frame, lists))
+
+        # Для таблиц отчёта восстанавливаем только жанры; разворачиваются они из кодов
+        df = expand_frame(frame, lists, columns=['genres'])
+        seeded = {}
+        if context is not None:
+            seeded = dict(year_genre_counts=context.year_genre_counts,
+                          person_stats=context.person_stats, ratings=context.ratings)
+        context = AnalysisContext(df, genre_lists=lists['genres'], **seeded)
+    return df, persons, context
+
+
+def find_soffice():
+    """
+    Путь к LibreOffice (soffice) или None, если он не установлен.
+    """
+    return shutil.which("soffice") or shutil.which("libreoffice")
+
+
+def convert_to_pdf(docx_path, output_path):
+    """
+    Конвертирует отчёт docx в pdf с помощью LibreOffice (soffice).
+    """
+    soffice = find_soffice()
+    if soffice is None:
+        raise RuntimeError("Для отчёта в формате pdf нужен LibreOffice (soffice)")
+
+    out_dir = os.path.dirname(docx_path)
+    subprocess.run([soffice, "--headless", "--convert-to", "pdf", "--outdir", out_dir, docx_path],
+                   check=True, capture_output=True)
+    shutil.move(os.path.splitext(docx_path)[0] + ".pdf", output_path)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.format == 'pdf' and find_soffice() is None:
+        # Проверяем до загрузки данных, чтобы не строить отчёт впустую
+        print("Для отчёта в формате pdf нужен LibreOffice (soffice)", file=sys.stderr)
+        return 2
+
+    if args.serve:
+        # Данные загружаются при запуске и при каждом обновлении тем же способом, что и для отчёта,
+        # но без перехода на локальный файл: при недоступном потоке остаются текущие данные
+        report_service.serve(lambda: load_report_data(args, fallback=False), args.host,
+                             args.port, args.refresh_interval, figure_format=args.figure_format,
+                             figure_dpi=args.figure_dpi, max_points=args.max_plot_points,
+                             min_films=args.min_films, prior_weight=args.prior_weight)
+        return 0
+
+    if args.metrics or args.profile_dir:
+        instrumentation.enable(trace_memory=args.trace_memory, profile_dir=args.profile_dir)
+
+    try:
+        df, persons, context = load_report_data(args)
+
+        # Выполнение анализа и визуализации
+        section_cache = SectionCache() if args.section_cache else None
+        analysis_args = dict(persons=persons, workers=args.workers, context=context,
+                             max_points=args.max_plot_points, sections=args.sections,
+                             min_films=args.min_films, prior_weight=args.prior_weight,
+                             figure_format=args.figure_format, figure_dpi=args.figure_dpi,
+                             section_cache=section_cache)
+        with stage('report'):
+            if args.format == 'docx':
+                analyze_all(df, output_path=args.output, **analysis_args)
+            else:
+                with tempfile.TemporaryDirectory() as tmp_dir:
+                    docx_path = analyze_all(df, output_path=os.path.join(tmp_dir, "report.docx"),
+                                            **analysis_args)
+                    with stage('pdf'):
+                        convert_to_pdf(docx_path, args.output)
 
-# Подготовка данных
-df = prepare_data(df)
+        print(f"Отчёт сохранён: {args.output}")
+        if section_cache is not None:
+            total = section_cache.hits + section_cache.misses
+            print(f"Разделов из кэша: {section_cache.hits} из {total}")
+    finally:
+        # Замеры сохраняются и при ошибке: этапы до неё уже записаны
+        collected = instrumentation.disable()
+        if collected is not None and args.metrics:
+            collected.save(args.metrics)
+            print(f"Замеры этапов сохранены: {args.metrics}")
+    return 0
 
-# Выполнение анализа и визуализации
 
-analyze_all(df)
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+import numpy as np
+import pandas as pd
+
+from selection import top_k
+
+# Рейтинг персон по средним оценкам их фильмов. Индекс «фильм — человек»
+# строится один раз для профессии, после чего для любого подмножества фильмов
+# средние считаются одним проходом np.bincount, а лучшие k выбираются
+# частичной сортировкой (np.partition) вместо полной сортировки таблицы.
+
+# Оценки, по которым считаются средние; первая — основной ключ сортировки
+RATING_COLUMNS = ['rating.kp', 'rating.imdb']
+
+# Минимальное число фильмов человека в рейтинге по умолчанию
+MIN_PERSON_FILMS = 1
+
+
+def group_sums(codes, values, size):
+    """
+    Суммы значений по группам без учёта пропусков.
+
+    :param codes: Номера групп (целые от 0 до size - 1)
+    :param values: Массив значений формы (len(codes), число столбцов)
+    :param size: Число групп
+    :return: (число строк в группе, суммы по столбцам, число непропущенных значений)
+    """
+    counts = np.bincount(codes, minlength=size)
+    sums = np.empty((size, values.shape[1]))
+    valid_counts = np.empty((size, values.shape[1]), dtype=np.int64)
+    for column in range(values.shape[1]):
+        valid = ~np.isnan(values[:, column])
+        sums[:, column] = np.bincount(codes[valid], values[valid, column], minlength=size)
+        valid_counts[:, column] = np.bincount(codes[valid], minlength=size)
+    return counts, sums, valid_counts
+
+
+class PersonIndex:
+    """
+    Индекс «фильм — человек» для одной профессии: для каждой пары хранится
+    позиция фильма в таблице фильмов и код имени (имена упорядочены по алфавиту).
+    """
+
+    def __init__(self, movie_positions, codes, names):
+        self.movie_positions = np.asarray(movie_positions, dtype=np.intp)
+        self.codes = np.asarray(codes, dtype=np.intp)
+        self.names = names
+
+    @classmethod
+    def from_persons(cls, movies, persons, role):
+        """
+        Строит индекс по таблице персон из prepare_data(return_persons=True).
+
+        :param movies: DataFrame с фильмами (столбец id)
+        :param persons: Таблица персон (movie_id, name, категориальный profession)
+        :param role: Профессия ('actor' или 'director')
+        """
+        # Как и extract_roles, ищем профессию по вхождению подстроки
+        professions = persons['profession'].cat.categories
+        role_professions = professions[professions.str.contains(role, regex=False)]
+        role_persons = persons.loc[persons['profession'].isin(role_professions),
+                                   ['movie_id', 'name']]
+        codes, names = pd.factorize(role_persons['name'], sort=True)
+
+        movie_ids = pd.Index(movies['id'])
+        if movie_ids.is_unique:
+            positions = movie_ids.get_indexer(role_persons['movie_id'])
+        else:
+            # Повторяющиеся id: каждая пара соединяется со всеми фильмами с этим id
+            pairs = pd.DataFrame({'movie_id': role_persons['movie_id'].to_numpy(), 'code': codes})
+            pairs = pairs.merge(pd.DataFrame({'movie_id': movie_ids, 'position': np.arange(len(movies))}),
+                                on='movie_id', how='left')
+            positions = pairs['position'].fillna(-1).to_numpy(dtype=np.intp)
+            codes = pairs['code'].to_numpy()
+
+        keep = (codes >= 0) & (positions >= 0)
+        return cls(positions[keep], codes[keep], names)
+
+    @classmethod
+    def from_lists(cls, movies, role_column):
+        """
+        Строит индекс по столбцу со списками имён (actors или directors).
+        """
+        exploded = movies[role_column].reset_index(drop=True).explode()
+        codes, names = pd.factorize(exploded, sort=True)
+        positions = exploded.index.to_numpy()
+        keep = codes >= 0
+        return cls(positions[keep], codes[keep], names)
+
+    def aggregate(self, ratings, movie_mask=None):
+        """
+        Число фильмов и средние оценки каждого человека.
+
+        :param ratings: Массив оценок фильмов формы (число фильмов, число оценок)
+        :param movie_mask: Булев массив отобранных фильмов или None для всех
+        :return: (число фильмов, суммы, число оценок, средние) по кодам имён
+        """
+        positions, codes = self.movie_positions, self.codes
+        if movie_mask is not None:
+            keep = np.asarray(movie_mask, dtype=bool)[positions]
+            positions, codes = positions[keep], codes[keep]
+
+        counts, sums, valid_counts = group_sums(codes, ratings[positions], len(self.names))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = sums / valid_counts
+        return counts, sums, valid_counts, means
+
+    def rank(self, ratings, movie_mask=None, k=10, largest=True, min_films=MIN_PERSON_FILMS,
+             prior_weight=0):
+        """
+        Лучшие (или худшие) k человек по средним оценкам их фильмов.
+
+        :param ratings: Массив оценок фильмов формы (число фильмов, число оценок)
+        :param movie_mask: Булев массив отобранных фильмов или None для всех
+        :return: См. rank_sums
+        """
+        counts, sums, valid_counts, _ = self.aggregate(ratings, movie_mask)
+        return rank_sums(self.names, counts, sums, valid_counts, k, largest, min_films,
+                         prior_weight)
+
+
+def rank_sums(names, counts, sums, valid_counts, k=10, largest=True, min_films=MIN_PERSON_FILMS,
+              prior_weight=0):
+    """
+    Лучшие (или худшие) k человек по суммам оценок их фильмов, например
+    из PersonIndex.aggregate или из сохранённых сумм инкрементального режима.
+
+    :param names: Имена в порядке возрастания (при равных средних первым идёт меньшее)
+    :param counts: Число фильмов каждого человека
+    :param sums: Суммы оценок формы (число людей, число оценок)
+    :param valid_counts: Число непропущенных оценок той же формы
+    :param k: Размер рейтинга
+    :param largest: True — наибольшие средние, False — наименьшие
+    :param min_films: Минимальное число фильмов человека
+    :param prior_weight: Вес байесовского сглаживания: средние сортируются как
+        (сумма + prior_weight * общее среднее) / (число оценок + prior_weight),
+        так что у людей с одним-двумя фильмами оценка ближе к общему среднему
+    :return: DataFrame со столбцами name, films, avg_kp_rating, avg_imdb_rating
+        (без сглаживания) в порядке рейтинга
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / valid_counts
+
+    scores = means
+    if prior_weight:
+        # Общее среднее по всем парам «фильм — человек» отобранных фильмов
+        with np.errstate(invalid='ignore', divide='ignore'):
+            prior = sums.sum(axis=0) / valid_counts.sum(axis=0)
+            scores = (sums + prior_weight * prior) / (valid_counts + prior_weight)
+
+    eligible = np.flatnonzero(counts >= max(min_films, 1))
+    selected = eligible[top_k(scores[eligible], k, largest)]
+    return pd.DataFrame({
+        'name': np.asarray(names)[selected],
+        'films': counts[selected],
+        'avg_kp_rating': means[selected, 0],
+        'avg_imdb_rating': means[selected, 1],
+    })
+
+
+def movie_ratings(movies):
+    """
+    Оценки фильмов в виде массива для PersonIndex.aggregate и PersonIndex.rank.
+    """
+    return movies[RATING_COLUMNS].to_numpy(dtype=float)
@@ -0,0 +1,342 @@
+import io
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from data_analysis import (FIGURE_DPI, FIGURE_FORMAT, LARGE_PLOT_POINTS, REPORT_SECTIONS,
+                           AnalysisContext, Document, InlineFigureRenderer, analyze_all,
+                           build_report)
+from person_ranking import MIN_PERSON_FILMS
+
+# Режим сервиса: данные загружаются и подготавливаются один раз, хранятся
+# в памяти вместе с общими агрегатами (AnalysisContext) и обновляются по
+# расписанию, а отдельные разделы отчёта строятся по запросу:
+#
+#   GET  /health                          — состояние набора данных
+#   GET  /sections                        — список разделов
+#   GET  /sections/<раздел>?format=json   — таблицы и текст раздела в JSON
+#   GET  /sections/<раздел>?format=docx   — раздел в виде документа Word
+#   GET  /sections/<раздел>?format=image&figure=0 — изображение графика раздела
+#   GET  /report?sections=a,b             — отчёт целиком (или выбранные разделы)
+#   POST /refresh                         — перезагрузить данные немедленно
+#
+# Время обработки запроса в миллисекундах возвращается в заголовке X-Elapsed-Ms.
+
+# Интервал обновления данных по умолчанию, секунд (0 — не обновлять)
+REFRESH_INTERVAL = 3600
+
+SECTION_FORMATS = ['json', 'docx', 'image']
+
+DOCX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+IMAGE_CONTENT_TYPES = {'png': 'image/png', 'jpeg': 'image/jpeg', 'tiff': 'image/tiff'}
+
+
+class _SingleFigureRenderer(InlineFigureRenderer):
+    """
+    Строит только один график раздела (по номеру), остальные только считает.
+    """
+
+    def __init__(self, figure, image_format=FIGURE_FORMAT, dpi=FIGURE_DPI):
+        super().__init__(image_format, dpi)
+        self.figure = figure
+        self.figures = 0
+        self.image = None
+
+    def submit(self, doc, plot, args, **picture_kwargs):
+        if self.figures == self.figure:
+            self.image = self.render(plot, args)
+        self.figures += 1
+
+
+class _SkipFiguresRenderer:
+    """
+    Не строит графики, а только считает их: для ответов без изображений.
+    """
+
+    def __init__(self):
+        self.figures = 0
+
+    def submit(self, doc, plot, args, **picture_kwargs):
+        self.figures += 1
+
+    def finish(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def document_to_json(doc):
+    """
+    Содержимое документа в виде списка блоков для JSON-ответа.
+
+    :param doc: Документ Word
+    :return: Список словарей: {'type': 'heading', 'level', 'text'},
+        {'type': 'paragraph', 'text'} и {'type': 'table', 'columns', 'rows'}
+    """
+    blocks = []
+    for item in doc.iter_inner_content():
+        if hasattr(item, 'rows'):
+            rows = [[cell.text for cell in row.cells] for row in item.rows]
+            blocks.append({'type': 'table', 'columns': rows[0] if rows else [], 'rows': rows[1:]})
+            continue
+
+        text = item.text
+        style = item.style.name if item.style is not None else ''
+        if style.startswith('Heading') or style == 'Title':
+            level = int(style.split()[-1]) if style.split()[-1].isdigit() else 0
+            blocks.append({'type': 'heading', 'level': level, 'text': text})
+        elif text:
+            # Пустые абзацы (в том числе места изображений) пропускаются
+            blocks.append({'type': 'paragraph', 'text': text})
+    return blocks
+
+
+class ReportService:
+    """
+    Набор данных в памяти и построение разделов отчёта по запросу.
+
+    Загрузка выполняется функцией load, которая возвращает кортеж
+    (DataFrame с фильмами, таблица персон или None, AnalysisContext или None),
+    как main.load_report_data(args, fallback=False). Если источник недоступен,
+    load должна выбрасывать исключение, а не подставлять другие данные (например,
+    локальный файл): тогда остаются старые данные, а ошибка видна в /health.
+    Новый набор данных подготавливается полностью и только затем подменяет
+    текущий, поэтому запросы во время обновления обслуживаются по старым данным.
+    """
+
+    def __init__(self, load, refresh_interval=REFRESH_INTERVAL, figure_format=FIGURE_FORMAT,
+                 figure_dpi=FIGURE_DPI, max_points=LARGE_PLOT_POINTS,
+                 min_films=MIN_PERSON_FILMS, prior_weight=0):
+        self.load = load
+        self.refresh_interval = refresh_interval
+        self.figure_format = figure_format
+        self.figure_dpi = figure_dpi
+        self.report_options = dict(max_points=max_points, min_films=min_films,
+                                   prior_weight=prior_weight)
+
+        self.dataset = None
+        self.loaded_at = None
+        self.last_error = None
+
+        # Обновления выполняются по одному; построение разделов — тоже по одному,
+        # так как pyplot и ленивые агрегаты AnalysisContext не потокобезопасны
+        self._refresh_lock = threading.Lock()
+        self._report_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._scheduler = None
+
+    def refresh(self):
+        """
+        Загружает и подготавливает данные и подменяет ими текущий набор.
+
+        :return: True, если данные обновлены
+        """
+        with self._refresh_lock:
+            try:
+                df, persons, context = self.load()
+                if context is None:
+                    context = AnalysisContext(df, persons=persons)
+                elif context.persons is None:
+                    context.persons = persons
+                # Прогрев: общие агрегаты всех разделов считаются до подмены данных
+                build_report(Document(), _SkipFiguresRenderer(), df, persons, context,
+                             **self.report_options)
+            except Exception as error:
+                self.last_error = f"{type(error).__name__}: {error}"
+                return False
+
+            self.dataset = (df, persons, context)
+            self.loaded_at = time.time()
+            self.last_error = None
+            return True
+
+    def start(self):
+        """
+        Запускает обновление данных по расписанию (если интервал больше нуля).
+        """
+        if self.refresh_interval > 0 and self._scheduler is None:
+            self._scheduler = threading.Thread(target=self._refresh_periodically, daemon=True)
+            self._scheduler.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._scheduler is not None:
+            self._scheduler.join()
+            self._scheduler = None
+
+    def _refresh_periodically(self):
+        while not self._stop.wait(self.refresh_interval):
+            self.refresh()
+
+    def health(self):
+        return {
+            'ready': self.dataset is not None,
+            'rows': len(self.dataset[0]) if self.dataset is not None else 0,
+            'loaded_at': self.loaded_at,
+            'last_error': self.last_error,
+        }
+
+    def _build(self, doc, renderer, sections):
+        df, persons, context = self.dataset
+        with self._report_lock:
+            build_report(doc, renderer, df, persons, context, sections=sections,
+                         **self.report_options)
+            renderer.finish()
+
+    def section_json(self, name):
+        """
+        Текст и таблицы раздела без построения графиков.
+        """
+        doc = Document()
+        renderer = _SkipFiguresRenderer()
+        self._build(doc, renderer, [name])
+        return {'section': name, 'figures': renderer.figures, 'content': document_to_json(doc)}
+
+    def section_docx(self, name):
+        """
+        Раздел в виде документа Word (байты).
+        """
+        doc = Document()
+        self._build(doc, InlineFigureRenderer(self.figure_format, self.figure_dpi), [name])
+        buffer = io.BytesIO()
+        doc.save(buffer)
+        return buffer.getvalue()
+
+    def section_image(self, name, figure=0):
+        """
+        Изображение графика раздела; строится только запрошенный график.
+
+        :param name: Имя раздела
+        :param figure: Номер графика в разделе (с нуля)
+        :return: Изображение в байтах или None, если в разделе нет такого графика
+        """
+        renderer = _SingleFigureRenderer(figure, self.figure_format, self.figure_dpi)
+        self._build(Document(), renderer, [name])
+        return renderer.image
+
+    def report_docx(self, sections=None):
+        """
+        Отчёт по выбранным разделам (None — все) в виде документа Word (байты).
+        """
+        df, persons, context = self.dataset
+        buffer = io.BytesIO()
+        with self._report_lock:
+            analyze_all(df, persons, context=context, sections=sections, output_path=buffer,
+                        figure_format=self.figure_format, figure_dpi=self.figure_dpi,
+                        **self.report_options)
+        return buffer.getvalue()
+
+
+class ReportRequestHandler(BaseHTTPRequestHandler):
+    """
+    Обработчик HTTP-запросов; сервис берётся из self.server.service.
+    """
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def _handle(self, method):
+        started = time.perf_counter()
+        url = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        parts = [part for part in url.path.split('/') if part]
+        service = self.server.service
+
+        try:
+            status, content_type, body = self._route(service, method, parts, query)
+        except Exception as error:
+            status, content_type, body = _json_body(500, {'error': f"{type(error).__name__}: {error}"})
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('X-Elapsed-Ms', f"{elapsed_ms:.1f}")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self, service, method, parts, query):
+        if method == 'POST':
+            if parts == ['refresh']:
+                updated = service.refresh()
+                return _json_body(200 if updated else 503, service.health())
+            return _json_body(404, {'error': "Неизвестный адрес"})
+
+        if parts == ['health']:
+            health = service.health()
+            return _json_body(200 if health['ready'] else 503, health)
+        if parts == ['sections']:
+            return _json_body(200, {'sections': list(REPORT_SECTIONS)})
+        if service.dataset is None:
+            return _json_body(503, {'error': "Данные ещё не загружены"})
+
+        if parts == ['report']:
+            sections = [s for s in query.get('sections', '').split(',') if s] or None
+            unknown = [s for s in sections or [] if s not in REPORT_SECTIONS]
+            if unknown:
+                return _json_body(404, {'error': f"Неизвестные разделы: {', '.join(unknown)}"})
+            return 200, DOCX_CONTENT_TYPE, service.report_docx(sections)
+
+        if len(parts) == 2 and parts[0] == 'sections':
+            name = parts[1]
+            if name not in REPORT_SECTIONS:
+                return _json_body(404, {'error': f"Неизвестный раздел: {name}"})
+            output_format = query.get('format', 'json')
+            if output_format == 'json':
+                return _json_body(200, service.section_json(name))
+            if output_format == 'docx':
+                return 200, DOCX_CONTENT_TYPE, service.section_docx(name)
+            if output_format == 'image':
+                figure = query.get('figure', '0')
+                if not (figure.isascii() and figure.isdigit()):
+                    return _json_body(400, {'error': "Номер графика (figure) — целое число от 0"})
+                image = service.section_image(name, int(figure))
+                if image is None:
+                    return _json_body(404, {'error': f"В разделе {name} нет графика {figure}"})
+                return 200, IMAGE_CONTENT_TYPES[service.figure_format], image
+            return _json_body(400, {'error': f"Формат: {', '.join(SECTION_FORMATS)}"})
+
+        return _json_body(404, {'error': "Неизвестный адрес"})
+
+
+def _json_body(status, data):
+    return status, 'application/json; charset=utf-8', json.dumps(data, ensure_ascii=False).encode()
+
+
+def create_server(service, host='127.0.0.1', port=8080):
+    """
+    HTTP-сервер для сервиса; каждый запрос обрабатывается в своём потоке.
+    """
+    server = ThreadingHTTPServer((host, port), ReportRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def serve(load, host='127.0.0.1', port=8080, refresh_interval=REFRESH_INTERVAL, **service_options):
+    """
+    Загружает данные и обслуживает запросы до прерывания (Ctrl+C).
+
+    :param load: Функция загрузки данных (см. ReportService)
+    :param service_options: Параметры ReportService (формат графиков, пороги и т. п.)
+    """
+    service = ReportService(load, refresh_interval, **service_options)
+    if not service.refresh():
+        raise RuntimeError(f"Не удалось загрузить данные: {service.last_error}")
+    service.start()
+
+    server = create_server(service, host, port)
+    print(f"Сервис отчётов: http://{host}:{server.server_port} ({service.health()['rows']} фильмов)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
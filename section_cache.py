@@ -0,0 +1,166 @@
+import hashlib
+import io
+import json
+import os
+import shutil
+import time
+
+import pandas as pd
+
+from data_cache import META_FILE, evict, invalidate
+from lazy_import import LazyImport
+
+parse_xml = LazyImport('docx.oxml', 'parse_xml')
+qn = LazyImport('docx.oxml.ns', 'qn')
+etree = LazyImport('lxml.etree')
+
+# Кэш готовых разделов отчёта. Ключ раздела — хэш его имени, параметров и
+# отпечатков столбцов, которые раздел читает (см. REPORT_SECTIONS), поэтому
+# при изменении других столбцов раздел берётся из кэша. Запись хранит
+# фрагмент документа Word: XML абзацев и таблиц раздела и изображения графиков.
+# Записи устроены так же, как в data_cache (каталог с meta.json), и вытесняются
+# той же функцией evict — давно не использованные первыми.
+
+SECTION_CACHE_DIR = os.getenv("SECTION_CACHE_DIR", os.path.join(".cache", "sections"))
+SECTION_CACHE_MAX_BYTES = int(os.getenv("SECTION_CACHE_MAX_BYTES", str(256 * 1024 ** 2)))
+
+
+def column_fingerprint(series):
+    """
+    Отпечаток столбца: SHA-256 по типу и хэшам значений (без индекса).
+
+    :param series: Столбец DataFrame
+    :return: Шестнадцатеричная строка хэша
+    """
+    digest = hashlib.sha256(str(series.dtype).encode('utf-8'))
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Порядок категорий влияет на порядок групп в таблицах
+        digest.update(json.dumps(list(map(str, series.cat.categories))).encode('utf-8'))
+    try:
+        hashes = pd.util.hash_pandas_object(series, index=False)
+    except TypeError:
+        # Столбцы со списками (жанры, актёры) хэшируются по текстовому представлению
+        hashes = pd.util.hash_pandas_object(series.astype(str), index=False)
+    digest.update(hashes.to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+class SectionCache:
+    """
+    Кэш разделов отчёта на диске с ограничением размера.
+    """
+
+    def __init__(self, cache_dir=SECTION_CACHE_DIR, max_bytes=SECTION_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def fingerprint(self, series):
+        return column_fingerprint(series)
+
+    def key(self, section, fingerprints, params):
+        """
+        Ключ раздела.
+
+        :param section: Имя раздела
+        :param fingerprints: Словарь {столбец: отпечаток} для столбцов, которые читает раздел
+        :param params: Параметры раздела (в том числе формат графиков и версия разделов)
+        :return: Шестнадцатеричная строка ключа
+        """
+        parts = {'section': section, 'columns': fingerprints, 'params': params}
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str)
+                              .encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def load(self, key):
+        """
+        Фрагмент раздела из кэша или None, если записи нет.
+        """
+        path = self._entry_path(key)
+        meta_path = os.path.join(path, META_FILE)
+        if not os.path.exists(meta_path):
+            self.misses += 1
+            return None
+
+        with open(meta_path, 'r', encoding='utf-8') as file:
+            meta = json.load(file)
+        images = []
+        for name in meta['images']:
+            with open(os.path.join(path, name), 'rb') as file:
+                images.append(file.read())
+
+        # Отмечаем время использования для вытеснения давно не используемых записей
+        os.utime(meta_path)
+        self.hits += 1
+        return {'elements': meta['elements'], 'images': images}
+
+    def save(self, key, fragment):
+        """
+        Сохраняет фрагмент раздела и вытесняет старые записи, если кэш превысил max_bytes.
+        """
+        path = self._entry_path(key)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        os.makedirs(tmp_path, exist_ok=True)
+
+        names = []
+        for number, image in enumerate(fragment['images']):
+            names.append(f"image-{number}.bin")
+            with open(os.path.join(tmp_path, names[-1]), 'wb') as file:
+                file.write(image)
+        with open(os.path.join(tmp_path, META_FILE), 'w', encoding='utf-8') as file:
+            json.dump({'created': time.time(), 'elements': fragment['elements'],
+                       'images': names}, file, ensure_ascii=False)
+
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+        evict(self.cache_dir, self.max_bytes)
+
+    def invalidate(self, key=None):
+        invalidate(key, self.cache_dir)
+
+    @staticmethod
+    def capture(doc):
+        """
+        Фрагмент с содержимым документа: XML элементов тела и изображения
+        в порядке их следования.
+
+        :param doc: Документ Word, в который был выведен только один раздел
+        """
+        elements, images = [], []
+        for element in doc.element.body.iterchildren():
+            if element.tag == qn('w:sectPr'):
+                continue
+            for blip in element.iter(qn('a:blip')):
+                images.append(doc.part.related_parts[blip.get(qn('r:embed'))].blob)
+            elements.append(etree.tostring(element, encoding='unicode'))
+        return {'elements': elements, 'images': images}
+
+    @staticmethod
+    def append(doc, fragment):
+        """
+        Добавляет фрагмент в конец документа; изображения заново добавляются
+        в документ, а ссылки на них и номера рисунков обновляются.
+        """
+        body = doc.element.body
+        images = iter(fragment['images'])
+        for xml in fragment['elements']:
+            element = parse_xml(xml)
+            if body.sectPr is not None:
+                body.sectPr.addprevious(element)
+            else:
+                body.append(element)
+            for blip in element.iter(qn('a:blip')):
+                image_id, _ = doc.part.get_or_add_image(io.BytesIO(next(images)))
+                blip.set(qn('r:embed'), image_id)
+            shapes = list(element.iter(qn('wp:docPr')))
+            for properties in shapes:
+                # Номера из исходного документа не должны влиять на next_id
+                properties.set('id', '0')
+            for properties in shapes:
+                # Как у python-docx: номер рисунка и имя «Picture <номер>»
+                shape_id = doc.part.next_id
+                properties.set('id', str(shape_id))
+                properties.set('name', f"Picture {shape_id}")
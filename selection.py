@@ -0,0 +1,68 @@
+import numpy as np
+
+# Частичный выбор k лучших строк без полной сортировки: np.partition по основному
+# ключу, затем сортировка только оставшихся кандидатов.
+
+
+def top_k(keys, k, largest=False):
+    """
+    Позиции k наименьших (или наибольших) строк в порядке сортировки.
+
+    Порядок совпадает с устойчивой сортировкой по столбцам keys (первый — основной):
+    при равенстве ключей раньше идёт меньшая позиция, пропуски — в конце.
+
+    :param keys: Массив ключей формы (n,) или (n, число ключей)
+    :param k: Сколько строк выбрать
+    :param largest: Выбирать наибольшие значения
+    :return: Массив позиций длиной min(k, n)
+    """
+    keys = np.asarray(keys, dtype=float)
+    if keys.ndim == 1:
+        keys = keys[:, np.newaxis]
+    if largest:
+        keys = -keys
+    keys = np.where(np.isnan(keys), np.inf, keys)
+
+    n = len(keys)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if k >= n:
+        candidates = np.arange(n)
+    else:
+        # Частичная сортировка по основному ключу; строки, равные k-му значению,
+        # остаются кандидатами, чтобы порядок при равенстве не зависел от partition
+        primary = keys[:, 0]
+        threshold = np.partition(primary, k - 1)[k - 1]
+        candidates = np.flatnonzero(primary <= threshold)
+
+    sort_keys = (candidates,) + tuple(keys[candidates, column]
+                                      for column in reversed(range(keys.shape[1])))
+    return candidates[np.lexsort(sort_keys)[:k]]
+
+
+def grouped_top_k(codes, keys, k, ascending):
+    """
+    Позиции k наименьших (или наибольших) строк в каждой группе.
+
+    Строки группируются устойчивой сортировкой небольших целых кодов (поразрядной
+    в NumPy), после чего в каждой группе выполняется частичный выбор top_k.
+
+    :param codes: Номер группы для каждой строки; строки с отрицательным кодом не учитываются
+    :param keys: Ключи сортировки (см. top_k)
+    :param k: Сколько строк выбрать в каждой группе
+    :param ascending: Для каждой группы: True — наименьшие ключи, False — наибольшие
+    :return: Список массивов позиций по группам в порядке ascending
+    """
+    codes = np.asarray(codes)
+    keys = np.asarray(keys, dtype=float)
+    groups = len(ascending)
+
+    order = np.argsort(codes.astype(np.int16), kind='stable')
+    sizes = np.bincount(codes[codes >= 0], minlength=groups)
+    starts = len(codes) - sizes.sum() + np.concatenate(([0], np.cumsum(sizes)[:-1]))
+
+    result = []
+    for group in range(groups):
+        positions = order[starts[group]:starts[group] + sizes[group]]
+        result.append(positions[top_k(keys[positions], k, largest=not ascending[group])])
+    return result
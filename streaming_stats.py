@@ -0,0 +1,367 @@
+import numpy as np
+import pandas as pd
+
+# Однопроходные накопители статистики. Каждый накопитель можно пополнять
+# порциями данных (update) и объединять с другим накопителем (merge),
+# например посчитанным в другом процессе; результат не зависит от разбиения.
+# Вклад части можно и убрать (remove), если она входила в накопитель:
+# так инкрементальный режим обновляет статистику по изменившимся фильмам.
+
+
+def _as_array(values):
+    values = np.asarray(values, dtype=float)
+    return values[~np.isnan(values)]
+
+
+class RunningMoments:
+    """
+    Количество, среднее и дисперсия (формулы Чана для объединения частей).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, values):
+        values = _as_array(values)
+        if len(values):
+            part = RunningMoments()
+            part.count = len(values)
+            part.mean = values.mean()
+            part.m2 = ((values - part.mean) ** 2).sum()
+            self.merge(part)
+        return self
+
+    def merge(self, other):
+        count = self.count + other.count
+        if count == 0:
+            return self
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / count
+        self.mean += delta * other.count / count
+        self.count = count
+        return self
+
+    def remove(self, other):
+        # Обратно merge: остаётся накопитель, который после merge(other) дал бы текущий
+        count = self.count - other.count
+        if count <= 0:
+            self.__init__()
+            return self
+        mean = (self.mean * self.count - other.mean * other.count) / count
+        delta = other.mean - mean
+        self.m2 = max(self.m2 - other.m2 - delta ** 2 * count * other.count / self.count, 0.0)
+        self.mean = mean
+        self.count = count
+        return self
+
+    @property
+    def variance(self):
+        # Несмещённая оценка, как pandas.Series.var
+        return self.m2 / (self.count - 1) if self.count > 1 else np.nan
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance)
+
+
+class CoMoment:
+    """
+    Совместный момент двух величин для коэффициента корреляции Пирсона
+    и линии регрессии. Учитываются только пары без пропусков.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.m2_x = 0.0
+        self.m2_y = 0.0
+        self.c_xy = 0.0
+
+    def update(self, x, y):
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        valid = ~(np.isnan(x) | np.isnan(y))
+        x, y = x[valid], y[valid]
+        if len(x):
+            part = CoMoment()
+            part.count = len(x)
+            part.mean_x, part.mean_y = x.mean(), y.mean()
+            dx, dy = x - part.mean_x, y - part.mean_y
+            part.m2_x, part.m2_y, part.c_xy = (dx * dx).sum(), (dy * dy).sum(), (dx * dy).sum()
+            self.merge(part)
+        return self
+
+    def merge(self, other):
+        count = self.count + other.count
+        if count == 0:
+            return self
+        dx = other.mean_x - self.mean_x
+        dy = other.mean_y - self.mean_y
+        weight = self.count * other.count / count
+        self.m2_x += other.m2_x + dx * dx * weight
+        self.m2_y += other.m2_y + dy * dy * weight
+        self.c_xy += other.c_xy + dx * dy * weight
+        self.mean_x += dx * other.count / count
+        self.mean_y += dy * other.count / count
+        self.count = count
+        return self
+
+    def remove(self, other):
+        count = self.count - other.count
+        if count <= 0:
+            self.__init__()
+            return self
+        mean_x = (self.mean_x * self.count - other.mean_x * other.count) / count
+        mean_y = (self.mean_y * self.count - other.mean_y * other.count) / count
+        dx = other.mean_x - mean_x
+        dy = other.mean_y - mean_y
+        weight = count * other.count / self.count
+        self.m2_x = max(self.m2_x - other.m2_x - dx * dx * weight, 0.0)
+        self.m2_y = max(self.m2_y - other.m2_y - dy * dy * weight, 0.0)
+        self.c_xy -= other.c_xy + dx * dy * weight
+        self.mean_x, self.mean_y = mean_x, mean_y
+        self.count = count
+        return self
+
+    def pearson(self):
+        denominator = np.sqrt(self.m2_x * self.m2_y)
+        return self.c_xy / denominator if denominator else np.nan
+
+    def regression_line(self):
+        """
+        Коэффициенты прямой y = slope * x + intercept по методу наименьших квадратов.
+        """
+        slope = self.c_xy / self.m2_x if self.m2_x else np.nan
+        return slope, self.mean_y - slope * self.mean_x
+
+
+class FixedHistogram:
+    """
+    Гистограмма на фиксированной сетке [low, high] с шагом resolution.
+
+    Значения округляются до шага сетки, поэтому для оценок с точностью
+    до resolution мода и медиана точные, а для более точных значений —
+    приближённые с погрешностью не больше resolution / 2.
+    """
+
+    def __init__(self, low=0.0, high=10.0, resolution=0.001):
+        self.low = low
+        self.resolution = resolution
+        self.counts = np.zeros(int(round((high - low) / resolution)) + 1, dtype=np.int64)
+
+    def update(self, values):
+        values = _as_array(values)
+        idx = np.clip(np.rint((values - self.low) / self.resolution).astype(np.int64),
+                      0, len(self.counts) - 1)
+        self.counts += np.bincount(idx, minlength=len(self.counts))
+        return self
+
+    def merge(self, other):
+        self.counts += other.counts
+        return self
+
+    def remove(self, other):
+        self.counts -= other.counts
+        return self
+
+    @property
+    def count(self):
+        return int(self.counts.sum())
+
+    @property
+    def values(self):
+        # Значения в узлах сетки; округление убирает погрешность умножения,
+        # чтобы узел 1.255 совпадал с числом 1.255, а не 1.2550000000000001
+        return np.round(self.low + np.arange(len(self.counts)) * self.resolution, 12)
+
+    def mode(self):
+        # При равных частотах — наименьшее значение, как Series.mode()[0]
+        return self.values[np.argmax(self.counts)] if self.count else np.nan
+
+    def quantile_value(self, k):
+        # k-е по порядку (с нуля) значение
+        return self.values[np.searchsorted(np.cumsum(self.counts), k + 1)]
+
+    def median(self):
+        count = self.count
+        if not count:
+            return np.nan
+        if count % 2:
+            return self.quantile_value(count // 2)
+        return (self.quantile_value(count // 2 - 1) + self.quantile_value(count // 2)) / 2
+
+
+class FixedHistogram2D:
+    """
+    Двумерная гистограмма пар значений на фиксированной сетке (для графиков плотности).
+    """
+
+    def __init__(self, low=0.0, high=10.0, bins=100):
+        self.edges = np.linspace(low, high, bins + 1)
+        self.counts = np.zeros((bins, bins), dtype=np.int64)
+
+    def update(self, x, y):
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        valid = ~(np.isnan(x) | np.isnan(y))
+        counts, _, _ = np.histogram2d(x[valid], y[valid], bins=[self.edges, self.edges])
+        self.counts += counts.astype(np.int64)
+        return self
+
+    def merge(self, other):
+        self.counts += other.counts
+        return self
+
+    def remove(self, other):
+        self.counts -= other.counts
+        return self
+
+
+class ThresholdCounter:
+    """
+    Количество значений выше и ниже заданных порогов.
+    """
+
+    def __init__(self, above=(), below=()):
+        self.count = 0
+        self.above = {threshold: 0 for threshold in above}
+        self.below = {threshold: 0 for threshold in below}
+
+    def update(self, values):
+        values = _as_array(values)
+        self.count += len(values)
+        for threshold in self.above:
+            self.above[threshold] += int((values > threshold).sum())
+        for threshold in self.below:
+            self.below[threshold] += int((values < threshold).sum())
+        return self
+
+    def merge(self, other):
+        self.count += other.count
+        for threshold in self.above:
+            self.above[threshold] += other.above[threshold]
+        for threshold in self.below:
+            self.below[threshold] += other.below[threshold]
+        return self
+
+    def remove(self, other):
+        self.count -= other.count
+        for threshold in self.above:
+            self.above[threshold] -= other.above[threshold]
+        for threshold in self.below:
+            self.below[threshold] -= other.below[threshold]
+        return self
+
+    def share_above(self, threshold):
+        return self.above[threshold] / self.count if self.count else np.nan
+
+    def share_below(self, threshold):
+        return self.below[threshold] / self.count if self.count else np.nan
+
+
+class RatingsAccumulator:
+    """
+    Всё, что нужно разделам analyze_ratings_distribution и compare_platform_ratings,
+    без хранения самих оценок.
+    """
+
+    def __init__(self):
+        self.kp = RunningMoments()
+        self.kp_histogram = FixedHistogram()
+        self.kp_thresholds = ThresholdCounter(above=(7,), below=(5,))
+        self.platforms = CoMoment()
+        self.platforms_histogram = FixedHistogram2D()
+
+    def update(self, df):
+        """
+        Добавляет порцию подготовленных данных (столбцы rating.kp и rating.imdb).
+        """
+        self.kp.update(df['rating.kp'])
+        self.kp_histogram.update(df['rating.kp'])
+        self.kp_thresholds.update(df['rating.kp'])
+        self.platforms.update(df['rating.kp'], df['rating.imdb'])
+
+        # На графике сравнения показываются только фильмы с оценкой IMDb
+        rated = df[df['rating.imdb'] != 0]
+        self.platforms_histogram.update(rated['rating.kp'], rated['rating.imdb'])
+        return self
+
+    def merge(self, other):
+        self.kp.merge(other.kp)
+        self.kp_histogram.merge(other.kp_histogram)
+        self.kp_thresholds.merge(other.kp_thresholds)
+        self.platforms.merge(other.platforms)
+        self.platforms_histogram.merge(other.platforms_histogram)
+        return self
+
+    def remove(self, other):
+        self.kp.remove(other.kp)
+        self.kp_histogram.remove(other.kp_histogram)
+        self.kp_thresholds.remove(other.kp_thresholds)
+        self.platforms.remove(other.platforms)
+        self.platforms_histogram.remove(other.platforms_histogram)
+        return self
+
+    def to_frame(self):
+        """
+        Состояние накопителя в виде DataFrame со столбцами field, position, value
+        (например, для data_cache.save_prepared). Гистограммы хранятся без пустых
+        ячеек, пороги — с порогом в position.
+        """
+        fields, positions, values = [], [], []
+
+        def add(field, position, value):
+            fields.extend([field] * len(value))
+            positions.extend(position)
+            values.extend(value)
+
+        for name in ('kp', 'platforms'):
+            for field, value in vars(getattr(self, name)).items():
+                add(f"{name}.{field}", [0], [value])
+        add('kp_thresholds.count', [0], [self.kp_thresholds.count])
+        for side in ('above', 'below'):
+            counts = getattr(self.kp_thresholds, side)
+            add(f"kp_thresholds.{side}", list(counts), list(counts.values()))
+        for name in ('kp_histogram', 'platforms_histogram'):
+            counts = getattr(self, name).counts.ravel()
+            filled = np.flatnonzero(counts)
+            add(f"{name}.counts", filled.tolist(), counts[filled].tolist())
+
+        return pd.DataFrame({'field': pd.Series(fields, dtype=object),
+                             'position': pd.Series(positions, dtype='int64'),
+                             'value': pd.Series(values, dtype='float64')})
+
+    @classmethod
+    def from_frame(cls, frame):
+        """
+        Восстанавливает накопитель из to_frame().
+        """
+        accumulator = cls()
+        for field, position, value in zip(frame['field'], frame['position'], frame['value']):
+            name, attribute = field.split('.')
+            target = getattr(accumulator, name)
+            if attribute == 'counts':
+                target.counts.ravel()[position] = value
+            elif attribute in ('above', 'below'):
+                getattr(target, attribute)[position] = int(value)
+            elif attribute == 'count':
+                target.count = int(value)
+            else:
+                setattr(target, attribute, value)
+        return accumulator
+
+
+def accumulate_ratings(chunks):
+    """
+    Собирает RatingsAccumulator по порциям подготовленных данных.
+
+    :param chunks: Итерируемый набор DataFrame (например, из data_preparation.prepare_data_chunks)
+    :return: RatingsAccumulator
+    """
+    accumulator = RatingsAccumulator()
+    for chunk in chunks:
+        accumulator.update(chunk)
+    return accumulator
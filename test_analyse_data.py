@@ -1,5 +1,6 @@
 import unittest
 from unittest.mock import patch, MagicMock
+import numpy as np
 import pandas as pd
 
 
@@ -13,8 +14,16 @@ from data_analysis import (
     analyze_budgets,
     analyze_budgets_and_fees,
     analyze_top_persons,
-    analyze_low_persons
+    analyze_low_persons,
+    person_ratings,
+    analyze_all,
+    FigureRenderer,
+    AnalysisContext,
+    add_dataframe_table,
+    downsample,
+    classify_budget_fees
 )
+from docx import Document
 
 class TestMovieAnalytics(unittest.TestCase):
     def setUp(self):
@@ -184,6 +193,136 @@ class TestMovieAnalytics(unittest.TestCase):
         mock_doc.add_table.return_value.add_row.return_value.cells[
                 0].text = 'actor'  # Пример проверки для первой ячейки
 
+    def test_person_ratings_from_person_index(self):
+        # Таблица персон даёт те же средние, что и списки actors/directors
+        movies = self.test_data.assign(id=range(1, 7))
+        rows = [(movie_id, name, profession)
+                for movie_id, actors, directors in zip(movies['id'], movies['actors'],
+                                                       movies['directors'])
+                for name, profession in ([(a, 'actor') for a in actors] +
+                                         [(d, 'director') for d in directors])]
+        persons = pd.DataFrame(rows, columns=['movie_id', 'name', 'profession'])
+        persons['profession'] = persons['profession'].astype('category')
+
+        for role in ('actor', 'director'):
+            expected = person_ratings(movies, role).sort_values('name').reset_index(drop=True)
+            result = person_ratings(movies, role, persons).sort_values('name').reset_index(drop=True)
+            pd.testing.assert_frame_equal(result, expected)
+
+    def test_figure_renderer_keeps_document_order(self):
+        # Графики из пула процессов вставляются на свои места в документе
+        doc = Document()
+        renderer = FigureRenderer(workers=2)
+
+        analyze_ratings_distribution(self.test_data, doc, renderer)
+        doc.add_paragraph("Следующий раздел")
+        compare_platform_ratings(self.test_data, doc, renderer)
+        renderer.finish()
+
+        texts = [paragraph.text for paragraph in doc.paragraphs]
+        pictures = [idx for idx, paragraph in enumerate(doc.paragraphs)
+                    if paragraph._p.xpath('.//w:drawing')]
+        self.assertEqual(len(doc.inline_shapes), 2)
+        self.assertLess(pictures[0], texts.index("Следующий раздел"))
+        self.assertGreater(pictures[1], texts.index("Следующий раздел"))
+
+    def test_figure_renderer_closed_on_error(self):
+        # Ошибка в разделе останавливает пул процессов и отменяет оставшиеся графики
+        renderers = []
+
+        def failing_report(doc, renderer, df, *args):
+            renderers.append(renderer)
+            analyze_ratings_distribution(df, doc, renderer)
+            raise RuntimeError("ошибка раздела")
+
+        with patch('data_analysis.build_report', side_effect=failing_report):
+            with self.assertRaises(RuntimeError):
+                analyze_all(self.test_data, workers=2, output_path=MagicMock())
+
+        self.assertEqual(renderers[0]._pending, [])
+        self.assertTrue(renderers[0]._executor._shutdown_thread)
+
+    def test_analysis_context_is_shared(self):
+        # Развёрнутые жанры и счётчики год×жанр считаются один раз на отчёт
+        context = AnalysisContext(self.test_data)
+
+        self.assertIs(context.genres_exploded, context.genres_exploded)
+        self.assertIsInstance(context.genres_exploded['genres'].dtype, pd.CategoricalDtype)
+        self.assertEqual(context.year_genre_counts['count'].sum(), 6)
+        self.assertEqual(set(context.top_genres), {'Drama', 'Comedy', 'Action', 'Horror'})
+
+        with patch('data_analysis.plt'):
+            analyze_rating_genres_time(self.test_data, MagicMock(), context=context)
+            analyze_rating_genres_trends(self.test_data, MagicMock(), context=context)
+        self.assertIs(context.year_genre_counts, context.year_genre_counts)
+
+    def test_add_dataframe_table_matches_row_by_row(self):
+        # Пакетная вставка строк даёт тот же текст ячеек, что и table.add_row()
+        data = self.test_data[['name', 'genres', 'year', 'rating.kp']].copy()
+        data.loc[0, 'name'] = 'Film <1> & "2"\tпродолжение'
+        table = add_dataframe_table(Document(), data)
+
+        expected = [list(data.columns)] + [[str(value) for value in row]
+                                           for _, row in data.iterrows()]
+        self.assertEqual([[cell.text for cell in row.cells] for row in table.rows], expected)
+        self.assertEqual(table.style.name, 'Table Grid')
+
+    @patch('data_analysis._plot_platform_ratings')
+    @patch('data_analysis._plot_platform_density')
+    def test_compare_platform_ratings_large_mode(self, mock_density, mock_scatter):
+        # Выше порога строится плотность с аналитической линией регрессии
+        doc = MagicMock()
+        compare_platform_ratings(self.test_data, doc, max_points=3)
+
+        mock_scatter.assert_not_called()
+        counts, edges, (slope, intercept), _, _ = mock_density.call_args[0]
+        self.assertEqual(counts.sum(), len(self.test_data))
+        expected_slope, expected_intercept = np.polyfit(self.test_data['rating.kp'],
+                                                        self.test_data['rating.imdb'], 1)
+        self.assertAlmostEqual(slope, expected_slope)
+        self.assertAlmostEqual(intercept, expected_intercept)
+
+        compare_platform_ratings(self.test_data, doc)
+        mock_scatter.assert_called_once()
+
+    @patch('data_analysis._plot_budgets')
+    def test_analyze_budgets_downsamples_bubbles(self, mock_plot):
+        analyze_budgets(self.test_data, MagicMock(), max_points=2)
+        bubbles = mock_plot.call_args[0][0]
+        self.assertEqual(len(bubbles), 2)
+
+        # Выборка детерминирована и сохраняет исходный порядок строк
+        again = downsample(self.test_data, 4)
+        self.assertTrue(again.equals(downsample(self.test_data, 4)))
+        self.assertTrue(again.index.is_monotonic_increasing)
+        self.assertIs(downsample(self.test_data, 10), self.test_data)
+
+
+    def test_classify_budget_fees(self):
+        budget = np.array([2e8, 2e8, 5e5, 5e5, 5e7, 2e8])
+        fees = np.array([2e9, 5e5, 2e7, 5e5, 2e9, 5e6])
+        self.assertEqual(list(classify_budget_fees(budget, fees)), [0, 1, 2, 3, -1, -1])
+
+    def test_analyze_budgets_and_fees_tables(self):
+        movies = pd.DataFrame({
+            'name': [f"Film {i}" for i in range(8)],
+            'genres': [['Drama']] * 8,
+            'year': [2000] * 8,
+            'budget_rub': [2e8, 3e8, 4e8, 2e8, 5e5, 6e5, 7e5, 5e7],
+            'fees_rub_world': [3e9, 2e9, 5e9, 5e5, 2e7, 9e5, 7e5, 2e9],
+            'rating.kp': [7.0] * 8,
+            'rating.imdb': [7.0] * 8,
+            'votes.kp': [5000] * 8,
+        })
+        doc = Document()
+        analyze_budgets_and_fees(movies, doc)
+
+        names = [[row.cells[0].text for row in table.rows[1:]] for table in doc.tables]
+        # Большие бюджет и сборы — по возрастанию разницы, маленький бюджет
+        # и большие сборы — по убыванию
+        self.assertEqual(names, [['Film 1', 'Film 0', 'Film 2'], ['Film 3'], ['Film 4'],
+                                 ['Film 6', 'Film 5']])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,110 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import pandas as pd
+
+from data_cache import cache_key, evict, invalidate, lines_fingerprint, load_or_prepare, \
+    load_prepared, save_prepared
+
+
+def make_lines(count):
+    return [json.dumps({
+        'id': i, 'name': f'Film {i}', 'year': 2000 + i,
+        'genres': [{'name': 'драма'}] if i % 2 else None,
+        'persons': [{'id': i, 'name': f'Actor {i}', 'enProfession': 'actor'}],
+        'rating': {'kp': 7.0, 'imdb': 6.5}, 'votes': {'kp': 1000},
+        'budget': {'value': 100, 'currency': 'USD'},
+    }).encode('utf-8') for i in range(count)]
+
+
+class TestDataCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_cache_key_depends_on_source(self):
+        """
+        Ключ меняется при изменении сырых данных.
+        """
+        self.assertEqual(cache_key(lines_fingerprint([b'a'])), cache_key(lines_fingerprint([b'a'])))
+        self.assertNotEqual(cache_key(lines_fingerprint([b'a'])),
+                            cache_key(lines_fingerprint([b'b'])))
+
+    def test_round_trip_list_columns(self):
+        """
+        Списки и строки-заглушки в одном столбце сохраняются без потерь.
+        """
+        df = pd.DataFrame({'name': ['A', 'B'], 'genres': [['драма', 'комедия'], 'неизвестно']})
+        save_prepared('key', {'movies': df}, self.cache_dir)
+
+        loaded = load_prepared('key', self.cache_dir)['movies']
+
+        self.assertEqual(loaded.loc[0, 'genres'], ['драма', 'комедия'])
+        self.assertEqual(loaded.loc[1, 'genres'], 'неизвестно')
+        self.assertIsNone(load_prepared('missing', self.cache_dir))
+
+    def test_evict_least_recently_used(self):
+        """
+        При превышении размера удаляются давно не использованные записи.
+        """
+        df = pd.DataFrame({'value': range(1000)})
+        save_prepared('old', {'movies': df}, self.cache_dir)
+        save_prepared('new', {'movies': df}, self.cache_dir)
+        os.utime(os.path.join(self.cache_dir, 'old', 'meta.json'), (0, 0))
+
+        removed = evict(self.cache_dir, max_bytes=1)
+
+        self.assertEqual(removed[0], 'old')
+        invalidate(cache_dir=self.cache_dir)
+        self.assertFalse(os.path.exists(self.cache_dir))
+
+    @patch('data_cache.fetch_raw_lines')
+    def test_load_or_prepare_uses_cache(self, mock_fetch):
+        """
+        Повторный запуск на тех же данных не вызывает prepare_data.
+        """
+        mock_fetch.return_value = make_lines(4)
+
+        df, persons = load_or_prepare("https://test-url.com/stream", self.cache_dir)
+        with patch('data_cache.prepare_data') as mock_prepare:
+            cached_df, cached_persons = load_or_prepare("https://test-url.com/stream",
+                                                        self.cache_dir)
+            mock_prepare.assert_not_called()
+
+        pd.testing.assert_frame_equal(cached_df, df)
+        pd.testing.assert_frame_equal(cached_persons, persons)
+
+    @patch('data_cache.fetch_raw_lines')
+    def test_load_or_prepare_selected_columns(self, mock_fetch):
+        """
+        При промахе подготавливаются только нужные столбцы; полная запись
+        подходит для любого набора столбцов.
+        """
+        mock_fetch.return_value = make_lines(4)
+        columns = ['id', 'rating.kp', 'rating.imdb']
+
+        df, persons = load_or_prepare("https://test-url.com/stream", self.cache_dir,
+                                      columns=columns, with_persons=False)
+        self.assertIsNone(persons)
+        self.assertNotIn('genres', df.columns)
+        self.assertNotIn('budget_rub', df.columns)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+        full_df, _ = load_or_prepare("https://test-url.com/stream", self.cache_dir)
+        self.assertIn('genres', full_df.columns)
+        with patch('data_cache.prepare_data') as mock_prepare:
+            cached_df, cached_persons = load_or_prepare("https://test-url.com/stream",
+                                                        self.cache_dir, columns=['year'])
+            mock_prepare.assert_not_called()
+        pd.testing.assert_frame_equal(cached_df, full_df)
+        self.assertIsNotNone(cached_persons)
+
+
+if __name__ == "__main__":
+    unittest.main()
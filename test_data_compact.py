@@ -0,0 +1,100 @@
+import unittest
+from unittest.mock import MagicMock
+
+import numpy as np
+import pandas as pd
+
+from docx import Document
+
+from data_analysis import (AnalysisContext, analyze_budgets, analyze_budgets_and_fees,
+                           budget_fees_mask)
+from data_compact import EncodedList, compact_frame, expand_frame, memory_report
+
+
+class TestDataCompact(unittest.TestCase):
+    def setUp(self):
+        # Подготовленные данные: списки, 'неизвестно' после fillna и пустой список
+        self.df = pd.DataFrame({
+            'id': [1, 2, 3, 4, 5],
+            'name': ['Film 1', 'Film 2', 'Film 3', 'Film 4', 'Film 5'],
+            'year': [2001.0, 2002.0, 2002.0, 2003.0, 2004.0],
+            'genres': [['драма', 'комедия'], 'неизвестно', ['драма'], [], ['ужасы', 'драма']],
+            'countries': [['США'], ['Россия'], 'неизвестно', ['США', 'Россия'], ['США']],
+            'rating.kp': [6.5, 7.8, 8.2, 5.4, 4.3],
+            'rating.imdb': [6.0, 7.5, 0.0, 5.2, 4.1],
+            'votes.kp': [1000, 2000, 1500, None, 800],
+            'votes.imdb': [100.0, 200.0, 150.0, 120.0, 80.0],
+        }, index=[10, 11, 12, 13, 14])
+
+    def test_encoded_list_round_trip(self):
+        encoded = EncodedList.from_series(self.df['genres'])
+        self.assertEqual(encoded.codes.dtype, np.int32)
+        self.assertEqual(encoded.offsets.tolist(), [0, 2, 2, 3, 3, 5])
+        self.assertEqual(encoded.to_series().tolist(), self.df['genres'].tolist())
+        self.assertEqual(encoded.to_series().index.tolist(), self.df.index.tolist())
+
+    def test_encoded_list_explode(self):
+        # Разворачивание по кодам совпадает с Series.explode
+        exploded = EncodedList.from_series(self.df['genres']).explode()
+        expected = self.df['genres'].explode()
+        self.assertEqual(exploded.index.tolist(), expected.index.tolist())
+        self.assertEqual(exploded.astype(object).fillna('пусто').tolist(),
+                         expected.fillna('пусто').tolist())
+        self.assertEqual(exploded.cat.categories.tolist(),
+                         ['драма', 'комедия', 'неизвестно', 'ужасы'])
+
+    def test_compact_frame_dtypes(self):
+        frame, lists = compact_frame(self.df)
+        self.assertEqual(set(lists), {'genres', 'countries'})
+        self.assertNotIn('genres', frame.columns)
+        self.assertEqual(frame['rating.kp'].dtype, np.float32)
+        self.assertEqual(frame['year'].dtype, np.int16)
+        self.assertEqual(str(frame['votes.kp'].dtype), 'Int32')
+        self.assertTrue(pd.isna(frame['votes.kp'].iloc[3]))
+
+    def test_expand_frame(self):
+        frame, lists = compact_frame(self.df)
+        restored = expand_frame(frame, lists)
+        for col in ['genres', 'countries']:
+            self.assertEqual(restored[col].tolist(), self.df[col].tolist())
+        np.testing.assert_allclose(restored['rating.kp'], self.df['rating.kp'], rtol=1e-6)
+
+        only_genres = expand_frame(frame, lists, columns=['genres'])
+        self.assertNotIn('countries', only_genres.columns)
+
+    def test_memory_report(self):
+        frame, lists = compact_frame(self.df)
+        report = memory_report(self.df, frame, lists)
+        self.assertEqual(report.loc['total', 'before'], self.df.memory_usage(deep=True).sum())
+        self.assertLess(report.loc['rating.kp', 'after'], report.loc['rating.kp', 'before'])
+        self.assertLess(report.loc['total', 'after'], report.loc['total', 'before'])
+
+    def test_analysis_context_from_encoded_genres(self):
+        frame, lists = compact_frame(self.df)
+        compact = AnalysisContext(expand_frame(frame, lists, columns=['genres']),
+                                  genre_lists=lists['genres'])
+        full = AnalysisContext(self.df)
+        self.assertEqual(compact.year_genre_counts.astype({'genres': object}).values.tolist(),
+                         full.year_genre_counts.astype({'genres': object}).values.tolist())
+        self.assertEqual(list(compact.top_genres), list(full.top_genres))
+
+    def test_budget_sections_with_missing_votes(self):
+        # Пропуск в Int32-столбце votes.kp не проходит отбор, а не ломает его
+        self.df['budget_rub'] = [1e6, 2e6, 3e6, 4e6, 5e6]
+        self.df['fees_rub_world'] = [2e6, 3e6, 5e6, 8e6, 6e6]
+        frame, lists = compact_frame(self.df)
+        df = expand_frame(frame, lists, columns=['genres'])
+        self.assertEqual(budget_fees_mask(df).tolist(), [False, True, True, False, False])
+
+        context = AnalysisContext(df, genre_lists=lists['genres'])
+        self.assertEqual(context.budget_fees['id'].tolist(), [2, 3])
+        for section_context in (context, None):
+            with self.subTest(context=section_context is not None):
+                doc = Document()
+                analyze_budgets(df, doc, MagicMock(), context=section_context)
+                analyze_budgets_and_fees(df, doc, context=section_context)
+                self.assertEqual(len(doc.tables[0].rows), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import json
+import unittest
+
+from data_decoding import decode_batch, iter_decoded
+
+
+class TestDataDecoding(unittest.TestCase):
+
+    def test_decode_batch(self):
+        """
+        Пачка строк в байтах и в str декодируется одним вызовом.
+        """
+        lines = [json.dumps({"id": i}) for i in range(3)]
+
+        self.assertEqual(decode_batch([line.encode('utf-8') for line in lines]),
+                         [{"id": 0}, {"id": 1}, {"id": 2}])
+        self.assertEqual(decode_batch(lines, json.loads), [{"id": 0}, {"id": 1}, {"id": 2}])
+        self.assertEqual(decode_batch([]), [])
+
+    def test_decode_batch_does_not_merge_lines(self):
+        """
+        Строка с несколькими объектами не должна «растворяться» в пачке.
+        """
+        with self.assertRaises(ValueError):
+            decode_batch(['{"id": 1}, {"id": 2}', '{"id": 3}'])
+
+    def test_decode_batch_reports_broken_line(self):
+        """
+        Повреждённая строка приводит к ошибке разбора.
+        """
+        with self.assertRaises(ValueError):
+            decode_batch([b'{"id": 1}', b'{"id": '])
+
+    def test_iter_decoded_batches(self):
+        """
+        Записи выдаются в исходном порядке независимо от размера пачки.
+        """
+        lines = (json.dumps({"id": i}).encode('utf-8') for i in range(10))
+
+        records = list(iter_decoded(lines, batch_size=3))
+
+        self.assertEqual([record["id"] for record in records], list(range(10)))
+
+
+if __name__ == "__main__":
+    unittest.main()
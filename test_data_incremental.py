@@ -0,0 +1,117 @@
+import json
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from docx import Document
+
+from data_analysis import (AnalysisContext, analyze_low_persons, analyze_ratings_distribution,
+                           analyze_top_persons)
+from data_fetching import lines_to_dataframe
+import data_incremental
+from data_incremental import AGGREGATE_KEYS, compute_aggregates, update_dataset
+from data_preparation import SOURCE_COLUMNS, prepare_data
+
+
+def make_line(movie_id, rating=7.0, genre='драма', actor='Actor 1'):
+    return json.dumps({
+        'id': movie_id, 'name': f'Film {movie_id}', 'year': 2000 + movie_id % 3,
+        'genres': [{'name': genre}],
+        'persons': [{'id': 1, 'name': actor, 'enProfession': 'actor'},
+                    {'id': 2, 'name': 'Director 1', 'enProfession': 'director'}],
+        'rating': {'kp': rating, 'imdb': rating - 0.5}, 'votes': {'kp': 1000},
+    }, ensure_ascii=False).encode('utf-8')
+
+
+class TestDataIncremental(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def assert_aggregates_equal(self, result, expected):
+        for name, keys in AGGREGATE_KEYS.items():
+            left = result[name].sort_values(keys).reset_index(drop=True)
+            right = expected[name].sort_values(keys).reset_index(drop=True)
+            pd.testing.assert_frame_equal(left, right, check_dtype=False, check_exact=False)
+
+        ratings, full = result['ratings'], expected['ratings']
+        for part in ('kp', 'platforms'):
+            for field, value in vars(getattr(full, part)).items():
+                self.assertAlmostEqual(getattr(getattr(ratings, part), field), value, msg=field)
+        self.assertEqual(vars(ratings.kp_thresholds), vars(full.kp_thresholds))
+        np.testing.assert_array_equal(ratings.kp_histogram.counts, full.kp_histogram.counts)
+        np.testing.assert_array_equal(ratings.platforms_histogram.counts,
+                                      full.platforms_histogram.counts)
+
+    def test_update_matches_full_rebuild(self):
+        """
+        После добавления, изменения и удаления фильмов агрегаты совпадают
+        с полным пересчётом.
+        """
+        first = [make_line(i, rating=5 + i % 5) for i in range(10)]
+        movies, _, _, summary = update_dataset(first, self.tmp.name)
+        self.assertEqual(len(movies), 10)
+        self.assertEqual(summary['added'], 10)
+
+        second = first[:7] + [make_line(8, rating=9.0, genre='комедия', actor='Actor 2'),
+                              make_line(10, rating=4.0)]
+        movies, persons, aggregates, summary = update_dataset(second, self.tmp.name)
+
+        self.assertEqual(summary, {'added': 1, 'changed': 1, 'removed': 2, 'unchanged': 7})
+        self.assertEqual(sorted(movies['id']), [0, 1, 2, 3, 4, 5, 6, 8, 10])
+
+        full_movies, full_persons = prepare_data(lines_to_dataframe(second, SOURCE_COLUMNS),
+                                                 return_persons=True)
+        self.assert_aggregates_equal(aggregates, compute_aggregates(full_movies, full_persons))
+
+        # Состояние на диске даёт те же агрегаты
+        _, _, reloaded, _ = update_dataset(second, self.tmp.name)
+        self.assert_aggregates_equal(reloaded, aggregates)
+
+        # Разделы о персонах и оценках по сохранённым агрегатам совпадают с полным расчётом
+        seeded = AnalysisContext(movies, person_stats=aggregates['person_stats'],
+                                 ratings=aggregates['ratings'])
+        for analyze in (analyze_top_persons, analyze_low_persons):
+            with self.subTest(section=analyze.__name__):
+                expected, doc = Document(), Document()
+                analyze(full_movies, expected, full_persons)
+                analyze(movies, doc, context=seeded)
+                self.assertEqual([[c.text for c in t._cells] for t in doc.tables],
+                                 [[c.text for c in t._cells] for t in expected.tables])
+        with patch('data_analysis.add_figure'):
+            expected, doc = Document(), Document()
+            analyze_ratings_distribution(full_movies, expected)
+            analyze_ratings_distribution(movies, doc, ratings=seeded.ratings)
+        self.assertEqual([p.text for p in doc.paragraphs], [p.text for p in expected.paragraphs])
+
+        # Счётчики год×жанр из состояния подходят для общего контекста отчёта
+        seeded = AnalysisContext(movies, year_genre_counts=aggregates['genre_year_counts'])
+        pd.testing.assert_frame_equal(seeded.year_genre_counts.astype({'genres': object}),
+                                      AnalysisContext(movies).year_genre_counts
+                                      .astype({'genres': object}), check_dtype=False)
+
+    def test_unchanged_feed_decodes_nothing(self):
+        """
+        Повторная выгрузка без изменений ничего не декодирует и не меняет.
+        """
+        lines = [make_line(i) for i in range(5)]
+        update_dataset(lines, self.tmp.name)
+
+        with patch.object(data_incremental, 'save_prepared') as save:
+            movies, persons, aggregates, summary = update_dataset(lines, self.tmp.name)
+
+        self.assertEqual(summary, {'added': 0, 'changed': 0, 'removed': 0, 'unchanged': 5})
+        self.assertEqual(len(movies), 5)
+        self.assertEqual(persons['name'].nunique(), 2)
+        self.assertEqual(aggregates['genre_year_counts']['count'].sum(), 5)
+        # Состояние не изменилось и не перезаписывается
+        save.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,281 @@
+import asyncio
 import unittest
 from unittest.mock import patch, mock_open, MagicMock
+import hashlib
 import json
-from data_fetching import fetch_data_from_stream_or_file  # Замените на ваш модуль
+import pandas as pd
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import os
+import tempfile
+from benchmarks.synthetic_data import generate_records
+from data_fetching import (fetch_data_from_stream_or_file, iter_data_chunks, download_stream,
+                           fetch_data_from_streams, fetch_shards_async, paged_urls, project_records, StreamSpool)  # Замените на ваш модуль
+
+
+class ShardHandler(BaseHTTPRequestHandler):
+    """
+    Отдаёт по две записи на страницу с задержкой; страница 2 первый раз падает.
+    """
+    failures = set()
+
+    def do_GET(self):
+        page = int(self.path.split('page=')[1])
+        if page == 2 and page not in self.failures:
+            self.failures.add(page)
+            self.send_response(503)
+            self.end_headers()
+            return
+        time.sleep(0.3)
+        body = "".join(json.dumps({"id": page * 10 + i, "name": f"Film {page}-{i}"}) + '\n'
+                       for i in range(2))
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(body.encode('utf-8'))
+
+    def log_message(self, *args):
+        pass
+
+class SlowShardHandler(BaseHTTPRequestHandler):
+    """
+    Отдаёт пять записей с паузой перед каждой: загрузка дольше таймаута чтения,
+    но каждая пауза короче его. Считает одновременные запросы.
+    """
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+        try:
+            self.send_response(200)
+            self.end_headers()
+            for i in range(5):
+                time.sleep(0.1)
+                self.wfile.write((json.dumps({"id": i}) + '\n').encode('utf-8'))
+                self.wfile.flush()
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+class TrickleShardHandler(BaseHTTPRequestHandler):
+    """
+    Отдаёт часть по байту каждые 50 мс: каждая пауза короче таймаута чтения,
+    но вся часть загружалась бы около минуты.
+    """
+
+    def do_GET(self):
+        self.send_response(200)
+        self.end_headers()
+        try:
+            for byte in (json.dumps({"id": 1}) + '\n').encode('utf-8') * 100:
+                time.sleep(0.05)
+                self.wfile.write(bytes([byte]))
+                self.wfile.flush()
+        except OSError:
+            # Клиент прервал загрузку
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+class ResumableHandler(BaseHTTPRequestHandler):
+    """
+    Отдаёт поток из body; первые drops ответов обрываются на середине,
+    после available ответов сервер отвечает 503.
+    С supports_range=False заголовок Range игнорируется; с etag=False
+    сервер не отдаёт ETag. If-Range с другим ETag — ответ целиком.
+    """
+    body = b''
+    drops = 0
+    available = None
+    supports_range = True
+    etag = True
+    ranges = []
+
+    def do_GET(self):
+        start = 0
+        header = self.headers.get('Range')
+        cls = type(self)
+        cls.ranges.append(header)
+        if cls.available is not None and len(cls.ranges) > cls.available:
+            self.send_response(503)
+            self.end_headers()
+            return
+        etag = f'"{hashlib.sha1(cls.body).hexdigest()}"' if cls.etag else None
+        if_range = self.headers.get('If-Range')
+        if header and cls.supports_range and (if_range is None or if_range == etag):
+            start = int(header.split('=')[1].rstrip('-'))
+            if start >= len(cls.body):
+                self.send_response(416)
+                self.end_headers()
+                return
+            self.send_response(206)
+        else:
+            self.send_response(200)
+        payload = cls.body[start:]
+        if etag:
+            self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        if cls.drops > 0:
+            cls.drops -= 1
+            self.wfile.write(payload[:len(payload) // 2])
+            self.close_connection = True
+            return
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestResumableStream(unittest.TestCase):
+    def setUp(self):
+        records = [{"id": i, "name": f"Film {i}"} for i in range(20000)]
+        ResumableHandler.body = "".join(json.dumps(r) + '\n' for r in records).encode('utf-8')
+        ResumableHandler.ranges = []
+        ResumableHandler.supports_range = True
+        ResumableHandler.etag = True
+        ResumableHandler.available = None
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), ResumableHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/stream"
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp_dir.cleanup()
+
+    def download(self, **kwargs):
+        return download_stream(self.url, spool_dir=self.tmp_dir.name, backoff=0.01,
+                               checkpoint_lines=1000, **kwargs)
+
+    def test_resume_with_range(self):
+        ResumableHandler.drops = 2
+        lines = self.download()
+
+        self.assertEqual(lines, ResumableHandler.body.splitlines())
+        self.assertIsNone(ResumableHandler.ranges[0])
+        self.assertTrue(ResumableHandler.ranges[1].startswith('bytes='))
+        # После успешной загрузки промежуточные файлы удаляются
+        self.assertEqual(os.listdir(self.tmp_dir.name), [])
+
+    def test_resume_without_range_support(self):
+        ResumableHandler.drops = 1
+        ResumableHandler.supports_range = False
+        self.assertEqual(self.download(), ResumableHandler.body.splitlines())
+
+    def test_resume_in_next_call(self):
+        # Загрузка не продолжилась: полученные строки остаются на диске
+        ResumableHandler.drops = 1
+        ResumableHandler.available = 1
+        with self.assertRaises(ConnectionError):
+            self.download(retries=0)
+        spool = StreamSpool(self.url, self.tmp_dir.name)
+        self.assertGreater(spool.lines, 0)
+
+        ResumableHandler.available = None
+        lines = self.download()
+        self.assertEqual(lines, ResumableHandler.body.splitlines())
+        self.assertTrue(ResumableHandler.ranges[-1].startswith('bytes='))
+
+    def test_restart_when_stream_changed(self):
+        ResumableHandler.drops = 1
+        ResumableHandler.available = 1
+        with self.assertRaises(ConnectionError):
+            self.download(retries=0)
+        ResumableHandler.available = None
+
+        # Сервер без Range отдаёт другие данные: загрузка начинается заново
+        ResumableHandler.supports_range = False
+        ResumableHandler.body = b'{"id": 1000}\n' + ResumableHandler.body
+        self.assertEqual(self.download(), ResumableHandler.body.splitlines())
+
+    def interrupted_download(self):
+        ResumableHandler.ranges = []
+        ResumableHandler.drops = 1
+        ResumableHandler.available = 1
+        with self.assertRaises(ConnectionError):
+            self.download(retries=0)
+        ResumableHandler.available = None
+        self.assertGreater(StreamSpool(self.url, self.tmp_dir.name).lines, 0)
+
+    def test_changed_stream_with_range(self):
+        # Данные изменились между запусками, сервер поддерживает Range:
+        # по If-Range он отдаёт поток целиком, и старая часть не склеивается с новой
+        original = ResumableHandler.body
+        for changed in (b'{"id": 1000}\n' + original,
+                        original.replace(b'"Film 1"', b'"Film X"', 1)):
+            with self.subTest(length_changed=len(changed) != len(original)):
+                ResumableHandler.body = original
+                self.interrupted_download()
+                ResumableHandler.body = changed
+                self.assertEqual(self.download(), changed.splitlines())
+
+    def test_changed_stream_without_validator(self):
+        # Без ETag Range не передаётся: поток запрашивается целиком,
+        # и уже полученная часть сверяется с промежуточным файлом полностью
+        ResumableHandler.etag = False
+        self.interrupted_download()
+        changed = ResumableHandler.body.replace(b'"Film 1"', b'"Film X"', 1)
+        ResumableHandler.body = changed
+        self.assertEqual(self.download(), changed.splitlines())
+        self.assertIsNone(ResumableHandler.ranges[-1])
+
+    def test_private_spool_when_locked(self):
+        # Другой процесс уже загружает этот поток и держит его файл:
+        # загрузка идёт во временный каталог, чужие файлы не меняются
+        self.interrupted_download()
+        holder = StreamSpool(self.url, self.tmp_dir.name)
+        self.assertTrue(holder.lock())
+        with open(holder.path, 'rb') as file:
+            held_data = file.read()
+        try:
+            self.assertEqual(self.download(), ResumableHandler.body.splitlines())
+            self.assertIsNone(ResumableHandler.ranges[-1])
+            with open(holder.path, 'rb') as file:
+                self.assertEqual(file.read(), held_data)
+            self.assertEqual(sorted(os.listdir(self.tmp_dir.name)),
+                             sorted(os.path.basename(path) for path in
+                                    (holder.path, holder.checkpoint_path, holder.lock_path)))
+        finally:
+            holder.unlock()
+
+        # После освобождения загрузка продолжается с контрольной точки владельца
+        self.assertEqual(self.download(), ResumableHandler.body.splitlines())
+        self.assertTrue(ResumableHandler.ranges[-1].startswith('bytes='))
+        self.assertEqual(os.listdir(self.tmp_dir.name), [])
+
+    @patch('data_fetching.LOCAL_FILE_PATH')
+    def test_fallback_keeps_partial_download(self, _):
+        ResumableHandler.drops = 1
+        ResumableHandler.available = 1
+        with patch('data_fetching.SPOOL_DIR', self.tmp_dir.name), \
+                patch('data_fetching._iter_file_records', return_value=iter([{"id": 5}])), \
+                patch('time.sleep'):
+            df = fetch_data_from_stream_or_file(self.url)
+        self.assertEqual(list(df['id']), [5])
+        self.assertEqual(len(os.listdir(self.tmp_dir.name)), 2)
+
 
 class TestFetchData(unittest.TestCase):
+    def setUp(self):
+        # Промежуточные файлы загрузки потока — во временном каталоге, а не в .cache проекта
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        spool_patch = patch('data_fetching.SPOOL_DIR', self.tmp_dir.name)
+        spool_patch.start()
+        self.addCleanup(spool_patch.stop)
+        self.addCleanup(self.tmp_dir.cleanup)
 
     @patch('requests.get')
     def test_fetch_from_empty_stream(self, mock_get):
@@ -12,7 +284,8 @@ class TestFetchData(unittest.TestCase):
         """
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.iter_lines.return_value = []  # Пустой поток данных
+        mock_response.headers = {}
+        mock_response.iter_content.return_value = []  # Пустой поток данных
         mock_get.return_value = mock_response
 
         # Вызов тестируемой функции
@@ -27,32 +300,177 @@ class TestFetchData(unittest.TestCase):
         """
         Тестирует работу с большим файлом.
         """
-        large_data = [json.dumps({"id": i, "name": f"Film {i}"}) + '\n' for i in range(1000)]
+        records = list(generate_records(1000, seed=1))
+        large_data = "".join(json.dumps(record, ensure_ascii=False) + '\n' for record in records)
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.iter_lines.return_value = large_data
+        mock_response.headers = {}
+        mock_response.iter_content.return_value = [large_data.encode('utf-8')]
         mock_get.return_value = mock_response
 
         # Вызов тестируемой функции
         df = fetch_data_from_stream_or_file("https://test-url.com/stream")
 
         # Проверка DataFrame
-        self.assertEqual(len(df), 59089)  # Должно 59089 1000 записей
-        self.assertEqual(df.loc[0, "name"], "Терминатор")  # Проверка первого фильма
-        self.assertEqual(df.loc[999, "name"], "Дом у дороги")  # Проверка последнего фильма
+        self.assertEqual(len(df), len(records))
+        self.assertEqual(df.loc[0, "name"], records[0]["name"])  # Проверка первого фильма
+        self.assertEqual(df.loc[999, "name"], records[999]["name"])  # Проверка последнего фильма
+        self.assertEqual(df.loc[999, "rating.kp"], records[999]["rating"]["kp"])
 
     @patch('requests.get', side_effect=Exception("Stream timeout"))
-    @patch('builtins.open', new_callable=mock_open,
-           read_data=json.dumps({"id": 5, "name": "Film E"}) + '\n')
-    def test_fetch_from_file_with_error(self, mock_file, mock_get):
+    def test_fetch_from_file_with_error(self, mock_get):
         """
         Тестирует обработку ошибок при получении потока и чтении файла.
         """
-        df = fetch_data_from_stream_or_file("https://test-url.com/stream")
+        local_path = os.path.join(self.tmp_dir.name, 'stream-data')
+        with open(local_path, 'w', encoding='utf-8') as file:
+            file.write(json.dumps({"id": 5, "name": "Film E"}) + '\n')
+        with patch('data_fetching.LOCAL_FILE_PATH', local_path):
+            df = fetch_data_from_stream_or_file("https://test-url.com/stream")
 
         # Проверка DataFrame
         self.assertEqual(len(df), 1)  # Должна быть 1 запись
         self.assertEqual(df.loc[0, "name"], "Film E")  # Проверка имени фильма из файла
 
+    @patch('requests.get')
+    def test_iter_chunks_from_stream(self, mock_get):
+        """
+        Тестирует потоковую выдачу данных порциями.
+        """
+        lines = [json.dumps({"id": i, "name": f"Film {i}"}).encode('utf-8') for i in range(25)]
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.iter_lines.return_value = lines
+        mock_get.return_value = mock_response
+
+        chunks = list(iter_data_chunks("https://test-url.com/stream", chunk_size=10))
+
+        self.assertEqual([len(chunk) for chunk in chunks], [10, 10, 5])  # Три порции
+        self.assertEqual(chunks[2].iloc[-1]["name"], "Film 24")  # Последний фильм
+
+    @patch('requests.get', side_effect=Exception("Stream timeout"))
+    @patch('builtins.open', new_callable=mock_open,
+           read_data="".join(json.dumps({"id": i, "name": f"Film {i}"}) + '\n\n'
+                             for i in range(3)))
+    def test_iter_chunks_from_file_with_error(self, mock_file, mock_get):
+        """
+        Тестирует переход на локальный файл в потоковом режиме.
+        """
+        chunks = list(iter_data_chunks("https://test-url.com/stream", chunk_size=2))
+
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 1])  # Пустые строки пропущены
+        self.assertEqual(chunks[1].loc[0, "name"], "Film 2")
+
+    @patch('requests.get')
+    def test_iter_chunks_stream_broken_midway(self, mock_get):
+        """
+        Тестирует, что обрыв потока после выдачи данных не подменяется файлом.
+        """
+        def broken_lines():
+            yield json.dumps({"id": 1, "name": "Film 1"}).encode('utf-8')
+            raise ConnectionError("connection reset")
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.iter_lines.return_value = broken_lines()
+        mock_get.return_value = mock_response
+
+        chunks = iter_data_chunks("https://test-url.com/stream", chunk_size=1)
+        self.assertEqual(len(next(chunks)), 1)
+        with self.assertRaises(ConnectionError):
+            next(chunks)
+
+    def test_project_records(self):
+        """
+        Тестирует извлечение только нужных вложенных полей.
+        """
+        records = [
+            {"id": 1, "rating": {"kp": 7.5, "imdb": 8.0}, "extra": {"a": 1}, "genres": [{"name": "драма"}]},
+            {"id": 2, "rating": None, "genres": None},
+        ]
+
+        df = project_records(records, ['id', 'rating.kp', 'genres', 'budget.value'])
+
+        self.assertEqual(list(df.columns), ['id', 'rating.kp', 'genres'])  # Нет пустого budget.value
+        self.assertEqual(df.loc[0, 'rating.kp'], 7.5)
+        self.assertTrue(pd.isna(df.loc[1, 'rating.kp']))
+        self.assertEqual(df.loc[0, 'genres'], [{"name": "драма"}])
+
+    @patch('requests.get')
+    def test_fetch_with_fields(self, mock_get):
+        """
+        Тестирует, что при заданных полях лишние столбцы не создаются.
+        """
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.headers = {}
+        mock_response.iter_content.return_value = [
+            json.dumps({"id": 1, "name": "Film", "extra": {"a": 1, "b": 2}}).encode('utf-8')]
+        mock_get.return_value = mock_response
+
+        df = fetch_data_from_stream_or_file("https://test-url.com/stream", fields=['id', 'name'])
+
+        self.assertEqual(list(df.columns), ['id', 'name'])
+
+    def test_fetch_from_several_streams(self):
+        """
+        Тестирует одновременную загрузку частей потока с повтором упавшей части.
+        """
+        server = ThreadingHTTPServer(('127.0.0.1', 0), ShardHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        urls = paged_urls(f"http://127.0.0.1:{server.server_address[1]}/stream", 4)
+        try:
+            started = time.perf_counter()
+            df = fetch_data_from_streams(urls, max_concurrency=4, backoff=0.01)
+            elapsed = time.perf_counter() - started
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertEqual(len(df), 8)  # Четыре части по две записи
+        self.assertEqual(df['id'].tolist(), [10, 11, 20, 21, 30, 31, 40, 41])  # Порядок частей
+        self.assertLess(elapsed, 4 * 0.3)  # Части загружаются одновременно
+
+    def test_slow_shards_not_cancelled(self):
+        """
+        Тестирует, что таймаут requests не ограничивает общее время загрузки части
+        и что одновременных запросов не больше max_concurrency.
+        """
+        SlowShardHandler.active = SlowShardHandler.peak = 0
+        server = ThreadingHTTPServer(('127.0.0.1', 0), SlowShardHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        urls = paged_urls(f"http://127.0.0.1:{server.server_address[1]}/stream", 4)
+        try:
+            shards = asyncio.run(fetch_shards_async(urls, max_concurrency=2, timeout=0.3,
+                                                    retries=0))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertEqual([len(shard) for shard in shards], [5, 5, 5, 5])
+        self.assertLessEqual(SlowShardHandler.peak, 2)
+
+    def test_trickling_shard_deadline(self):
+        """
+        Тестирует, что медленно приходящая часть прерывается по shard_timeout,
+        хотя данные приходят чаще таймаута чтения.
+        """
+        server = ThreadingHTTPServer(('127.0.0.1', 0), TrickleShardHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/stream"
+        started = time.monotonic()
+        try:
+            with self.assertRaises(ConnectionError):
+                asyncio.run(fetch_shards_async([url], timeout=1, shard_timeout=0.5, retries=2,
+                                               backoff=0.01))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        # Срок общий для всех попыток: повторы его не продлевают
+        self.assertLess(time.monotonic() - started, 3)
+
+
 if __name__ == "__main__":
     unittest.main()
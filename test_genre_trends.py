@@ -0,0 +1,56 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from genre_trends import GenreTrends
+
+
+class TestGenreTrends(unittest.TestCase):
+    def setUp(self):
+        self.pairs = pd.DataFrame({
+            'year': [2000, 2000, 2001, 2003, 2003, 2003, np.nan],
+            'genres': pd.Categorical(['драма', 'комедия', 'драма', 'драма', 'ужасы', 'драма',
+                                      'комедия']),
+        })
+        genres = self.pairs['genres'].cat
+        self.trends = GenreTrends.from_codes(self.pairs['year'], genres.codes, genres.categories)
+
+    def test_matches_groupby(self):
+        expected = (self.pairs.dropna().groupby(['year', 'genres'], observed=True)
+                    .size().reset_index(name='count'))
+        frame = self.trends.to_frame()
+        self.assertEqual(frame['year'].tolist(), expected['year'].astype(int).tolist())
+        self.assertEqual(frame['genres'].astype(str).tolist(),
+                         expected['genres'].astype(str).tolist())
+        self.assertEqual(frame['count'].tolist(), expected['count'].tolist())
+
+        # Готовые счётчики дают ту же матрицу
+        np.testing.assert_array_equal(GenreTrends.from_counts(expected).counts, self.trends.counts)
+
+    def test_window_and_order(self):
+        self.assertEqual(list(self.trends.years), [2000, 2001, 2002, 2003])
+        window = self.trends.window(2001, 2010)
+        self.assertEqual(window.first_year, 2001)
+        self.assertEqual(window.totals().tolist(), [3, 0, 1])
+        self.assertEqual(list(window.order()), ['драма', 'ужасы'])
+        self.assertEqual(len(self.trends.window(1990, 1995).counts), 0)
+
+    def test_top(self):
+        self.assertEqual(list(self.trends.genres[self.trends.top(2)]), ['драма', 'комедия'])
+        # По числу лет: при равенстве раньше жанр, появившийся раньше
+        self.assertEqual(list(self.trends.genres[self.trends.top(3, by='years')]),
+                         ['драма', 'комедия', 'ужасы'])
+
+    def test_rolling_and_shares(self):
+        drama = self.trends.select([0])
+        np.testing.assert_allclose(drama.rolling(2).counts[:, 0], [1.0, 1.0, 0.5, 1.0])
+
+        shares = self.trends.shares().counts
+        np.testing.assert_allclose(shares[0], [0.5, 0.5, 0.0])
+        np.testing.assert_allclose(shares[2], [0.0, 0.0, 0.0])
+        np.testing.assert_allclose(shares[3], [2 / 3, 0.0, 1 / 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
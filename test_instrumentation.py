@@ -0,0 +1,69 @@
+import json
+import os
+import tempfile
+import unittest
+
+import instrumentation
+from instrumentation import Instrumentation, stage
+
+
+class TestInstrumentation(unittest.TestCase):
+    def tearDown(self):
+        instrumentation.disable()
+
+    def test_stage_is_noop_when_disabled(self):
+        with stage('prepare', rows=10) as record:
+            record['rows_out'] = 5
+        self.assertIsNone(instrumentation.disable())
+
+    def test_nested_stages(self):
+        collected = instrumentation.enable()
+        with stage('prepare', rows=3):
+            with stage('clean') as record:
+                record['rows'] = 2
+        instrumentation.disable()
+
+        names = [record['name'] for record in collected.stages]
+        self.assertEqual(names, ['prepare/clean', 'prepare'])
+        inner, outer = collected.stages
+        self.assertEqual(inner['rows'], 2)
+        self.assertEqual(outer['rows'], 3)
+        self.assertGreaterEqual(outer['wall_time'], inner['wall_time'])
+        self.assertIn('cpu_time', outer)
+
+    def test_trace_memory_peak_includes_nested(self):
+        collected = Instrumentation(trace_memory=True)
+        with collected.stage('outer'):
+            with collected.stage('inner'):
+                data = bytearray(5 * 1024 * 1024)
+                del data
+        instrumentation._current = collected
+        instrumentation.disable()
+
+        inner, outer = collected.stages
+        self.assertGreaterEqual(inner['peak_traced_bytes'], 5 * 1024 * 1024)
+        self.assertGreaterEqual(outer['peak_traced_bytes'], inner['peak_traced_bytes'])
+
+    def test_profile_and_json_report(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            collected = Instrumentation(profile_dir=os.path.join(tmp_dir, 'profiles'))
+            with collected.stage('report'):
+                with collected.stage('save'):
+                    sum(range(1000))
+
+            # Профилируется только внешний этап: вложенный входит в его профиль
+            outer = collected.stages[-1]
+            self.assertTrue(os.path.exists(outer['profile']))
+            self.assertNotIn('profile', collected.stages[0])
+
+            path = os.path.join(tmp_dir, 'metrics.json')
+            collected.save(path)
+            with open(path, encoding='utf-8') as file:
+                report = json.load(file)
+            self.assertEqual([record['name'] for record in report['stages']],
+                             ['report/save', 'report'])
+            self.assertIn('peak_rss_bytes', report)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import subprocess
+import sys
+import unittest
+from unittest.mock import patch
+
+from lazy_import import LazyImport
+
+
+class TestLazyImport(unittest.TestCase):
+    def test_module_is_loaded_on_first_use(self):
+        calls = []
+        lazy_json = LazyImport('json', setup=lambda: calls.append('setup'))
+        self.assertFalse(lazy_json.loaded)
+
+        self.assertEqual(lazy_json.dumps([1]), '[1]')
+        self.assertTrue(lazy_json.loaded)
+        lazy_json.loads('[]')
+        self.assertEqual(calls, ['setup'])  # Подготовка выполняется один раз
+
+    def test_attribute_is_callable(self):
+        ordered_dict = LazyImport('collections', 'OrderedDict')
+        self.assertEqual(list(ordered_dict(a=1)), ['a'])
+        with self.assertRaises(AttributeError):
+            LazyImport('json').no_such_attribute
+
+    def test_proxy_can_be_patched(self):
+        # Тесты data_analysis подменяют plt и Document через patch
+        import data_analysis
+        with patch('data_analysis.plt') as mock_plt:
+            data_analysis.plt.close()
+        mock_plt.close.assert_called_once()
+        self.assertIsInstance(data_analysis.plt, LazyImport)
+
+    def test_data_analysis_import_is_light(self):
+        # Импорт модуля отчёта не загружает библиотеки графиков, scipy и python-docx
+        code = ("import sys, data_analysis; "
+                "print(','.join(m for m in ['seaborn', 'matplotlib', 'scipy.stats', 'docx']"
+                " if m in sys.modules))")
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                                check=True)
+        self.assertEqual(result.stdout.strip(), '')
+
+
+if __name__ == '__main__':
+    unittest.main()
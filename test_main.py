@@ -0,0 +1,139 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from docx import Document
+
+from data_analysis import REPORT_SECTIONS, required_columns
+import main as cli
+from main import main, parse_args
+
+
+def make_record(movie_id, kp, imdb):
+    return {
+        'id': movie_id, 'name': f"Film {movie_id}", 'year': 2000 + movie_id % 5,
+        'genres': [{'name': 'драма'}], 'countries': [{'name': 'США'}],
+        'persons': [{'id': 1, 'name': 'Actor A', 'enProfession': 'actor'},
+                    {'id': 2, 'name': f"Director {movie_id % 2}", 'enProfession': 'director'}],
+        'rating': {'kp': kp, 'imdb': imdb}, 'votes': {'kp': 5000, 'imdb': 1000},
+        'budget': {'value': 1000000, 'currency': 'USD'},
+        'fees': {'world': {'value': 5000000, 'currency': 'USD'}},
+    }
+
+
+class TestMain(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.data_path = os.path.join(self.tmp_dir.name, 'movies.jsonl')
+        records = [make_record(i, 8.0 if i % 2 else 4.0, 7.8 if i % 2 else 4.5) for i in range(10)]
+        with open(self.data_path, 'w', encoding='utf-8') as file:
+            file.write('\n'.join(json.dumps(record, ensure_ascii=False) for record in records))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_parse_args_defaults(self):
+        args = parse_args(['--source', 'file', '--output', 'report.pdf'])
+        self.assertIsNone(args.sections)
+        self.assertEqual(args.format, 'pdf')
+        self.assertEqual(parse_args([]).format, 'docx')
+        self.assertEqual(parse_args(['--min-films', '3']).min_films, 3)
+        self.assertEqual(parse_args([]).prior_weight, 0)
+        # Кэш подготовленных данных используется только по явному выбору
+        self.assertEqual(parse_args([]).source, 'stream')
+
+        with self.assertRaises(SystemExit):
+            parse_args(['--sections', 'no_such_section'])
+
+    def test_required_columns(self):
+        self.assertEqual(required_columns(['top_persons']), ['id', 'rating.kp', 'rating.imdb'])
+        self.assertIn('actors', required_columns(['low_persons'], with_persons=False))
+        self.assertEqual(set(required_columns()),
+                         {col for columns in REPORT_SECTIONS.values() for col in columns})
+
+    def test_selected_sections_from_file(self):
+        output = os.path.join(self.tmp_dir.name, 'top.docx')
+        with patch.object(cli, 'prepare_data', wraps=cli.prepare_data) as prepare:
+            self.assertEqual(main(['--source', 'file', '--file', self.data_path,
+                                   '--sections', 'top_persons', '--output', output]), 0)
+
+        # Подготовлены только столбцы, нужные разделу
+        self.assertEqual(prepare.call_args.kwargs['columns'], ['id', 'rating.kp', 'rating.imdb'])
+
+        doc = Document(output)
+        headings = [p.text for p in doc.paragraphs if p.style.name.startswith('Heading')]
+        self.assertEqual(headings[0], "Анализ лучших актёров и режиссёров")
+        self.assertNotIn("Анализ бюджетов и сборов фильмов", headings)
+        self.assertEqual(len(doc.tables), 2)
+        self.assertEqual(doc.tables[0].rows[1].cells[0].text, 'Actor A')
+
+    def test_metrics_report(self):
+        output = os.path.join(self.tmp_dir.name, 'report.docx')
+        metrics = os.path.join(self.tmp_dir.name, 'metrics.json')
+        main(['--source', 'file', '--file', self.data_path, '--sections', 'budgets_and_fees',
+              '--output', output, '--metrics', metrics])
+
+        with open(metrics, encoding='utf-8') as file:
+            names = [record['name'] for record in json.load(file)['stages']]
+        for name in ['fetch', 'prepare/currency', 'prepare', 'report/budgets_and_fees', 'report']:
+            self.assertIn(name, names)
+
+    def test_metrics_saved_on_error(self):
+        output = os.path.join(self.tmp_dir.name, 'report.docx')
+        metrics = os.path.join(self.tmp_dir.name, 'metrics.json')
+        with patch.object(cli, 'analyze_all', side_effect=RuntimeError("ошибка раздела")):
+            with self.assertRaises(RuntimeError):
+                main(['--source', 'file', '--file', self.data_path, '--output', output,
+                      '--metrics', metrics])
+
+        # Замеры этапов до ошибки сохранены, а замер выключен
+        with open(metrics, encoding='utf-8') as file:
+            names = [record['name'] for record in json.load(file)['stages']]
+        self.assertIn('fetch', names)
+        self.assertIn('report', names)
+        self.assertIsNone(cli.instrumentation.disable())
+
+    def test_figures_in_memory(self):
+        output = os.path.join(self.tmp_dir.name, 'report.docx')
+        work_dir = os.path.join(self.tmp_dir.name, 'work')
+        os.mkdir(work_dir)
+        cwd = os.getcwd()
+        os.chdir(work_dir)
+        try:
+            main(['--source', 'file', '--file', self.data_path, '--sections',
+                  'ratings_distribution', '--output', output, '--figure-format', 'jpeg',
+                  '--figure-dpi', '50'])
+        finally:
+            os.chdir(cwd)
+
+        # Графики не записываются в рабочий каталог и вставлены в нужном формате
+        self.assertEqual(os.listdir(work_dir), [])
+        images = [part for part in Document(output).part.package.parts
+                  if part.partname.startswith('/word/media/')]
+        self.assertEqual([part.content_type for part in images], ['image/jpeg'])
+
+    def test_load_without_fallback(self):
+        args = parse_args(['--source', 'stream', '--url', 'http://127.0.0.1:1/stream',
+                           '--sections', 'budgets'])
+        with tempfile.TemporaryDirectory() as spool_dir, \
+                patch('data_fetching.SPOOL_DIR', spool_dir), \
+                patch('data_fetching.LOCAL_FILE_PATH', self.data_path):
+            # Сервису при недоступном потоке нужна ошибка, а не данные из локального файла
+            with self.assertRaises(Exception):
+                cli.load_report_data(args, fallback=False)
+
+            df, _, _ = cli.load_report_data(args)
+            self.assertEqual(len(df), 10)
+
+    @patch('main.find_soffice', return_value=None)
+    def test_pdf_without_libreoffice(self, _):
+        output = os.path.join(self.tmp_dir.name, 'report.pdf')
+        self.assertEqual(main(['--source', 'file', '--file', self.data_path,
+                               '--output', output]), 2)
+        self.assertFalse(os.path.exists(output))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from person_ranking import PersonIndex, group_sums, movie_ratings
+
+
+class TestPersonIndex(unittest.TestCase):
+    def setUp(self):
+        self.movies = pd.DataFrame({
+            'id': [10, 20, 30, 40],
+            'rating.kp': [9.0, 8.0, 3.0, 7.0],
+            'rating.imdb': [8.5, np.nan, 4.0, 7.5],
+            'actors': [['A', 'B'], ['B', 'C'], ['C'], []],
+        })
+        self.persons = pd.DataFrame({
+            'movie_id': [10, 10, 20, 20, 30, 30, 99],
+            'name': ['A', 'B', 'B', 'C', 'C', None, 'D'],
+            'profession': pd.Categorical(['actor', 'actor', 'actor', 'actor', 'actor',
+                                          'actor', 'director']),
+        })
+
+    def test_index_from_persons_and_lists(self):
+        from_persons = PersonIndex.from_persons(self.movies, self.persons, 'actor')
+        from_lists = PersonIndex.from_lists(self.movies, 'actors')
+        for index in (from_persons, from_lists):
+            self.assertEqual(list(index.names), ['A', 'B', 'C'])
+            counts, _, _, means = index.aggregate(movie_ratings(self.movies))
+            self.assertEqual(list(counts), [1, 2, 2])
+            np.testing.assert_allclose(means, [[9.0, 8.5], [8.5, 8.5], [5.5, 4.0]])
+
+    def test_rank_with_mask_and_min_films(self):
+        index = PersonIndex.from_lists(self.movies, 'actors')
+        ratings = movie_ratings(self.movies)
+
+        ranking = index.rank(ratings, k=2)
+        self.assertEqual(list(ranking['name']), ['A', 'B'])
+        self.assertEqual(list(ranking['films']), [1, 2])
+
+        ranking = index.rank(ratings, k=2, min_films=2)
+        self.assertEqual(list(ranking['name']), ['B', 'C'])
+
+        low = ratings[:, 0] < 5
+        ranking = index.rank(ratings, low, k=10, largest=False)
+        self.assertEqual(list(ranking['name']), ['C'])
+
+    def test_bayesian_shrinkage(self):
+        # Один фильм с 10 против двадцати фильмов по 9: со сглаживанием выше второй
+        movies = pd.DataFrame({
+            'rating.kp': [10.0] + [9.0] * 20 + [5.0] * 20,
+            'rating.imdb': [10.0] + [9.0] * 20 + [5.0] * 20,
+            'actors': [['Single']] + [['Regular']] * 20 + [['Other']] * 20,
+        })
+        index = PersonIndex.from_lists(movies, 'actors')
+        ratings = movie_ratings(movies)
+
+        self.assertEqual(index.rank(ratings, k=1)['name'][0], 'Single')
+        top = index.rank(ratings, k=1, prior_weight=5)
+        self.assertEqual(top['name'][0], 'Regular')
+        self.assertEqual(top['avg_kp_rating'][0], 9.0)  # Выводятся несглаженные средние
+
+    def test_group_sums_skip_missing(self):
+        counts, sums, valid = group_sums(np.array([0, 0, 1]),
+                                         np.array([[1.0], [np.nan], [2.0]]), 3)
+        self.assertEqual(list(counts), [2, 1, 0])
+        self.assertEqual(list(sums[:, 0]), [1.0, 2.0, 0.0])
+        self.assertEqual(list(valid[:, 0]), [1, 1, 0])
+
+
+if __name__ == '__main__':
+    unittest.main()
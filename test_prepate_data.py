@@ -1,6 +1,7 @@
 import unittest
 import pandas as pd
-from data_preparation import convert_to_rub, extract_roles, prepare_data  # Замените на ваш модуль
+from data_preparation import (convert_to_rub, convert_columns_to_rub, extract_roles,
+                              build_person_index, prepare_data, prepare_data_chunks)  # Замените на ваш модуль
 
 
 class TestFunctions(unittest.TestCase):
@@ -16,6 +17,22 @@ class TestFunctions(unittest.TestCase):
         self.assertIsNone(convert_to_rub(None, 'USD'))  # Пропущенная сумма
         self.assertIsNone(convert_to_rub(100, None))  # Пропущенная валюта
 
+    def test_convert_columns_to_rub(self):
+        """
+        Тестирование векторной конвертации: совпадает с convert_to_rub построчно.
+        """
+        df = pd.DataFrame({
+            'budget.value': [100, 50, 1000, 100, None, 100],
+            'budget.currency': ['USD', 'EUR', 'RUB', 'UNKNOWN', 'USD', None],
+        })
+
+        result = convert_columns_to_rub(df, {'budget_rub': ('budget.value', 'budget.currency')})
+
+        expected = [convert_to_rub(amount, currency)
+                    for amount, currency in zip(df['budget.value'], df['budget.currency'])]
+        self.assertEqual(result['budget_rub'].iloc[:4].tolist(), expected[:4])
+        self.assertTrue(result['budget_rub'].iloc[4:].isna().all())  # Пропуски дают NaN
+
     def test_extract_roles(self):
         """
         Тестирование функции extract_roles.
@@ -73,6 +90,71 @@ class TestFunctions(unittest.TestCase):
         self.assertEqual(result.loc[0, 'countries'], ['USA'])  # Проверка преобразования стран
         self.assertEqual(result.loc[0, 'actors'], ['Actor 1'])  # Извлеченные актеры
 
+    def test_build_person_index(self):
+        """
+        Тестирование построения таблицы персон в длинном формате.
+        """
+        df = pd.DataFrame({
+            'id': [1, 2, 3],
+            'persons': [
+                [{'id': 10, 'name': 'Actor 1', 'enProfession': 'actor'},
+                 {'id': 20, 'name': 'Director 1', 'enProfession': 'director'}],
+                None,
+                [{'id': 10, 'name': 'Actor 1', 'enProfession': 'actor'}],
+            ],
+        })
+
+        persons = build_person_index(df)
+
+        self.assertEqual(persons['movie_id'].tolist(), [1, 1, 3])
+        self.assertEqual(persons['person_id'].tolist(), [10, 20, 10])
+        self.assertEqual(persons['name'].tolist(), ['Actor 1', 'Director 1', 'Actor 1'])
+        self.assertIsInstance(persons['profession'].dtype, pd.CategoricalDtype)
+
+    def test_prepare_data_return_persons(self):
+        """
+        Тестирование prepare_data с отдельной таблицей персон.
+        """
+        df = pd.DataFrame({
+            'id': [1, 2],
+            'name': ['Film A', 'Film B'],
+            'persons': [
+                [{'id': 10, 'name': 'Actor 1', 'enProfession': 'actor'}],
+                [{'id': 20, 'name': 'Director 1', 'enProfession': 'director'}]
+            ],
+            'rating.kp': [7.5, 0],
+            'rating.imdb': [8.0, 0],
+            'votes.kp': [1000, 800],
+        })
+
+        result, persons = prepare_data(df, return_persons=True)
+
+        self.assertNotIn('actors', result.columns)  # Списков в строках больше нет
+        self.assertEqual(persons['movie_id'].tolist(), [1])  # Второй фильм отфильтрован
+        self.assertEqual(persons['name'].tolist(), ['Actor 1'])
+
+    def test_prepare_data_chunks(self):
+        """
+        Тестирование подготовки порций, в которых нет части вложенных полей.
+        """
+        chunk = pd.DataFrame({
+            'id': [1, 2],
+            'name': ['Film A', 'Film B'],
+            'genres': [[{'name': 'Drama'}], None],
+            'budget.value': [100, None],
+            'budget.currency': ['USD', None],
+            'rating.kp': [7.5, 6.0],
+            'rating.imdb': [8.0, 6.5],
+            'votes.kp': [1000, 800],
+        })
+
+        result = list(prepare_data_chunks([chunk]))[0]
+
+        self.assertEqual(len(result), 2)
+        self.assertEqual(result['budget_rub'].iloc[0], 9000)
+        self.assertTrue(pd.isna(result['fees_rub_world']).all())  # Сборов в порции нет
+        self.assertEqual(result['genres'].iloc[1], 'неизвестно')
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,138 @@
+import io
+import json
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from unittest.mock import patch
+
+from docx import Document
+
+from data_analysis import InlineFigureRenderer
+from data_fetching import lines_to_dataframe
+from data_preparation import SOURCE_COLUMNS, prepare_data
+from report_service import ReportService, create_server, document_to_json
+from test_main import make_record
+
+
+class TestReportService(unittest.TestCase):
+    def setUp(self):
+        self.loads = 0
+        self.fail_load = False
+        records = [make_record(i, 8.0 if i % 2 else 4.0, 7.8 if i % 2 else 4.5) for i in range(10)]
+        self.lines = [json.dumps(record, ensure_ascii=False) for record in records]
+
+        self.service = ReportService(self.load, refresh_interval=0)
+        self.assertTrue(self.service.refresh())
+        self.server = create_server(self.service, port=0)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.service.stop()
+
+    def load(self):
+        if self.fail_load:
+            raise ConnectionError("Источник недоступен")
+        self.loads += 1
+        df, persons = prepare_data(lines_to_dataframe(self.lines, SOURCE_COLUMNS),
+                                   return_persons=True)
+        return df, persons, None
+
+    def request(self, path, method='GET'):
+        request = urllib.request.Request(self.base_url + path, method=method)
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                return response.status, response.headers, response.read()
+        except urllib.error.HTTPError as error:
+            return error.code, error.headers, error.read()
+
+    def test_health_and_sections(self):
+        status, headers, body = self.request('/health')
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)['rows'], 10)
+        self.assertIn('X-Elapsed-Ms', headers)
+
+        status, _, body = self.request('/sections')
+        self.assertIn('top_persons', json.loads(body)['sections'])
+
+    def test_section_json(self):
+        status, _, body = self.request('/sections/top_persons')
+        self.assertEqual(status, 200)
+        content = json.loads(body)['content']
+        tables = [block for block in content if block['type'] == 'table']
+        self.assertEqual(len(tables), 2)
+        self.assertEqual(tables[0]['columns'][0], 'actor')
+        self.assertEqual(tables[0]['rows'][0][0], 'Actor A')
+
+    def test_section_image_and_docx(self):
+        status, headers, body = self.request('/sections/ratings_distribution?format=image')
+        self.assertEqual(status, 200)
+        self.assertEqual(headers['Content-Type'], 'image/png')
+        self.assertTrue(body.startswith(b'\x89PNG'))
+
+        status, _, body = self.request('/sections/ratings_distribution?format=image&figure=5')
+        self.assertEqual(status, 404)
+        for figure in ['abc', '-1', '1.5']:
+            with self.subTest(figure=figure):
+                status, _, _ = self.request(f'/sections/ratings_distribution?format=image&figure={figure}')
+                self.assertEqual(status, 400)
+
+        # Строится только запрошенный график, остальные пропускаются
+        with patch.object(InlineFigureRenderer, 'render', autospec=True,
+                          return_value=b'image') as render:
+            self.assertEqual(self.service.section_image('ratings_distribution'), b'image')
+            self.assertIsNone(self.service.section_image('ratings_distribution', 1))
+        self.assertEqual(render.call_count, 1)
+
+        status, _, body = self.request('/sections/budgets_and_fees?format=docx')
+        self.assertEqual(status, 200)
+        self.assertTrue(Document(io.BytesIO(body)).tables)
+
+    def test_report(self):
+        status, _, body = self.request('/report?sections=top_persons,low_persons')
+        self.assertEqual(status, 200)
+        self.assertEqual(len(Document(io.BytesIO(body)).tables), 4)
+
+        status, _, _ = self.request('/report?sections=no_such_section')
+        self.assertEqual(status, 404)
+
+    def test_unknown_section(self):
+        status, _, body = self.request('/sections/no_such_section')
+        self.assertEqual(status, 404)
+        self.assertIn('error', json.loads(body))
+
+    def test_refresh_keeps_data_on_error(self):
+        status, _, body = self.request('/refresh', method='POST')
+        self.assertEqual(status, 200)
+        self.assertEqual(self.loads, 2)
+
+        # Ошибка загрузки не сбрасывает уже загруженные данные
+        self.fail_load = True
+        status, _, body = self.request('/refresh', method='POST')
+        self.assertEqual(status, 503)
+        health = json.loads(body)
+        self.assertEqual(health['rows'], 10)
+        self.assertIn('ConnectionError', health['last_error'])
+        self.assertEqual(self.request('/sections/top_persons')[0], 200)
+
+    def test_document_to_json(self):
+        doc = Document()
+        doc.add_heading("Заголовок", level=2)
+        doc.add_paragraph("")
+        doc.add_paragraph("Текст")
+        table = doc.add_table(rows=2, cols=2)
+        table.cell(0, 0).text, table.cell(0, 1).text = 'a', 'b'
+        table.cell(1, 0).text, table.cell(1, 1).text = '1', '2'
+        self.assertEqual(document_to_json(doc), [
+            {'type': 'heading', 'level': 2, 'text': "Заголовок"},
+            {'type': 'paragraph', 'text': "Текст"},
+            {'type': 'table', 'columns': ['a', 'b'], 'rows': [['1', '2']]},
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+from docx import Document
+
+from data_analysis import analyze_all
+from data_fetching import lines_to_dataframe
+from data_preparation import SOURCE_COLUMNS, prepare_data
+from section_cache import SectionCache, column_fingerprint
+from test_main import make_record
+
+
+class TestSectionCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = self.tmp.name
+        records = [make_record(i, 8.0 if i % 2 else 4.0, 7.8 if i % 2 else 4.5) for i in range(10)]
+        lines = [json.dumps(record, ensure_ascii=False) for record in records]
+        self.df, self.persons = prepare_data(lines_to_dataframe(lines, SOURCE_COLUMNS),
+                                             return_persons=True)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def report(self, cache, df=None, **kwargs):
+        output = io.BytesIO()
+        analyze_all(self.df if df is None else df, self.persons, output_path=output,
+                    sections=['ratings_distribution', 'budgets', 'top_persons'],
+                    section_cache=cache, **kwargs)
+        return Document(output)
+
+    def test_column_fingerprint(self):
+        values = pd.Series([1.0, 2.0])
+        self.assertEqual(column_fingerprint(values), column_fingerprint(values.copy()))
+        self.assertNotEqual(column_fingerprint(values), column_fingerprint(pd.Series([1.0, 3.0])))
+        self.assertNotEqual(column_fingerprint(values), column_fingerprint(values.astype('float32')))
+        # Столбцы со списками тоже хэшируются
+        genres = pd.Series([['драма'], ['комедия', 'драма']])
+        self.assertNotEqual(column_fingerprint(genres), column_fingerprint(genres[::-1]))
+
+    def test_cached_report_matches(self):
+        expected = self.report(None)
+        cold = SectionCache(self.cache_dir)
+        self.report(cold)
+        self.assertEqual((cold.hits, cold.misses), (0, 3))
+
+        warm = SectionCache(self.cache_dir)
+        doc = self.report(warm)
+        self.assertEqual((warm.hits, warm.misses), (3, 0))
+
+        self.assertEqual([p.text for p in doc.paragraphs], [p.text for p in expected.paragraphs])
+        self.assertEqual([[c.text for c in t._cells] for t in doc.tables],
+                         [[c.text for c in t._cells] for t in expected.tables])
+        self.assertEqual(len(doc.inline_shapes), len(expected.inline_shapes))
+        shape_ids = [shape._inline.docPr.id for shape in doc.inline_shapes]
+        self.assertEqual(len(set(shape_ids)), len(shape_ids))
+
+    def test_only_affected_sections_rebuilt(self):
+        self.report(SectionCache(self.cache_dir))
+
+        # votes.kp читает только раздел о бюджетах
+        cache = SectionCache(self.cache_dir)
+        self.report(cache, df=self.df.assign(**{'votes.kp': self.df['votes.kp'] + 1}))
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+        # Параметры разделов о персонах входят в ключ
+        cache = SectionCache(self.cache_dir)
+        self.report(cache, min_films=2)
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+    def test_size_limit(self):
+        cache = SectionCache(self.cache_dir, max_bytes=0)
+        self.report(cache)
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
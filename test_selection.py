@@ -0,0 +1,48 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from selection import grouped_top_k, top_k
+
+
+class TestTopK(unittest.TestCase):
+    def test_matches_full_sort_with_ties_and_missing(self):
+        rng = np.random.default_rng(0)
+        keys = rng.integers(0, 5, size=(200, 2)).astype(float)
+        keys[rng.random(200) < 0.1, 0] = np.nan
+
+        frame = pd.DataFrame(keys, columns=['a', 'b'])
+        for largest in (True, False):
+            expected = frame.sort_values(['a', 'b'], ascending=not largest,
+                                         kind='stable').index[:10]
+            np.testing.assert_array_equal(top_k(keys, 10, largest), expected)
+
+    def test_small_inputs(self):
+        self.assertEqual(list(top_k(np.array([3.0, 1.0, 2.0]), 10)), [1, 2, 0])
+        self.assertEqual(len(top_k(np.array([1.0]), 0)), 0)
+
+
+class TestGroupedTopK(unittest.TestCase):
+    def test_matches_sort_per_group(self):
+        rng = np.random.default_rng(1)
+        codes = rng.integers(-1, 4, size=500)
+        keys = rng.integers(0, 50, size=500).astype(float)
+        ascending = [True, False, False, True]
+
+        result = grouped_top_k(codes, keys, 5, ascending)
+        self.assertEqual(len(result), 4)
+        frame = pd.DataFrame({'code': codes, 'key': keys})
+        for group, positions in enumerate(result):
+            expected = (frame[frame['code'] == group]
+                        .sort_values('key', ascending=ascending[group], kind='stable').index[:5])
+            np.testing.assert_array_equal(positions, expected)
+
+    def test_empty_groups(self):
+        result = grouped_top_k(np.array([1, 1, -1]), np.array([2.0, 1.0, 0.0]), 5, [True, True])
+        self.assertEqual(len(result[0]), 0)
+        self.assertEqual(list(result[1]), [1, 0])
+
+
+if __name__ == '__main__':
+    unittest.main()
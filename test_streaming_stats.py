@@ -0,0 +1,139 @@
+import io
+import unittest
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pandas as pd
+from scipy.stats import pearsonr
+
+from data_analysis import (
+    analyze_ratings_distribution,
+    compare_platform_ratings,
+    _plot_platform_density,
+    _plot_ratings_distribution,
+)
+from streaming_stats import (
+    CoMoment,
+    FixedHistogram,
+    RatingsAccumulator,
+    RunningMoments,
+    ThresholdCounter,
+    accumulate_ratings,
+)
+
+
+class TestStreamingStats(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        kp = np.round(rng.uniform(1, 10, 1001), 3)
+        imdb = np.round(np.clip(kp + rng.normal(0, 1, len(kp)), 1, 10), 1)
+        self.df = pd.DataFrame({'rating.kp': kp, 'rating.imdb': imdb})
+        self.chunks = [self.df.iloc[i:i + 137] for i in range(0, len(self.df), 137)]
+
+    def test_running_moments_merge(self):
+        # Результат по частям и после объединения совпадает с расчётом целиком
+        left = RunningMoments().update(self.df['rating.kp'][:400])
+        right = RunningMoments().update(self.df['rating.kp'][400:])
+        merged = left.merge(right)
+        self.assertEqual(merged.count, len(self.df))
+        self.assertAlmostEqual(merged.mean, self.df['rating.kp'].mean())
+        self.assertAlmostEqual(merged.variance, self.df['rating.kp'].var())
+
+    def test_running_moments_ignores_nan(self):
+        moments = RunningMoments().update([1.0, np.nan, 3.0])
+        self.assertEqual(moments.count, 2)
+        self.assertAlmostEqual(moments.mean, 2.0)
+
+    def test_comoment_pearson_and_line(self):
+        comoment = CoMoment()
+        for chunk in self.chunks:
+            comoment.update(chunk['rating.kp'], chunk['rating.imdb'])
+        expected, _ = pearsonr(self.df['rating.kp'], self.df['rating.imdb'])
+        self.assertAlmostEqual(comoment.pearson(), expected)
+
+        slope, intercept = comoment.regression_line()
+        expected_slope, expected_intercept = np.polyfit(self.df['rating.kp'],
+                                                        self.df['rating.imdb'], 1)
+        self.assertAlmostEqual(slope, expected_slope)
+        self.assertAlmostEqual(intercept, expected_intercept)
+
+    def test_histogram_mode_and_median(self):
+        histogram = FixedHistogram()
+        for chunk in self.chunks:
+            histogram.update(chunk['rating.kp'])
+        # Оценки с точностью 0.001 попадают в узлы сетки, поэтому результат точный
+        self.assertAlmostEqual(histogram.median(), self.df['rating.kp'].median())
+        self.assertAlmostEqual(histogram.mode(), self.df['rating.kp'].mode()[0])
+
+        even = FixedHistogram().update([7.1, 7.2, 7.2, 8.0])
+        self.assertAlmostEqual(even.median(), 7.2)
+        self.assertAlmostEqual(even.mode(), 7.2)
+        self.assertTrue(np.isnan(FixedHistogram().median()))
+
+    def test_threshold_counter(self):
+        counter = ThresholdCounter(above=(7,), below=(5,))
+        for chunk in self.chunks:
+            counter.merge(ThresholdCounter(above=(7,), below=(5,)).update(chunk['rating.kp']))
+        self.assertAlmostEqual(counter.share_above(7), (self.df['rating.kp'] > 7).mean())
+        self.assertAlmostEqual(counter.share_below(5), (self.df['rating.kp'] < 5).mean())
+
+    def test_accumulate_ratings_merge(self):
+        whole = accumulate_ratings([self.df])
+        merged = accumulate_ratings(self.chunks[:3]).merge(accumulate_ratings(self.chunks[3:]))
+        self.assertEqual(merged.kp.count, whole.kp.count)
+        self.assertAlmostEqual(merged.kp.mean, whole.kp.mean)
+        self.assertAlmostEqual(merged.platforms.pearson(), whole.platforms.pearson())
+        np.testing.assert_array_equal(merged.kp_histogram.counts, whole.kp_histogram.counts)
+        np.testing.assert_array_equal(merged.platforms_histogram.counts,
+                                      whole.platforms_histogram.counts)
+        self.assertEqual(merged.platforms_histogram.counts.sum(), len(self.df))
+
+    def test_accumulate_ratings_remove_and_frame(self):
+        # Убрав часть, получаем накопитель по остальным данным; состояние переживает to_frame
+        rest = accumulate_ratings(self.chunks[2:])
+        removed = RatingsAccumulator.from_frame(accumulate_ratings(self.chunks).to_frame())
+        removed.remove(accumulate_ratings(self.chunks[:2]))
+        self.assertEqual(removed.kp.count, rest.kp.count)
+        self.assertAlmostEqual(removed.kp.mean, rest.kp.mean)
+        self.assertAlmostEqual(removed.kp.variance, rest.kp.variance)
+        self.assertAlmostEqual(removed.platforms.pearson(), rest.platforms.pearson())
+        np.testing.assert_allclose(removed.platforms.regression_line(),
+                                   rest.platforms.regression_line())
+        self.assertEqual(vars(removed.kp_thresholds), vars(rest.kp_thresholds))
+        np.testing.assert_array_equal(removed.kp_histogram.counts, rest.kp_histogram.counts)
+        np.testing.assert_array_equal(removed.platforms_histogram.counts,
+                                      rest.platforms_histogram.counts)
+
+    @patch('data_analysis.plt')
+    def test_sections_from_accumulator(self, mock_plt):
+        # Разделы отчёта выводят те же показатели, что и при расчёте по DataFrame
+        ratings = accumulate_ratings(self.chunks)
+        for section in (analyze_ratings_distribution, compare_platform_ratings):
+            full_doc, streamed_doc = MagicMock(), MagicMock()
+            section(self.df, full_doc)
+            section(None, streamed_doc, ratings=ratings)
+            self.assertEqual(streamed_doc.add_paragraph.call_args_list[:5],
+                             full_doc.add_paragraph.call_args_list[:5])
+            streamed_doc.add_picture.assert_called_once()
+
+    def test_streamed_plots_render(self):
+        # Графики по накопителю строятся без исходных оценок
+        ratings = accumulate_ratings(self.chunks)
+        histogram = ratings.kp_histogram
+        filled = histogram.counts > 0
+
+        target = io.BytesIO()
+        _plot_ratings_distribution(histogram.values[filled], histogram.counts[filled],
+                                   ratings.kp.mean, target)
+        self.assertTrue(target.getvalue().startswith(b'\x89PNG'))
+
+        target = io.BytesIO()
+        _plot_platform_density(ratings.platforms_histogram.counts,
+                               ratings.platforms_histogram.edges,
+                               ratings.platforms.regression_line(),
+                               ratings.platforms.pearson(), target)
+        self.assertTrue(target.getvalue().startswith(b'\x89PNG'))
+
+
+if __name__ == '__main__':
+    unittest.main()